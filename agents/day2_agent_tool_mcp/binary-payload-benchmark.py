@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+import base64
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from image_store import ImageStore
+
+# Saving a large base64 tool payload (default 50 MB decoded), three ways:
+#   inline:    the old path - base64.b64decode() the whole string, then a synchronous write
+#   streaming: ImageStore.put_base64 - decode chunk by chunk straight into the file
+#   async:     ImageStore.aput_base64 - the streaming path on the store's thread pool
+# For each we report peak extra Python memory (tracemalloc, on top of the base64
+# string itself) and the longest event-loop stall seen by a 1 ms ticker task.
+#
+# Run from this folder:
+#   python binary-payload-benchmark.py
+#   python binary-payload-benchmark.py --mb 200
+
+
+def save_inline(out_dir: Path, b64_str: str):
+    img_bytes = base64.b64decode(b64_str)
+    with open(out_dir / "inline.png", "wb") as f:
+        f.write(img_bytes)
+
+
+async def measure(save):
+    """Runs `save` while a ticker measures how long the event loop is blocked."""
+    max_gap = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal max_gap
+        last = time.perf_counter()
+        while running:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            max_gap = max(max_gap, now - last)
+            last = now
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    await save()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    running = False
+    await ticker_task
+    return elapsed, peak, max_gap
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Large binary payload save cost")
+    parser.add_argument("--mb", type=float, default=50, help="Decoded payload size in MB")
+    args = parser.parse_args()
+
+    size = int(args.mb * 1_000_000)
+    b64_str = base64.b64encode(os.urandom(size)).decode()
+    print(f"Payload: {size / 1_000_000:.0f} MB decoded, {len(b64_str) / 1_000_000:.0f} MB base64\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out_dir = Path(tmp)
+
+        async def inline():
+            save_inline(out_dir, b64_str)
+
+        # Separate stores so the second run isn't a dedup hit
+        streaming_store = ImageStore(out_dir / "streaming")
+        async_store = ImageStore(out_dir / "async")
+
+        async def streaming():
+            streaming_store.put_base64(b64_str)
+
+        async def threaded():
+            await async_store.aput_base64(b64_str)
+
+        print(f"{'path':<10}{'time ms':>10}{'peak extra MB':>16}{'max loop stall ms':>20}")
+        for label, save in [("inline", inline), ("streaming", streaming), ("async", threaded)]:
+            elapsed, peak, stall = await measure(save)
+            print(
+                f"{label:<10}{elapsed * 1000:>10.1f}{peak / 1_000_000:>16.2f}{stall * 1000:>20.1f}"
+            )
+
+        streaming_store.close()
+        async_store.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""Replace binary tool output with references to files on disk.
+
+MCP tools return images, audio and blob resources as base64 strings inside
+the tool result. Left inline, a multi-megabyte payload is copied into the
+event, the session and every later LLM request. `offload_binary_content`
+builds an `after_tool_callback` that streams each payload into an
+`ImageStore` on its thread pool and swaps it for an MCP `resource_link`
+(file URI, mime type, size), so the agent and the model only see a reference.
+
+Usage:
+
+    store = ImageStore("generated_images")
+    agent = LlmAgent(
+        ...,
+        tools=[mcp_toolset],
+        after_tool_callback=offload_binary_content(store, on_saved=print),
+    )
+"""
+
+import inspect
+from pathlib import Path
+
+from image_store import ImageStore, StoredImage
+
+# MCP content items that carry a base64 "data" field
+BINARY_CONTENT_TYPES = ("image", "audio")
+
+
+def reference_for(stored: StoredImage) -> dict:
+    """An MCP resource_link content item pointing at a stored payload."""
+    return {
+        "type": "resource_link",
+        "uri": Path(stored.path).resolve().as_uri(),
+        "name": Path(stored.path).name,
+        "mimeType": stored.mime_type,
+        "size": stored.size,
+        "description": f"{stored.mime_type} saved to {stored.path}",
+    }
+
+
+def offload_binary_content(store: ImageStore, min_bytes: int = 0, on_saved=None):
+    """Creates an after_tool_callback that moves binary tool output into `store`.
+
+    Args:
+        store: Where decoded payloads are written
+        min_bytes: Leave payloads whose base64 is shorter than this inline
+        on_saved: Optional `(stored, tool_context)` callback (sync or async),
+            called for every payload, including duplicates
+    """
+
+    async def after_tool_callback(tool, args, tool_context, tool_response):
+        content = (
+            tool_response.get("content") if isinstance(tool_response, dict) else None
+        )
+        if not isinstance(content, list):
+            return None
+
+        new_content = []
+        offloaded = False
+        for index, item in enumerate(content):
+            b64_data, mime_type = _binary_payload(item)
+            if b64_data is None or len(b64_data) < min_bytes:
+                new_content.append(item)
+                continue
+
+            stored = await store.aput_base64(
+                b64_data,
+                mime_type=mime_type,
+                source={
+                    "tool": tool.name,
+                    "invocation_id": tool_context.invocation_id,
+                    "function_call_id": tool_context.function_call_id,
+                    "label": f"content[{index}]",
+                },
+            )
+            new_content.append(reference_for(stored))
+            offloaded = True
+            if on_saved:
+                result = on_saved(stored, tool_context)
+                if inspect.isawaitable(result):
+                    await result
+
+        if not offloaded:
+            return None
+        return {**tool_response, "content": new_content}
+
+    return after_tool_callback
+
+
+def _binary_payload(item) -> tuple[str | None, str]:
+    """Returns (base64 data, mime type) for binary content items, else (None, "")."""
+    if not isinstance(item, dict):
+        return None, ""
+    if item.get("type") in BINARY_CONTENT_TYPES and isinstance(item.get("data"), str):
+        return item["data"], item.get("mimeType", "application/octet-stream")
+    resource = item.get("resource")
+    if item.get("type") == "resource" and isinstance(resource, dict):
+        if isinstance(resource.get("blob"), str):
+            return resource["blob"], resource.get("mimeType", "application/octet-stream")
+    return None, ""
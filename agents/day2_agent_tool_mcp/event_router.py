@@ -0,0 +1,273 @@
+"""Streaming event router for ADK runner events.
+
+Instead of collecting every event from `run_async()` into a list and scanning it
+afterwards, register handlers by part type and let the router call them the
+moment each event arrives. Events are never stored, so memory use stays
+constant no matter how long the run is.
+
+Usage:
+
+    router = EventRouter()
+
+    @router.on_text
+    def show_text(event, part):
+        print(f"Agent > {part.text}")
+
+    await router.consume(runner.run_async(...))
+
+To stop as soon as a tool asks for human confirmation (resumable apps):
+
+    paused = await router.run_until_paused(runner.run_async(...))
+    if paused:
+        ...  # ask the approver, then resume with paused.invocation_id
+"""
+
+import inspect
+from dataclasses import dataclass, field
+from typing import Any
+
+# Part types handlers can register for
+TEXT = "text"
+FUNCTION_CALL = "function_call"
+FUNCTION_RESPONSE = "function_response"
+CODE_RESULT = "code_result"
+INLINE_IMAGE = "inline_image"
+CONFIRMATION_REQUEST = "confirmation_request"
+
+PART_TYPES = (
+    TEXT,
+    FUNCTION_CALL,
+    FUNCTION_RESPONSE,
+    CODE_RESULT,
+    INLINE_IMAGE,
+    CONFIRMATION_REQUEST,
+)
+
+# Special function call emitted by ADK when a tool calls `tool_context.request_confirmation()`
+REQUEST_CONFIRMATION_FUNCTION_CALL_NAME = "adk_request_confirmation"
+
+
+@dataclass
+class InlineImage:
+    """An image found in an event.
+
+    Attributes:
+        data: Base64 string (MCP tool results) or raw bytes (`inline_data` parts)
+        mime_type: Image MIME type, e.g. "image/png"
+        label: Where in the event the image was found
+    """
+
+    data: str | bytes
+    mime_type: str
+    label: str
+
+
+@dataclass
+class ConfirmationRequest:
+    """One `adk_request_confirmation` call: a tool waiting for a human decision.
+
+    Attributes:
+        approval_id: ID of the confirmation call; the approval response must use it
+        tool_name: Tool that asked for confirmation
+        tool_args: Arguments of the paused tool call
+        hint: Message the tool wants shown to the approver
+        payload: Structured data the tool attached to the request
+    """
+
+    approval_id: str
+    tool_name: str
+    tool_args: dict
+    hint: str | None
+    payload: Any
+
+    @classmethod
+    def from_part(cls, part) -> "ConfirmationRequest":
+        args = part.function_call.args or {}
+        original_call = args.get("originalFunctionCall", {})
+        confirmation = args.get("toolConfirmation", {})
+        return cls(
+            approval_id=part.function_call.id,
+            tool_name=original_call.get("name", ""),
+            tool_args=original_call.get("args", {}),
+            hint=confirmation.get("hint"),
+            payload=confirmation.get("payload"),
+        )
+
+
+@dataclass
+class PausedForConfirmation:
+    """Signal that a run paused because one or more tools need human confirmation.
+
+    Attributes:
+        invocation_id: Pass to `run_async(invocation_id=...)` to resume
+        requests: The pending confirmations (one per paused tool call)
+        event: The event that carried the requests
+    """
+
+    invocation_id: str
+    requests: list[ConfirmationRequest] = field(default_factory=list)
+    event: Any = None
+
+    @property
+    def approval_id(self) -> str:
+        return self.requests[0].approval_id
+
+    @classmethod
+    def from_event(cls, event) -> "PausedForConfirmation | None":
+        """Returns the pause signal if the event requests confirmation, else None."""
+        if not event.content or not event.content.parts:
+            return None
+        requests = [
+            ConfirmationRequest.from_part(part)
+            for part in event.content.parts
+            if part.function_call
+            and part.function_call.name == REQUEST_CONFIRMATION_FUNCTION_CALL_NAME
+        ]
+        if not requests:
+            return None
+        return cls(invocation_id=event.invocation_id, requests=requests, event=event)
+
+
+class EventRouter:
+    """Dispatches each part of each event to the handlers registered for its type.
+
+    Handlers are called as `handler(event, part)`, except inline image handlers
+    which are called as `handler(event, image)` with an `InlineImage`.
+    Handlers can be plain functions or coroutines.
+    """
+
+    def __init__(self):
+        self._handlers = {part_type: [] for part_type in PART_TYPES}
+        self.event_count = 0
+
+    def on(self, part_type: str, handler=None):
+        """Registers a handler for a part type. Can be used as a decorator."""
+        if part_type not in self._handlers:
+            raise ValueError(
+                f"Unknown part type '{part_type}'. Expected one of {PART_TYPES}"
+            )
+
+        def register(fn):
+            self._handlers[part_type].append(fn)
+            return fn
+
+        return register(handler) if handler else register
+
+    def on_text(self, handler):
+        return self.on(TEXT, handler)
+
+    def on_function_call(self, handler):
+        return self.on(FUNCTION_CALL, handler)
+
+    def on_function_response(self, handler):
+        return self.on(FUNCTION_RESPONSE, handler)
+
+    def on_code_result(self, handler):
+        return self.on(CODE_RESULT, handler)
+
+    def on_inline_image(self, handler):
+        return self.on(INLINE_IMAGE, handler)
+
+    def on_confirmation_request(self, handler):
+        return self.on(CONFIRMATION_REQUEST, handler)
+
+    async def dispatch(self, event):
+        """Routes every part of a single event to its handlers."""
+        self.event_count += 1
+        if not event.content or not event.content.parts:
+            return
+
+        for i, part in enumerate(event.content.parts):
+            if part.text:
+                await self._emit(TEXT, event, part)
+
+            if part.function_call:
+                if part.function_call.name == REQUEST_CONFIRMATION_FUNCTION_CALL_NAME:
+                    await self._emit(CONFIRMATION_REQUEST, event, part)
+                else:
+                    await self._emit(FUNCTION_CALL, event, part)
+
+            if part.function_response:
+                await self._emit(FUNCTION_RESPONSE, event, part)
+                if self._handlers[INLINE_IMAGE]:
+                    for image in _images_from_function_response(part, i):
+                        await self._emit(INLINE_IMAGE, event, image)
+
+            if part.code_execution_result:
+                await self._emit(CODE_RESULT, event, part)
+
+            if (
+                part.inline_data
+                and part.inline_data.data
+                and (part.inline_data.mime_type or "").startswith("image/")
+            ):
+                await self._emit(
+                    INLINE_IMAGE,
+                    event,
+                    InlineImage(
+                        data=part.inline_data.data,
+                        mime_type=part.inline_data.mime_type,
+                        label=f"content.parts[{i}].inline_data",
+                    ),
+                )
+
+    async def consume(self, events) -> int:
+        """Dispatches events from an async iterator (e.g. `run_async()`) as they arrive.
+
+        Returns:
+            Number of events consumed
+        """
+        count = 0
+        async for event in events:
+            count += 1
+            await self.dispatch(event)
+        return count
+
+    async def run_until_paused(self, events) -> PausedForConfirmation | None:
+        """Dispatches events until a tool asks for confirmation, then stops consuming.
+
+        The runner has already saved the confirmation event to the session when
+        it yields it, so the generator is closed straight away instead of being
+        drained, and the caller can prompt the approver immediately.
+
+        Returns:
+            The pause signal, or None if the run completed without pausing
+        """
+        paused = None
+        try:
+            async for event in events:
+                await self.dispatch(event)
+                paused = PausedForConfirmation.from_event(event)
+                if paused:
+                    break
+        finally:
+            if paused and hasattr(events, "aclose"):
+                await events.aclose()
+        return paused
+
+    async def _emit(self, part_type: str, event, payload):
+        for handler in self._handlers[part_type]:
+            result = handler(event, payload)
+            if inspect.isawaitable(result):
+                await result
+
+
+def _images_from_function_response(part, part_index: int):
+    """Yields images from an MCP tool result (function_response.response["content"])."""
+    resp_data = part.function_response.response
+    if not isinstance(resp_data, dict):
+        return
+
+    content_list = resp_data.get("content", [])
+    if not isinstance(content_list, list):
+        return
+
+    for j, item in enumerate(content_list):
+        if isinstance(item, dict) and item.get("type") == "image":
+            data = item.get("data")
+            if isinstance(data, str) and len(data) > 0:
+                yield InlineImage(
+                    data=data,
+                    mime_type=item.get("mimeType", "image/png"),
+                    label=f"content.parts[{part_index}].function_response.response.content[{j}]",
+                )
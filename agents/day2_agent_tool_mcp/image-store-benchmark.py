@@ -0,0 +1,68 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from image_store import ImageStore
+
+# Per-image save cost as the output folder grows:
+#   glob:  the old save_and_display_image - count image_*.png, then write image_{count+1}.png
+#   store: ImageStore - hash the bytes, atomic write under objects/<xx>/<digest>.png, append manifest
+#
+# Run from this folder:
+#   python image-store-benchmark.py
+#   python image-store-benchmark.py --sizes 10 1000 20000 --saves 200
+
+
+def save_with_glob(out_dir: Path, data: bytes):
+    count = len(list(out_dir.glob("image_*.png"))) + 1
+    with open(out_dir / f"image_{count:03d}.png", "wb") as f:
+        f.write(data)
+
+
+def fill(save, n, image_bytes):
+    for _ in range(n):
+        save(os.urandom(image_bytes))
+
+
+def time_saves(save, saves, image_bytes):
+    payloads = [os.urandom(image_bytes) for _ in range(saves)]
+    timings = []
+    for data in payloads:
+        start = time.perf_counter()
+        save(data)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Image save cost vs folder size")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10, 1_000, 10_000])
+    parser.add_argument("--saves", type=int, default=100, help="Timed saves per folder size")
+    parser.add_argument("--image-bytes", type=int, default=2_000)
+    args = parser.parse_args()
+
+    print(f"{'files':>8}{'glob p50 ms':>14}{'store p50 ms':>14}{'store saves/s':>15}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as glob_dir, tempfile.TemporaryDirectory() as store_dir:
+            glob_path = Path(glob_dir)
+            fill(lambda data: save_with_glob(glob_path, data), size, args.image_bytes)
+            glob_timings = time_saves(
+                lambda data: save_with_glob(glob_path, data), args.saves, args.image_bytes
+            )
+
+            store = ImageStore(store_dir)
+            fill(store.put, size, args.image_bytes)
+            store_timings = time_saves(store.put, args.saves, args.image_bytes)
+
+        store_p50 = statistics.median(store_timings)
+        print(
+            f"{size:>8}{statistics.median(glob_timings) * 1000:>14.3f}"
+            f"{store_p50 * 1000:>14.3f}{1 / store_p50:>15.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
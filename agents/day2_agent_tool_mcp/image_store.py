@@ -0,0 +1,230 @@
+"""Content-addressed store for images returned by tools.
+
+Files are named by the SHA-256 of their bytes and sharded into two-character
+subdirectories, so saving an image never scans the directory and costs the
+same whether the store holds 10 files or a million. Identical images map to
+the same file and are stored once. Writes go to a temporary file that is
+renamed into place, so readers and concurrent savers never see a partial
+image. Every new image is recorded in an append-only `manifest.jsonl`
+(digest, path, size, mime type, source event).
+
+Large tool results can be saved without ever holding the decoded bytes:
+`put_base64` decodes a base64 payload chunk by chunk straight into the temp
+file, and the `aput*` variants do the decoding, hashing and writing on the
+store's thread pool so the event loop keeps running.
+
+Usage:
+
+    store = ImageStore("generated_images")
+    stored = store.put(png_bytes, mime_type="image/png", source={"event_id": event.id})
+    if not stored.duplicate:
+        print(stored.path)
+
+    stored = await store.aput_base64(tool_result_b64, mime_type="image/png")
+"""
+
+import asyncio
+import binascii
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+MANIFEST_NAME = "manifest.jsonl"
+
+# Base64 characters decoded per step (a multiple of 4, so chunks decode independently)
+BASE64_CHUNK_CHARS = 1 << 20
+
+
+def iter_base64_chunks(b64_data: str | bytes, chunk_chars: int = BASE64_CHUNK_CHARS):
+    """Decodes base64 a chunk at a time, so only one decoded chunk is alive at once."""
+    if chunk_chars % 4:
+        raise ValueError("chunk_chars must be a multiple of 4")
+    if isinstance(b64_data, (bytes, bytearray)):
+        # Slicing a memoryview doesn't copy the encoded input
+        b64_data = memoryview(b64_data)
+    for start in range(0, len(b64_data), chunk_chars):
+        yield binascii.a2b_base64(b64_data[start : start + chunk_chars])
+
+
+@dataclass
+class StoredImage:
+    """Where an image lives in the store and what it came from."""
+
+    digest: str
+    path: str
+    size: int
+    mime_type: str
+    source: dict = field(default_factory=dict)
+    saved_at: float = 0.0
+    # True when the bytes were already in the store and nothing was written
+    duplicate: bool = False
+
+    def manifest_record(self) -> dict:
+        record = asdict(self)
+        del record["duplicate"]
+        return record
+
+
+class ImageStore:
+    """Saves images under their content hash and indexes them in a manifest."""
+
+    def __init__(self, root: str | os.PathLike = "generated_images", writers: int = 2):
+        """
+        Args:
+            root: Folder holding objects/ and the manifest
+            writers: Threads used by the async `aput*` methods
+        """
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.manifest_path = self.root / MANIFEST_NAME
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        # Serializes the exists-check / rename / manifest append for one digest
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=writers, thread_name_prefix="image-store"
+        )
+        self.saved = 0
+        self.duplicates = 0
+
+    def path_for(self, digest: str, mime_type: str = "image/png") -> Path:
+        extension = mimetypes.guess_extension(mime_type) or ".bin"
+        return self.objects_dir / digest[:2] / f"{digest}{extension}"
+
+    def contains(self, digest: str, mime_type: str = "image/png") -> bool:
+        return self.path_for(digest, mime_type).exists()
+
+    def put(
+        self, data: bytes, mime_type: str = "image/png", source: dict = None
+    ) -> StoredImage:
+        """Stores `data` unless an identical image is already present.
+
+        Args:
+            data: Raw image bytes
+            mime_type: Used for the file extension and recorded in the manifest
+            source: Where the image came from (event id, author, label, ...)
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest, mime_type)
+        if path.exists():
+            return self._duplicate(digest, path, len(data), mime_type, source)
+
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return self._commit(tmp_path, digest, len(data), mime_type, source)
+
+    def put_chunks(
+        self, chunks, mime_type: str = "image/png", source: dict = None
+    ) -> StoredImage:
+        """Stores a payload given as an iterable of bytes-like chunks.
+
+        The digest is only known at the end, so chunks are hashed while being
+        written to a temp file, which is then renamed to its content address
+        (or dropped if that image already exists).
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.objects_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.path_for(digest.hexdigest(), mime_type).parent.mkdir(exist_ok=True)
+        return self._commit(tmp_path, digest.hexdigest(), size, mime_type, source)
+
+    def put_base64(
+        self, b64_data: str | bytes, mime_type: str = "image/png", source: dict = None
+    ) -> StoredImage:
+        """Decodes a base64 payload into the store without materializing the decoded bytes."""
+        return self.put_chunks(iter_base64_chunks(b64_data), mime_type, source)
+
+    async def aput(
+        self, data: bytes, mime_type: str = "image/png", source: dict = None
+    ) -> StoredImage:
+        """`put` on the store's thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self.put, data, mime_type, source
+        )
+
+    async def aput_base64(
+        self, b64_data: str | bytes, mime_type: str = "image/png", source: dict = None
+    ) -> StoredImage:
+        """`put_base64` on the store's thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self.put_base64, b64_data, mime_type, source
+        )
+
+    def _commit(
+        self, tmp_path: str, digest: str, size: int, mime_type: str, source: dict
+    ) -> StoredImage:
+        """Moves a fully written temp file to its content address and records it."""
+        path = self.path_for(digest, mime_type)
+        with self._lock:
+            if path.exists():
+                os.unlink(tmp_path)
+                return self._duplicate(digest, path, size, mime_type, source)
+            os.replace(tmp_path, path)
+            stored = StoredImage(
+                digest=digest,
+                path=str(path),
+                size=size,
+                mime_type=mime_type,
+                source=source or {},
+                saved_at=time.time(),
+            )
+            self._append_manifest(stored)
+            self.saved += 1
+        return stored
+
+    def _duplicate(self, digest, path, size, mime_type, source) -> StoredImage:
+        self.duplicates += 1
+        return StoredImage(
+            digest=digest,
+            path=str(path),
+            size=size,
+            mime_type=mime_type,
+            source=source or {},
+            duplicate=True,
+        )
+
+    def _append_manifest(self, stored: StoredImage):
+        line = json.dumps(stored.manifest_record(), separators=(",", ":")) + "\n"
+        # One write() on an O_APPEND file, so lines from other processes never interleave
+        fd = os.open(self.manifest_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode())
+        finally:
+            os.close(fd)
+
+    def manifest(self):
+        """Yields every manifest record, oldest first."""
+        if not self.manifest_path.exists():
+            return
+        with open(self.manifest_path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def stats(self) -> dict:
+        return {"saved": self.saved, "duplicates": self.duplicates}
+
+    def close(self):
+        """Waits for pending async writes and stops the writer threads."""
+        self._executor.shutdown(wait=True)
@@ -1,12 +1,13 @@
 import uuid
 import os
+import argparse
 import asyncio
 from google.genai import types
 
 from google.adk.agents import LlmAgent
 from google.adk.models.google_llm import Gemini
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
+from google.adk.sessions import DatabaseSessionService
 
 from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
 from google.adk.tools.tool_context import ToolContext
@@ -14,7 +15,11 @@ from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
 from mcp import StdioServerParameters
 
 from google.adk.apps.app import App, ResumabilityConfig
-from google.adk.tools.function_tool import FunctionTool
+
+from event_router import EventRouter
+from shipping_fast_path import ShippingFastPath
+from tool_idempotency import IdempotencyStore, IdempotentFunctionTool
+from shipping_approvals import ApprovalStore, ResumeMetrics, resume, resume_many
 
 print("✅ ADK components imported successfully.")
 
@@ -134,6 +139,14 @@ print("✅ Long-running functions created!")
 
 
 
+# Well-formed requests ("Ship 10 containers to Rotterdam", or JSON with num_containers
+# and destination) are handled without calling the model; anything else goes to Gemini.
+shipping_fast_path = ShippingFastPath()
+
+# place_shipping_order has side effects: each (invocation, function call, args) runs once,
+# and a repeated call (e.g. a resume re-executing it) gets the recorded result back.
+tool_call_store = IdempotencyStore("shipping_approvals.db")
+
 # Create shipping agent with pausable tool
 shipping_agent = LlmAgent(
     name="shipping_agent",
@@ -149,7 +162,8 @@ shipping_agent = LlmAgent(
       - Number of containers and destination
    4. Keep responses concise but informative
   """,
-    tools=[FunctionTool(func=place_shipping_order)],
+    tools=[IdempotentFunctionTool(place_shipping_order, store=tool_call_store)],
+    before_model_callback=shipping_fast_path.before_model_callback,
 )
 
 print("✅ Shipping Agent created!")
@@ -169,7 +183,10 @@ print("✅ Resumable app created!")
 
 
 
-session_service = InMemorySessionService()
+# Sessions and pending approvals live in SQLite, so a paused order survives a
+# restart and can be resumed by any worker process that shares these files.
+session_service = DatabaseSessionService(db_url="sqlite:///shipping_sessions.db")
+approval_store = ApprovalStore("shipping_approvals.db")
 
 # Create runner with the resumable app
 shipping_runner = Runner(
@@ -181,48 +198,11 @@ print("✅ Runner created!")
 
 
 
-def check_for_approval(events):
-    """Check if events contain an approval request.
+def print_agent_response(event, part):
+    """Print agent's text responses as they arrive."""
+    print(f"Agent > {part.text}")
+
 
-    Returns:
-        dict with approval details or None
-    """
-    for event in events:
-        if event.content and event.content.parts:
-            for part in event.content.parts:
-                if (
-                    part.function_call
-                    and part.function_call.name == "adk_request_confirmation"
-                ):
-                    return {
-                        "approval_id": part.function_call.id,
-                        "invocation_id": event.invocation_id,
-                    }
-    return None
-
-
-
-def print_agent_response(events):
-    """Print agent's text responses from events."""
-    for event in events:
-        if event.content and event.content.parts:
-            for part in event.content.parts:
-                if part.text:
-                    print(f"Agent > {part.text}")
-
-
-
-
-def create_approval_response(approval_info, approved):
-    """Create approval response message."""
-    confirmation_response = types.FunctionResponse(
-        id=approval_info["approval_id"],
-        name="adk_request_confirmation",
-        response={"confirmed": approved},
-    )
-    return types.Content(
-        role="user", parts=[types.Part(function_response=confirmation_response)]
-    )
 
 
 print("✅ Helper functions defined")
@@ -250,49 +230,54 @@ async def run_shipping_workflow(query: str, auto_approve: bool = True):
     )
 
     query_content = types.Content(role="user", parts=[types.Part(text=query)])
-    events = []
 
-    # -----------------------------------------------------------------------------------------------
-    # -----------------------------------------------------------------------------------------------
-    # STEP 1: Send initial request to the Agent. If num_containers > 5, the Agent returns the special `adk_request_confirmation` event
-    async for event in shipping_runner.run_async(
-        user_id="test_user", session_id=session_id, new_message=query_content
-    ):
-        events.append(event)
+    # Handlers run as each event arrives, so nothing is buffered
+    router = EventRouter()
+    router.on_text(print_agent_response)
 
     # -----------------------------------------------------------------------------------------------
     # -----------------------------------------------------------------------------------------------
-    # STEP 2: Loop through all the events generated and check if `adk_request_confirmation` is present.
-    approval_info = check_for_approval(events)
+    # STEP 1: Send initial request to the Agent. If num_containers > 5, the Agent returns the special `adk_request_confirmation` event
+    # STEP 2: The router stops consuming the moment `adk_request_confirmation` arrives and returns a PausedForConfirmation signal.
+    paused = await router.run_until_paused(
+        shipping_runner.run_async(
+            user_id="test_user", session_id=session_id, new_message=query_content
+        )
+    )
 
     # -----------------------------------------------------------------------------------------------
     # -----------------------------------------------------------------------------------------------
-    # STEP 3: If the event is present, it's a large order - HANDLE APPROVAL WORKFLOW
-    if approval_info:
-        print(f"⏸️  Pausing for approval...")
-        print(f"🤔 Human Decision: {'APPROVE ✅' if auto_approve else 'REJECT ❌'}\n")
-
-        # PATH A: Resume the agent by calling run_async() again with the approval decision
-        async for event in shipping_runner.run_async(
+    # STEP 3: If the run paused, it's a large order - HANDLE APPROVAL WORKFLOW
+    if paused:
+        # Record it durably first: from here on any worker can resume it by invocation_id
+        approval_store.record(
+            paused,
+            app_name="shipping_coordinator",
             user_id="test_user",
             session_id=session_id,
-            new_message=create_approval_response(
-                approval_info, auto_approve
-            ),  # Send human decision here
-            invocation_id=approval_info[
-                "invocation_id"
-            ],  # Critical: same invocation_id tells ADK to RESUME
-        ):
-            if event.content and event.content.parts:
-                for part in event.content.parts:
-                    if part.text:
-                        print(f"Agent > {part.text}")
+        )
+        print(f"⏸️  Pausing for approval: {paused.requests[0].hint}")
+        print(f"   Pending as invocation {paused.invocation_id}")
+        print(f"🤔 Human Decision: {'APPROVE ✅' if auto_approve else 'REJECT ❌'}\n")
+
+        # PATH A: Resume the agent by calling run_async() again with the approval decision.
+        # resume() leases the invocation, sends create_approval_response(...) with the
+        # same invocation_id (that is what tells ADK to RESUME) and records the result.
+        resume_router = EventRouter()
+        resume_router.on_text(print_agent_response)
+        outcome = await resume(
+            shipping_runner,
+            approval_store,
+            paused.invocation_id,
+            approved=auto_approve,
+            router=resume_router,
+        )
+        print(f"📦 Order {outcome.status}")
 
     # -----------------------------------------------------------------------------------------------
     # -----------------------------------------------------------------------------------------------
-    else:
-        # PATH B: If the `adk_request_confirmation` is not present - no approval needed - order completed immediately.
-        print_agent_response(events)
+    # PATH B: If the run didn't pause - no approval needed - order completed immediately.
+    # The agent's response was already printed as it streamed in.
 
     print(f"{'='*60}\n")
 
@@ -300,9 +285,48 @@ async def run_shipping_workflow(query: str, auto_approve: bool = True):
 print("✅ Workflow function ready")
 
 
-import asyncio
+async def list_pending_orders():
+    """Prints orders waiting for a decision."""
+    pending = approval_store.list_pending(limit=50)
+    print(f"{len(pending)} pending order(s) {approval_store.count_by_status()}")
+    for order in pending:
+        print(f"  {order.invocation_id}  {order.hint}")
 
-async def main():
+
+async def resume_order(invocation_id: str, approved: bool):
+    """Resumes a paused order from any process, e.g. after a restart."""
+    router = EventRouter()
+    router.on_text(print_agent_response)
+    outcome = await resume(
+        shipping_runner, approval_store, invocation_id, approved=approved, router=router
+    )
+    print(f"📦 {invocation_id}: {outcome.status} {outcome.error or ''}")
+
+
+async def decide_all_pending(approved: bool, max_concurrency: int):
+    """Applies one decision to every pending order, resuming them concurrently."""
+    decisions = {}
+    page = approval_store.list_pending(limit=500)
+    while page:
+        decisions.update({order.invocation_id: approved for order in page})
+        page = approval_store.list_pending(
+            limit=500, created_after=page[-1].created_at, after_invocation_id=page[-1].invocation_id
+        )
+
+    print(f"Resuming {len(decisions)} order(s), {max_concurrency} at a time")
+    metrics = ResumeMetrics()
+    async for outcome in resume_many(
+        shipping_runner,
+        approval_store,
+        decisions,
+        max_concurrency=max_concurrency,
+        metrics=metrics,
+    ):
+        print(f"📦 {outcome.invocation_id}: {outcome.status} ({outcome.seconds * 1000:.0f} ms) {outcome.error or ''}")
+    print(f"📊 {metrics.summary()}")
+
+
+async def demo():
     # Demo 1: It's a small order. Agent receives auto-approved status from tool
     await run_shipping_workflow("Ship 3 containers to Singapore")
 
@@ -312,5 +336,26 @@ async def main():
     # Demo 3: Workflow simulates human decision: REJECT ❌
     await run_shipping_workflow("Ship 8 containers to Los Angeles", auto_approve=False)
 
+    print(f"📊 Fast path: {shipping_fast_path.stats()}")
+    print(f"📊 Order tool calls: {tool_call_store.stats()}")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Shipping coordinator with durable approvals")
+    parser.add_argument("--list-pending", action="store_true", help="Show orders awaiting approval")
+    parser.add_argument("--resume", metavar="INVOCATION_ID", help="Resume a paused order")
+    parser.add_argument("--decide-all", action="store_true", help="Resume every pending order")
+    parser.add_argument("--reject", action="store_true", help="Reject instead of approve when resuming")
+    parser.add_argument("--concurrency", type=int, default=16, help="Orders resumed at once with --decide-all")
+    args = parser.parse_args()
+
+    if args.list_pending:
+        await list_pending_orders()
+    elif args.decide_all:
+        await decide_all_pending(approved=not args.reject, max_concurrency=args.concurrency)
+    elif args.resume:
+        await resume_order(args.resume, approved=not args.reject)
+    else:
+        await demo()
+
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,7 +1,5 @@
 import os
 import asyncio
-from pathlib import Path
-import base64
 
 import warnings
 warnings.filterwarnings("ignore", message=".*asyncgen*")
@@ -11,10 +9,14 @@ from google.genai import types
 from google.adk.agents import LlmAgent
 from google.adk.models.google_llm import Gemini
 from google.adk.runners import InMemoryRunner
-from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
-from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
 from mcp import StdioServerParameters
 
+from event_router import EventRouter
+from binary_refs import offload_binary_content
+from image_store import ImageStore
+from mcp_pool import McpServerPool
+from mcp_tool_cache import DEFAULT_TOOL_CACHE
+
 try:
     from IPython.display import Image as IPImage, display as ipy_display
     USE_IPYTHON = True
@@ -65,120 +67,121 @@ retry_config = types.HttpRetryOptions(
 
 # nodeJS install needed
 # sudo apt update && sudo apt install -y nodejs npm
-# --- 3. MCP tool setup (unchanged) ---
-mcp_image_server = McpToolset(
-    connection_params=StdioConnectionParams(
-        server_params=StdioServerParameters(
-            command="npx",
-            args=[
-                "-y",
-                "@modelcontextprotocol/server-everything",
-            ],
-        ),
-        timeout=30,
-    )
+# --- 3. MCP tool setup ---
+# The pool keeps the server process warm, so npx/Node boot is paid once instead of per run.
+# Several agents can share the same pool via mcp_pool.toolset(); the server's tool
+# schemas are translated once and reused until it sends tools/list_changed.
+mcp_pool = McpServerPool(
+    StdioServerParameters(
+        command="npx",
+        args=[
+            "-y",
+            "@modelcontextprotocol/server-everything",
+        ],
+    ),
+    size=1,
+    timeout=30,
 )
+# No Node.js or npm access? The pure-Python stand-in serves the same tools offline:
+# from mcp_standin_server import stdio_server_params
+# mcp_pool = McpServerPool(stdio_server_params(), size=1, timeout=30)
+mcp_image_server = mcp_pool.toolset()
 print("✅ MCP Tool created")
 
-# --- 4. Agent ---
+# Images are named by content hash under generated_images/objects/, indexed in
+# generated_images/manifest.jsonl
+image_store = ImageStore("generated_images")
+
+# --- 4. Helper: announce saved image + optional inline display ---
+def show_saved_image(stored, tool_context=None):
+    """Prints where an image was saved; optionally displays if IPython available."""
+    if stored.duplicate:
+        # Same bytes already saved (e.g. the image repeated in a later event)
+        return
+    print(f"[✅ Saved image] {stored.path} (from {stored.source.get('label', '')})")
+
+    # Try inline display if in Jupyter-like environment
+    if USE_IPYTHON:
+        ipy_display(IPImage(filename=stored.path))
+
+
+# --- 5. Agent ---
+# Tool results carry images as base64. The callback streams them to disk off the
+# event loop and hands the agent a file reference instead of the inline blob.
 image_agent = LlmAgent(
     model=Gemini(model="gemini-3-flash-preview", retry_options=retry_config),
     name="image_agent",
     instruction="Use the MCP Tool to generate images for user queries",
     tools=[mcp_image_server],
+    after_tool_callback=offload_binary_content(image_store, on_saved=show_saved_image),
 )
 runner = InMemoryRunner(agent=image_agent)
 
-# --- 5. Helper: save image + optional inline display ---
-def save_and_display_image(b64_str: str, label="") -> bool:
-    """Saves Base64 image to disk; optionally displays if IPython available."""
-    try:
-        img_bytes = base64.b64decode(b64_str)
-        out_dir = Path("generated_images")
-        out_dir.mkdir(exist_ok=True)
-
-        # Generate unique filename
-        count = len(list(out_dir.glob("image_*.png"))) + 1
-        filepath = str(out_dir / f"image_{count:03d}.png")
-
-        with open(filepath, "wb") as f:
-            f.write(img_bytes)
-
-        print(f"[✅ Saved image] {filepath} (from {label})")
-        
-        # Try inline display if in Jupyter-like environment
-        if USE_IPYTHON and b64_str:
-            ipy_display(IPImage(data=img_bytes))
-        return True
-
-    except Exception as e:
-        print(f"[⚠️ Image save/display error] {e}")
-        return False
-
-
-# --- 6. Extract image from event (robust & minimal) ---
-def extract_images_from_event(event, seen: set):
-    """Extract images from a single ADK event, using known MCP structure."""
-    # Early exit if no parts
-    if not hasattr(event, "content") or not event.content:
-        return
 
-    for i, part in enumerate(event.content.parts):
-        # Only process tool result parts (not model text parts)
-        func_resp = getattr(part, "function_response", None)
-        if not func_resp:
-            continue
-        
-        # MCP response is always in function_response.response["content"]
-        resp_data = func_resp.response
-        if not isinstance(resp_data, dict):
-            continue  # Skip non-dict responses
-
-        content_list = resp_data.get("content", [])
-        if not isinstance(content_list, list):
-            continue
-
-        # Look for image part (typically index 1)
-        for j, item in enumerate(content_list):
-            if isinstance(item, dict) and item.get("type") == "image":
-                data = item.get("data")
-                if isinstance(data, str) and len(data) > 0 and data not in seen:
-                    seen.add(data)
-                    label = f"content.parts[{i}].function_response.response.content[{j}]"
-                    save_and_display_image(data, label=label)
-
-
-# --- 7. Run agent and extract images ---
-async def run_debug():
-    print("\n🧠 Running agent...")
-    
-    # Get events (ADK returns list of Event)
-    events = await runner.run_debug("Provide a sample tiny image", verbose=True)
+# --- 6. Route events as they stream in ---
+def build_event_router() -> EventRouter:
+    """Saves any image still inline in an event (e.g. model output); the store skips duplicates."""
+    router = EventRouter()
 
-    # If result is string (fallback), wrap in list
-    if isinstance(events, str):
-        events = [types.Content(role="user", parts=[types.Part(text=events)])]
+    @router.on_inline_image
+    async def save_image(event, image):
+        source = {"event_id": event.id, "author": event.author, "label": image.label}
+        try:
+            if isinstance(image.data, bytes):
+                stored = await image_store.aput(image.data, image.mime_type, source)
+            else:
+                stored = await image_store.aput_base64(image.data, image.mime_type, source)
+            show_saved_image(stored)
+        except Exception as e:
+            print(f"[⚠️ Image save/display error] {e}")
 
-    print(f"\n📊 Received {len(events)} event(s)")
+    @router.on_function_response
+    def show_references(event, part):
+        for item in (part.function_response.response or {}).get("content", []):
+            if isinstance(item, dict) and item.get("type") == "resource_link":
+                print(f"[📎 Agent got reference] {item['uri']} ({item['size']} bytes)")
 
-    seen_images = set()
+    @router.on_function_call
+    def show_tool_call(event, part):
+        print(f"[🔧 Tool call] {part.function_call.name}")
 
-    for i, event in enumerate(events):
-        part_type = type(event).__name__
-        print(f"\n[Event {i+1}] Type: {part_type}")
+    return router
 
-        # Extract text (if any)
-        if hasattr(event, "content") and event.content:
-            for part in getattr(event.content, "parts", []):
-                text = getattr(part, "text", None)
-                # if text:
-                    # print(f"[Text] {text}")
 
-        # ✅ Now extract images cleanly
-        extract_images_from_event(event, seen_images)
+# --- 7. Run agent and save images as they arrive ---
+async def run_debug():
+    # Warm the MCP server up front so the agent's first tool call doesn't wait for npx/Node boot
+    await mcp_pool.start()
+    print(f"✅ MCP server pool warm in {mcp_pool.warmup_seconds:.2f}s")
 
+    print("\n🧠 Running agent...")
+
+    query = "Provide a sample tiny image"
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name, user_id="debug_user_id"
+    )
+    print(f"\nUser > {query}")
+
+    router = build_event_router()
+    router.on_text(lambda event, part: print(f"Agent > {part.text}"))
+
+    event_count = await router.consume(
+        runner.run_async(
+            user_id="debug_user_id",
+            session_id=session.id,
+            new_message=types.Content(role="user", parts=[types.Part(text=query)]),
+        )
+    )
+
+    print(f"\n📊 Received {event_count} event(s)")
+    print(f"📊 MCP pool: {mcp_pool.stats()}")
+    print(f"📊 Tool listing cache: {DEFAULT_TOOL_CACHE.stats()}")
+    print(f"📊 Image store: {image_store.stats()}")
     print("\n✅ Done. Images saved to `generated_images/` folder.")
 
+    await mcp_pool.close()
+    image_store.close()
+
 # --- 8. Run! ---
 if __name__ == "__main__":
     try:
@@ -220,5 +223,15 @@ if __name__ == "__main__":
 #         },
 #     ),
 # )
+# Remote servers can be pooled too: one long-lived HTTP session on keep-alive
+# connections, reused by every run instead of reconnecting per invocation.
+# github_pool = McpServerPool(
+#     StreamableHTTPConnectionParams(
+#         url="https://api.githubcopilot.com/mcp/",
+#         headers={"Authorization": f"Bearer {GITHUB_TOKEN}"},
+#     ),
+#     size=1,
+# )
+# github_tools = github_pool.toolset()
 # More resources: ADK Third-party Tools Documentation
 # https://google.github.io/adk-docs/tools/third-party/
@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+import warnings
+warnings.filterwarnings("ignore", message=".*asyncgen*")
+
+from google.adk.tools.mcp_tool.mcp_session_manager import (
+    MCPSessionManager,
+    StdioConnectionParams,
+)
+from mcp import StdioServerParameters
+
+from mcp_pool import McpServerPool
+from mcp_standin_server import stdio_server_params
+
+print("✅ MCP components imported successfully.")
+
+# Compares time-to-first-tool-call for:
+#   COLD: what McpToolset does today - spawn the server, initialize, list tools, call a tool
+#   POOL: borrow an already-initialized session from McpServerPool, list tools, call a tool
+#
+# Run from this folder:
+#   python mcp-pool-benchmark.py --runs 5
+#   python mcp-pool-benchmark.py --standin        # pure-Python server, no Node.js needed
+#   python mcp-pool-benchmark.py --command python --args my_server.py --tool echo
+# For stdio vs streamable-HTTP latency and throughput under concurrency see mcp-transport-benchmark.py
+
+
+async def first_tool_call_cold(server_params, tool_name, tool_args, timeout):
+    """Spawns a fresh server the way McpToolset does and times the first tool call."""
+    start = time.perf_counter()
+    manager = MCPSessionManager(
+        connection_params=StdioConnectionParams(server_params=server_params, timeout=timeout)
+    )
+    try:
+        session = await manager.create_session()
+        await session.list_tools()
+        await session.call_tool(tool_name, tool_args)
+        return time.perf_counter() - start
+    finally:
+        await manager.close()
+
+
+async def first_tool_call_pooled(pool, tool_name, tool_args):
+    """Borrows a warm session from the pool and times the first tool call."""
+    start = time.perf_counter()
+    session = await pool.acquire()
+    await session.list_tools()
+    await session.call_tool(tool_name, tool_args)
+    return time.perf_counter() - start
+
+
+def print_timings(label, timings):
+    print(
+        f"{label:<6} runs={len(timings)}"
+        f"  p50={statistics.median(timings) * 1000:8.1f} ms"
+        f"  mean={statistics.mean(timings) * 1000:8.1f} ms"
+        f"  max={max(timings) * 1000:8.1f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Cold MCP spawn vs warm server pool")
+    parser.add_argument("--command", default="npx")
+    parser.add_argument(
+        "--args", nargs="*", default=["-y", "@modelcontextprotocol/server-everything"]
+    )
+    parser.add_argument(
+        "--standin", action="store_true", help="Use the pure-Python stand-in server"
+    )
+    parser.add_argument("--tool", default="echo", help="Tool to call")
+    parser.add_argument("--message", default="ping", help="Message passed to the tool")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    if args.standin:
+        server_params = stdio_server_params()
+    else:
+        server_params = StdioServerParameters(command=args.command, args=args.args)
+    tool_args = {"message": args.message}
+
+    print(
+        f"\n🥶 Cold spawn x{args.runs}: {server_params.command} {' '.join(server_params.args)}"
+    )
+    cold = []
+    for _ in range(args.runs):
+        cold.append(
+            await first_tool_call_cold(server_params, args.tool, tool_args, args.timeout)
+        )
+
+    print(f"\n🔥 Warm pool x{args.runs} (size={args.pool_size})")
+    async with McpServerPool(
+        server_params, size=args.pool_size, timeout=args.timeout
+    ) as pool:
+        pooled = []
+        for _ in range(args.runs):
+            pooled.append(await first_tool_call_pooled(pool, args.tool, tool_args))
+        stats = pool.stats()
+
+    print(f"\n{'='*60}")
+    print("Time to first tool call")
+    print_timings("cold", cold)
+    print_timings("pool", pooled)
+    print(f"Pool warmup (paid once): {stats['warmup_seconds'] * 1000:.1f} ms")
+    print(f"Pool stats: {stats}")
+    print(f"Speedup (p50): {statistics.median(cold) / statistics.median(pooled):.1f}x")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
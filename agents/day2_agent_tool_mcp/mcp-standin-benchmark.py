@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+import warnings
+warnings.filterwarnings("ignore", message=".*asyncgen*")
+
+from google.adk.tools.mcp_tool.mcp_session_manager import (
+    MCPSessionManager,
+    StdioConnectionParams,
+    StreamableHTTPConnectionParams,
+)
+from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
+
+from mcp_standin_server import http_server_thread, stdio_server_params
+
+print("✅ MCP components imported successfully.")
+
+# Offline MCP benchmarks against the pure-Python stand-in server (no Node.js, no network):
+#   1. McpToolset overhead: tool listing + schema translation, and MCPTool calls vs raw ClientSession calls
+#   2. Transport cost: echo latency over stdio vs streamable HTTP
+#   3. Large-image throughput: getLargeImage at several payload sizes over both transports
+#
+# Run from this folder:
+#   python mcp-standin-benchmark.py
+#   python mcp-standin-benchmark.py --latency-ms 20 --calls 200 --image-sizes 100000 10000000
+
+
+def p50_ms(timings):
+    return statistics.median(timings) * 1000
+
+
+async def time_calls(call, n):
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        await call()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def bench_toolset_overhead(connection_params, calls):
+    """Compares going through McpToolset/MCPTool with calling the MCP session directly."""
+    toolset = McpToolset(connection_params=connection_params)
+    try:
+        start = time.perf_counter()
+        tools = {tool.name: tool for tool in await toolset.get_tools()}
+        first_get_tools = time.perf_counter() - start
+
+        # Every runner pays this on its first LLM request
+        get_tools = await time_calls(toolset.get_tools, calls)
+
+        session = await toolset._mcp_session_manager.create_session()
+        raw = await time_calls(
+            lambda: session.call_tool("echo", {"message": "ping"}), calls
+        )
+        echo_tool = tools["echo"]
+        wrapped = await time_calls(
+            lambda: echo_tool.run_async(args={"message": "ping"}, tool_context=None),
+            calls,
+        )
+    finally:
+        await toolset.close()
+
+    print(f"  first get_tools (connect + list + translate): {first_get_tools * 1000:8.2f} ms")
+    print(f"  get_tools (list + translate)               p50 {p50_ms(get_tools):8.2f} ms")
+    print(f"  echo via ClientSession.call_tool           p50 {p50_ms(raw):8.2f} ms")
+    print(f"  echo via MCPTool.run_async                 p50 {p50_ms(wrapped):8.2f} ms")
+
+
+async def bench_transport(label, connection_params, calls, image_sizes):
+    """Echo latency and large-image throughput over one transport."""
+    manager = MCPSessionManager(connection_params=connection_params)
+    try:
+        session = await manager.create_session()
+        echo = await time_calls(
+            lambda: session.call_tool("echo", {"message": "ping"}), calls
+        )
+        print(f"  {label:<6} echo p50 {p50_ms(echo):8.2f} ms")
+
+        for size in image_sizes:
+            # Warm the server's image cache so we time the transport, not PNG generation
+            await session.call_tool("getLargeImage", {"size_bytes": size})
+            timings = await time_calls(
+                lambda: session.call_tool("getLargeImage", {"size_bytes": size}), 3
+            )
+            mb_per_s = size / statistics.median(timings) / 1_000_000
+            print(
+                f"  {label:<6} getLargeImage {size / 1_000_000:7.2f} MB"
+                f"  p50 {p50_ms(timings):9.2f} ms  {mb_per_s:8.2f} MB/s"
+            )
+    finally:
+        await manager.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Offline MCP benchmarks")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument(
+        "--image-sizes", type=int, nargs="*", default=[100_000, 1_000_000, 10_000_000]
+    )
+    args = parser.parse_args()
+
+    stdio_params = StdioConnectionParams(
+        server_params=stdio_server_params(latency_ms=args.latency_ms), timeout=30
+    )
+
+    print(f"\n{'='*60}")
+    print("1. McpToolset overhead (stdio)")
+    await bench_toolset_overhead(stdio_params, args.calls)
+
+    print(f"\n2-3. Transport cost and large-image throughput")
+    await bench_transport("stdio", stdio_params, args.calls, args.image_sizes)
+    with http_server_thread(latency_ms=args.latency_ms) as url:
+        http_params = StreamableHTTPConnectionParams(url=url, timeout=30)
+        await bench_transport("http", http_params, args.calls, args.image_sizes)
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
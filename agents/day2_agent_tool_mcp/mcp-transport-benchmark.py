@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+import warnings
+warnings.filterwarnings("ignore", message=".*asyncgen*")
+
+from google.adk.tools.mcp_tool.mcp_session_manager import (
+    MCPSessionManager,
+    StreamableHTTPConnectionParams,
+)
+
+from mcp_pool import McpServerPool
+from mcp_standin_server import http_server_thread, stdio_server_params
+
+print("✅ MCP components imported successfully.")
+
+# Compares MCP transports for tool-call latency and throughput at 1, 10 and 100
+# concurrent in-flight calls, all multiplexed over ONE long-lived session:
+#   stdio: pooled server process talking over stdin/stdout
+#   http:  pooled streamable-HTTP session on a keep-alive connection pool
+# It also times what reconnecting on every agent invocation costs over HTTP
+# (new session + initialize + call) versus reusing the pooled session.
+#
+# Runs offline against the pure-Python stand-in server. From this folder:
+#   python mcp-transport-benchmark.py
+#   python mcp-transport-benchmark.py --latency-ms 20 --calls 1000 --concurrency 1 10 100
+#   python mcp-transport-benchmark.py --url https://my-server/mcp   # real remote server (http only)
+
+
+def percentile_ms(timings, pct):
+    ordered = sorted(timings)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index] * 1000
+
+
+async def run_concurrent(session, calls, concurrency, tool_name, tool_args):
+    """Issues `calls` tool calls with at most `concurrency` in flight on one session.
+
+    Returns:
+        (per-call latencies, wall-clock seconds)
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def one_call():
+        async with semaphore:
+            start = time.perf_counter()
+            await session.call_tool(tool_name, tool_args)
+            timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_call() for _ in range(calls)))
+    return timings, time.perf_counter() - start
+
+
+async def bench_pool(label, pool, calls, concurrency_levels, tool_name, tool_args):
+    async with pool:
+        session = await pool.acquire()
+        # Warm up the connection (and, for HTTP, the keep-alive pool)
+        await run_concurrent(session, max(concurrency_levels), max(concurrency_levels), tool_name, tool_args)
+
+        rows = []
+        for concurrency in concurrency_levels:
+            timings, elapsed = await run_concurrent(
+                session, calls, concurrency, tool_name, tool_args
+            )
+            rows.append(
+                {
+                    "transport": label,
+                    "concurrency": concurrency,
+                    "p50_ms": percentile_ms(timings, 50),
+                    "p99_ms": percentile_ms(timings, 99),
+                    "calls_per_s": calls / elapsed,
+                }
+            )
+        print(f"  {label:<6} pool warmup {pool.warmup_seconds * 1000:8.1f} ms  stats={pool.stats()}")
+    return rows
+
+
+async def bench_http_reconnect(url, invocations, tool_name, tool_args):
+    """Per-invocation cost when every agent run opens its own HTTP session, as McpToolset does."""
+    timings = []
+    for _ in range(invocations):
+        start = time.perf_counter()
+        manager = MCPSessionManager(
+            connection_params=StreamableHTTPConnectionParams(url=url, timeout=30)
+        )
+        try:
+            session = await manager.create_session()
+            await session.call_tool(tool_name, tool_args)
+        finally:
+            await manager.close()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def bench_http_reused(pool, invocations, tool_name, tool_args):
+    """Per-invocation cost when each agent run borrows the pool's long-lived HTTP session."""
+    timings = []
+    async with pool:
+        for _ in range(invocations):
+            start = time.perf_counter()
+            session = await pool.acquire()
+            await session.call_tool(tool_name, tool_args)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def print_rows(rows):
+    print(f"  {'transport':<10}{'in-flight':>10}{'p50 ms':>10}{'p99 ms':>10}{'calls/s':>12}")
+    for row in rows:
+        print(
+            f"  {row['transport']:<10}{row['concurrency']:>10}"
+            f"{row['p50_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['calls_per_s']:>12.0f}"
+        )
+
+
+async def run_benchmarks(args, url):
+    tool_args = {"message": args.message}
+    rows = []
+
+    print(f"\n{'='*60}")
+    print(f"1. Concurrent calls over one session ({args.calls} calls per level)")
+    if not args.url:
+        stdio_pool = McpServerPool(
+            stdio_server_params(latency_ms=args.latency_ms), size=1, timeout=30
+        )
+        rows += await bench_pool(
+            "stdio", stdio_pool, args.calls, args.concurrency, args.tool, tool_args
+        )
+    http_pool = McpServerPool(
+        StreamableHTTPConnectionParams(url=url, timeout=30),
+        size=1,
+        timeout=30,
+        http_max_connections=max(args.concurrency),
+    )
+    rows += await bench_pool(
+        "http", http_pool, args.calls, args.concurrency, args.tool, tool_args
+    )
+    print()
+    print_rows(rows)
+
+    print(f"\n2. HTTP session reuse across {args.invocations} agent invocations")
+    reconnect = await bench_http_reconnect(url, args.invocations, args.tool, tool_args)
+    reused = await bench_http_reused(
+        McpServerPool(StreamableHTTPConnectionParams(url=url, timeout=30), size=1),
+        args.invocations,
+        args.tool,
+        tool_args,
+    )
+    print(f"  new session per invocation  p50 {statistics.median(reconnect) * 1000:8.2f} ms")
+    print(f"  pooled keep-alive session   p50 {statistics.median(reused) * 1000:8.2f} ms")
+    print(f"  Speedup (p50): {statistics.median(reconnect) / statistics.median(reused):.1f}x")
+    print(f"{'='*60}\n")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="stdio vs streamable-HTTP MCP transport")
+    parser.add_argument("--url", help="Benchmark a remote streamable-HTTP server instead of the stand-in")
+    parser.add_argument("--tool", default="echo", help="Tool to call")
+    parser.add_argument("--message", default="ping", help="Message passed to the tool")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Stand-in server delay per call")
+    parser.add_argument("--calls", type=int, default=500, help="Calls per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 10, 100])
+    parser.add_argument("--invocations", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.url:
+        await run_benchmarks(args, args.url)
+        return
+    with http_server_thread(latency_ms=args.latency_ms) as url:
+        await run_benchmarks(args, url)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
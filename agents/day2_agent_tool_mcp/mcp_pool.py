@@ -0,0 +1,368 @@
+"""Warm pool of MCP server sessions shared across agents.
+
+Building an `McpToolset` with `StdioConnectionParams(command="npx", args=["-y", ...])`
+spawns a fresh server on every run, which pays npm resolution plus Node boot
+before the first tool is available. `McpServerPool` starts N server processes
+once, keeps them initialized and health-checked, restarts any that crash, and
+multiplexes tool calls from every toolset created with `pool.toolset()` across
+the warm sessions.
+
+Remote servers work the same way over streamable HTTP: each slot keeps one
+long-lived MCP session open on a keep-alive `httpx` client, so agent
+invocations reuse the session and its TCP connections instead of re-running
+the `initialize` handshake, and concurrent tool calls are in flight over the
+same session at once.
+
+Usage:
+
+    pool = McpServerPool(StdioServerParameters(command="npx", args=[...]), size=2)
+    # or a remote server
+    pool = McpServerPool(StreamableHTTPConnectionParams(url="https://.../mcp"), size=1)
+    agent = LlmAgent(..., tools=[pool.toolset()])
+
+    await pool.start()   # Optional: otherwise the first tool call starts the pool
+    ...
+    await pool.close()
+"""
+
+import asyncio
+import itertools
+import logging
+import sys
+import time
+from datetime import timedelta
+from typing import TextIO
+
+import httpx
+from google.adk.tools.mcp_tool.mcp_session_manager import (
+    StdioConnectionParams,
+    StreamableHTTPConnectionParams,
+)
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from mcp_tool_cache import CachedMcpToolset
+
+logger = logging.getLogger(__name__)
+
+# httpx keeps only 20 idle connections by default; concurrent tool calls on one
+# session each hold a POST open, so allow enough to reuse them all
+DEFAULT_HTTP_MAX_CONNECTIONS = 100
+
+
+def keep_alive_http_client_factory(max_connections: int = DEFAULT_HTTP_MAX_CONNECTIONS):
+    """Builds an `httpx_client_factory` for `streamablehttp_client` that keeps connections alive.
+
+    Every connection opened for a concurrent call goes back to the pool
+    instead of being closed, so the next burst of calls skips the TCP (and TLS)
+    handshake.
+    """
+
+    def factory(headers=None, timeout=None, auth=None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            headers=headers,
+            timeout=timeout if timeout is not None else httpx.Timeout(30.0),
+            auth=auth,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=60,
+            ),
+        )
+
+    return factory
+
+
+class _ServerSlot:
+    """One server process (or remote connection) and the client session on it."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.session: ClientSession | None = None
+        self.server_info = None
+        self.ready = asyncio.Event()
+        self.stop = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        self.restarts = 0
+        self.last_ready_seconds = None
+
+    def is_healthy(self) -> bool:
+        if not self.ready.is_set() or self.session is None:
+            return False
+        # Same check ADK's MCPSessionManager uses to detect a dead server
+        return not (
+            self.session._read_stream._closed or self.session._write_stream._closed
+        )
+
+
+class McpServerPool:
+    """Keeps `size` MCP sessions warm and hands them out round-robin."""
+
+    def __init__(
+        self,
+        server_params: StdioServerParameters | StreamableHTTPConnectionParams,
+        size: int = 2,
+        timeout: float = 30,
+        health_check_interval: float = 10,
+        restart_backoff: float = 1,
+        errlog: TextIO = sys.stderr,
+        http_max_connections: int = DEFAULT_HTTP_MAX_CONNECTIONS,
+    ):
+        """
+        Args:
+            server_params: Command used to start each server process, or the
+                streamable HTTP endpoint of a remote server
+            size: Number of server processes (or HTTP sessions) to keep warm
+            timeout: Seconds to wait for a server to start and for each request
+            health_check_interval: Seconds between pings to each server
+            restart_backoff: Seconds to wait before restarting a crashed server
+            errlog: Where server processes write their stderr
+            http_max_connections: Keep-alive connections per HTTP session
+        """
+        if size < 1:
+            raise ValueError("McpServerPool size must be at least 1")
+
+        self.server_params = server_params
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.restart_backoff = restart_backoff
+        self._errlog = errlog
+        self._http_client_factory = keep_alive_http_client_factory(http_max_connections)
+
+        self._slots = [_ServerSlot(i) for i in range(size)]
+        self._round_robin = itertools.cycle(range(size))
+        self._start_lock = asyncio.Lock()
+        self._health_task: asyncio.Task | None = None
+        self._started = False
+        self._closing = False
+
+        self.warmup_seconds = None
+        self.acquired = 0
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        """Spawns every server and waits until all of them are initialized.
+
+        Starting a started pool does nothing. If the servers aren't all up
+        within `timeout`, every one of them is stopped again before the
+        TimeoutError is raised, so a later `start()` begins from scratch.
+        """
+        async with self._start_lock:
+            if self._started:
+                return
+            self._closing = False
+            start = time.perf_counter()
+            for slot in self._slots:
+                slot.task = asyncio.create_task(self._run_slot(slot))
+            waiters = [asyncio.create_task(slot.ready.wait()) for slot in self._slots]
+            try:
+                _, not_ready = await asyncio.wait(waiters, timeout=self.timeout)
+                if not_ready:
+                    raise TimeoutError(
+                        f"{len(not_ready)} of {self.size} MCP server(s) didn't start within {self.timeout}s"
+                    )
+            except BaseException:
+                # Timed out or cancelled: don't leave servers running (or still
+                # starting) that no one will ever stop
+                await self._stop_slots(cancel=True)
+                raise
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+            self.warmup_seconds = time.perf_counter() - start
+            self._health_task = asyncio.create_task(self._health_check_loop())
+            self._started = True
+            logger.info(
+                "MCP pool started %d server(s) in %.2fs", self.size, self.warmup_seconds
+            )
+
+    async def close(self):
+        """Stops the health checks and every server process."""
+        # Under the start lock, so a start() in progress finishes (or fails) first
+        async with self._start_lock:
+            if self._health_task:
+                self._health_task.cancel()
+                await asyncio.gather(self._health_task, return_exceptions=True)
+                self._health_task = None
+            await self._stop_slots()
+            self._started = False
+
+    async def _stop_slots(self, cancel: bool = False):
+        """Ends every slot's task. `cancel` also interrupts servers still starting up."""
+        self._closing = True
+        for slot in self._slots:
+            slot.stop.set()
+            if cancel and slot.task:
+                slot.task.cancel()
+        await asyncio.gather(
+            *(slot.task for slot in self._slots if slot.task), return_exceptions=True
+        )
+        for slot in self._slots:
+            slot.task = None
+
+    async def acquire(self) -> ClientSession:
+        """Returns an initialized session from a healthy server.
+
+        Sessions are shared: the MCP client multiplexes concurrent requests over
+        one connection, so callers never hold a session exclusively.
+        """
+        if not self._started:
+            await self.start()
+
+        deadline = time.perf_counter() + self.timeout
+        while True:
+            for _ in range(self.size):
+                slot = self._slots[next(self._round_robin)]
+                if slot.is_healthy():
+                    self.acquired += 1
+                    return slot.session
+                if slot.ready.is_set():
+                    # Server died between health checks - restart it now
+                    self._restart(slot)
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise TimeoutError("No healthy MCP server available in the pool")
+            # Wait for any server to come back
+            waiters = [asyncio.create_task(slot.ready.wait()) for slot in self._slots]
+            try:
+                await asyncio.wait(
+                    waiters, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+
+    def toolset(self, **kwargs) -> CachedMcpToolset:
+        """Creates a toolset whose tools run on this pool's warm servers.
+
+        Tool listings are cached per server version, so many toolsets on the
+        same pool only translate the server's tool schemas once.
+
+        Args:
+            **kwargs: Extra `CachedMcpToolset` arguments (tool_filter, tool_name_prefix, cache, ...)
+        """
+        if self.is_http:
+            connection_params = self.server_params
+        else:
+            connection_params = StdioConnectionParams(
+                server_params=self.server_params, timeout=self.timeout
+            )
+        toolset = CachedMcpToolset(
+            connection_params=connection_params,
+            errlog=self._errlog,
+            **kwargs,
+        )
+        # The toolset (and every MCPTool it creates) asks this manager for sessions
+        toolset._mcp_session_manager = _PooledSessionManager(self)
+        return toolset
+
+    @property
+    def is_http(self) -> bool:
+        return isinstance(self.server_params, StreamableHTTPConnectionParams)
+
+    def stats(self) -> dict:
+        """Pool health and usage counters."""
+        return {
+            "size": self.size,
+            "healthy": sum(slot.is_healthy() for slot in self._slots),
+            "restarts": sum(slot.restarts for slot in self._slots),
+            "acquired": self.acquired,
+            "warmup_seconds": self.warmup_seconds,
+            "transport": "http" if self.is_http else "stdio",
+        }
+
+    def server_version(self, session: ClientSession) -> str | None:
+        """Name and version the server reported when the session was initialized."""
+        for slot in self._slots:
+            if slot.session is session and slot.server_info:
+                return f"{slot.server_info.name}/{slot.server_info.version}"
+        return None
+
+    def _restart(self, slot: _ServerSlot):
+        slot.ready.clear()
+        slot.stop.set()
+
+    def _connect(self):
+        """Opens the transport for one slot: a server process or an HTTP session."""
+        if not self.is_http:
+            return stdio_client(self.server_params, errlog=self._errlog)
+        params = self.server_params
+        return streamablehttp_client(
+            url=params.url,
+            headers=params.headers,
+            timeout=timedelta(seconds=params.timeout),
+            sse_read_timeout=timedelta(seconds=params.sse_read_timeout),
+            terminate_on_close=params.terminate_on_close,
+            httpx_client_factory=self._http_client_factory,
+        )
+
+    async def _run_slot(self, slot: _ServerSlot):
+        """Owns one server session for the lifetime of the pool, restarting it when it dies."""
+        while not self._closing:
+            slot.stop.clear()
+            spawn_start = time.perf_counter()
+            try:
+                async with self._connect() as streams:
+                    # stdio yields (read, write); HTTP adds a session-id getter
+                    read, write = streams[0], streams[1]
+                    async with ClientSession(
+                        read, write, read_timeout_seconds=timedelta(seconds=self.timeout)
+                    ) as session:
+                        init_result = await session.initialize()
+                        slot.server_info = init_result.serverInfo
+                        slot.session = session
+                        slot.last_ready_seconds = time.perf_counter() - spawn_start
+                        slot.ready.set()
+                        await slot.stop.wait()
+            except Exception as e:
+                logger.warning("MCP server %d failed: %s", slot.index, e)
+            finally:
+                slot.ready.clear()
+                slot.session = None
+
+            if self._closing:
+                break
+            slot.restarts += 1
+            logger.info("Restarting MCP server %d", slot.index)
+            await asyncio.sleep(self.restart_backoff)
+
+    async def _health_check_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            for slot in self._slots:
+                if not slot.ready.is_set():
+                    continue
+                try:
+                    if not slot.is_healthy():
+                        raise ConnectionError("stream closed")
+                    await asyncio.wait_for(slot.session.send_ping(), self.timeout)
+                except Exception as e:
+                    logger.warning("MCP server %d failed health check: %s", slot.index, e)
+                    self._restart(slot)
+
+
+class _PooledSessionManager:
+    """Stands in for ADK's MCPSessionManager and borrows sessions from the pool."""
+
+    def __init__(self, pool: McpServerPool):
+        self._pool = pool
+
+    async def create_session(self, headers=None) -> ClientSession:
+        return await self._pool.acquire()
+
+    def server_version(self, session: ClientSession) -> str | None:
+        return self._pool.server_version(session)
+
+    async def close(self):
+        # Sessions belong to the pool, which outlives individual toolsets
+        pass
@@ -0,0 +1,224 @@
+"""Pure-Python stand-in for `@modelcontextprotocol/server-everything`.
+
+Implements the tools our agents use (echo, add, getTinyImage) plus a
+getLargeImage tool for payload tests, with configurable latency and image
+size. Needs neither Node.js nor network access, so McpToolset overhead,
+transport costs and large-image throughput can be benchmarked anywhere.
+
+Run it directly:
+
+    python mcp_standin_server.py                                  # stdio
+    python mcp_standin_server.py --transport streamable-http --port 8765
+    python mcp_standin_server.py --latency-ms 50 --image-bytes 5000000
+
+Or from code:
+
+    McpToolset(connection_params=StdioConnectionParams(server_params=stdio_server_params()))
+
+    with http_server_thread(port=8765) as url:
+        McpToolset(connection_params=StreamableHTTPConnectionParams(url=url))
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import functools
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from mcp import StdioServerParameters
+from mcp import types
+from mcp.server.fastmcp import FastMCP
+
+DEFAULT_IMAGE_BYTES = 1_000_000
+
+
+def make_png(width: int, height: int, pixels: bytes, compress_level: int = 6) -> bytes:
+    """Encodes raw RGB pixels as a PNG."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(data))
+            + kind
+            + data
+            + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+        )
+
+    row_bytes = width * 3
+    # Every scanline starts with filter type 0 (None)
+    raw = b"".join(
+        b"\x00" + pixels[y * row_bytes : (y + 1) * row_bytes] for y in range(height)
+    )
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw, compress_level))
+        + chunk(b"IEND", b"")
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def tiny_png() -> bytes:
+    """A small deterministic 8x8 gradient."""
+    pixels = bytes(
+        value
+        for y in range(8)
+        for x in range(8)
+        for value in (x * 32, y * 32, 128)
+    )
+    return make_png(8, 8, pixels)
+
+
+@functools.lru_cache(maxsize=4)
+def large_png(size_bytes: int) -> bytes:
+    """A noise PNG of roughly `size_bytes` (noise doesn't compress, so size is predictable)."""
+    side = max(1, int((size_bytes / 3) ** 0.5))
+    return make_png(side, side, os.urandom(side * side * 3), compress_level=0)
+
+
+def build_server(
+    latency_ms: float = 0,
+    image_bytes: int = DEFAULT_IMAGE_BYTES,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+) -> FastMCP:
+    """Creates the stand-in server.
+
+    Args:
+        latency_ms: Delay added to every tool call
+        image_bytes: Default size of images returned by getLargeImage
+        host: Bind address for the streamable-HTTP transport
+        port: Port for the streamable-HTTP transport
+    """
+    server = FastMCP("mcp-standin", host=host, port=port, log_level="WARNING")
+    delay = latency_ms / 1000
+
+    @server.tool()
+    async def echo(message: str) -> str:
+        """Echoes back the input."""
+        await asyncio.sleep(delay)
+        return f"Echo: {message}"
+
+    @server.tool()
+    async def add(a: float, b: float) -> str:
+        """Adds two numbers."""
+        await asyncio.sleep(delay)
+        return f"The sum of {a} and {b} is {a + b}."
+
+    @server.tool(structured_output=False)
+    async def getTinyImage() -> list:
+        """Returns the MCP_TINY_IMAGE."""
+        await asyncio.sleep(delay)
+        return _image_result(tiny_png(), "tiny image")
+
+    @server.tool(structured_output=False)
+    async def getLargeImage(size_bytes: int = 0) -> list:
+        """Returns a PNG of roughly size_bytes bytes, for payload throughput tests."""
+        await asyncio.sleep(delay)
+        return _image_result(large_png(size_bytes or image_bytes), "large image")
+
+    return server
+
+
+def _image_result(png: bytes, label: str) -> list:
+    # Same text / image / text layout server-everything uses
+    return [
+        types.TextContent(type="text", text=f"This is a {label}:"),
+        types.ImageContent(
+            type="image", data=base64.b64encode(png).decode(), mimeType="image/png"
+        ),
+        types.TextContent(type="text", text=f"The image above is the MCP {label}."),
+    ]
+
+
+def stdio_server_params(
+    latency_ms: float = 0, image_bytes: int = DEFAULT_IMAGE_BYTES
+) -> StdioServerParameters:
+    """Parameters that spawn this server over stdio with the current Python."""
+    return StdioServerParameters(
+        command=sys.executable,
+        args=[
+            os.path.abspath(__file__),
+            "--latency-ms",
+            str(latency_ms),
+            "--image-bytes",
+            str(image_bytes),
+        ],
+    )
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def http_server_thread(
+    port: int = None,
+    latency_ms: float = 0,
+    image_bytes: int = DEFAULT_IMAGE_BYTES,
+    startup_timeout: float = 10,
+):
+    """Runs the server over streamable HTTP in a background thread.
+
+    Yields:
+        The MCP endpoint URL
+    """
+    import uvicorn
+
+    port = port or free_port()
+    server = build_server(latency_ms=latency_ms, image_bytes=image_bytes, port=port)
+    uvicorn_server = uvicorn.Server(
+        uvicorn.Config(
+            server.streamable_http_app(),
+            host="127.0.0.1",
+            port=port,
+            log_level="warning",
+        )
+    )
+    thread = threading.Thread(target=uvicorn_server.run, daemon=True)
+    thread.start()
+
+    deadline = time.perf_counter() + startup_timeout
+    while not uvicorn_server.started:
+        if time.perf_counter() > deadline or not thread.is_alive():
+            raise RuntimeError(f"MCP stand-in server did not start on port {port}")
+        time.sleep(0.01)
+
+    try:
+        yield f"http://127.0.0.1:{port}{server.settings.streamable_http_path}"
+    finally:
+        uvicorn_server.should_exit = True
+        thread.join(timeout=startup_timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline MCP stand-in server")
+    parser.add_argument(
+        "--transport", choices=["stdio", "streamable-http"], default="stdio"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--image-bytes", type=int, default=DEFAULT_IMAGE_BYTES)
+    args = parser.parse_args()
+
+    server = build_server(
+        latency_ms=args.latency_ms,
+        image_bytes=args.image_bytes,
+        host=args.host,
+        port=args.port,
+    )
+    server.run(transport=args.transport)
+
+
+if __name__ == "__main__":
+    main()
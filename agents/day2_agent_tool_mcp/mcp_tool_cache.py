@@ -0,0 +1,196 @@
+"""Cached MCP tool listing and schema translation.
+
+Every `McpToolset.get_tools()` call runs `list_tools` on the server and
+translates each MCP input schema into an ADK function declaration. When many
+runners use the same server, they all repeat that work. `CachedMcpToolset`
+keeps one translated listing per server identity and version, shared by every
+toolset in the process, and only drops it when the server sends
+`notifications/tools/list_changed`.
+
+Usage:
+
+    toolset = CachedMcpToolset(connection_params=StdioConnectionParams(...))
+    # or, with a warm server pool:
+    toolset = pool.toolset()
+"""
+
+import logging
+import weakref
+from dataclasses import dataclass
+
+from google.adk.tools.mcp_tool.mcp_session_manager import retry_on_closed_resource
+from google.adk.tools.mcp_tool.mcp_tool import McpTool
+from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
+from google.genai.types import FunctionDeclaration
+from mcp import StdioServerParameters
+from mcp import types as mcp_types
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedToolListing:
+    """Tools listed by one server version, with their translated declarations."""
+
+    tools: list[mcp_types.Tool]
+    declarations: dict[str, FunctionDeclaration]
+
+
+class ToolDeclarationCache:
+    """Process-wide cache of translated MCP tool listings.
+
+    Entries are keyed by (server identity, server version). Invalidating a
+    server identity drops every version cached for it.
+    """
+
+    def __init__(self):
+        self._listings: dict[tuple[str, str | None], CachedToolListing] = {}
+        self._watched_sessions = weakref.WeakSet()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, server_identity: str, server_version: str | None):
+        listing = self._listings.get((server_identity, server_version))
+        if listing is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return listing
+
+    def put(
+        self,
+        server_identity: str,
+        server_version: str | None,
+        tools: list[mcp_types.Tool],
+        translate,
+    ) -> CachedToolListing:
+        """Translates and stores a tool listing.
+
+        Args:
+            translate: Callable turning an MCP tool into a FunctionDeclaration
+        """
+        listing = CachedToolListing(
+            tools=list(tools),
+            declarations={tool.name: translate(tool) for tool in tools},
+        )
+        self._listings[(server_identity, server_version)] = listing
+        return listing
+
+    def invalidate(self, server_identity: str):
+        """Drops every cached listing for a server."""
+        stale = [key for key in self._listings if key[0] == server_identity]
+        for key in stale:
+            del self._listings[key]
+        if stale:
+            self.invalidations += 1
+            logger.info("Tool listing cache invalidated for %s", server_identity)
+
+    def watch(self, session, server_identity: str):
+        """Invalidates the server's listings when the session reports `tools/list_changed`."""
+        if session in self._watched_sessions:
+            return
+        self._watched_sessions.add(session)
+
+        # ClientSession forwards every incoming server message to _message_handler
+        next_handler = session._message_handler
+
+        async def handle_message(message):
+            if isinstance(message, mcp_types.ServerNotification) and isinstance(
+                message.root, mcp_types.ToolListChangedNotification
+            ):
+                self.invalidate(server_identity)
+            await next_handler(message)
+
+        session._message_handler = handle_message
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._listings),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+# Shared by every CachedMcpToolset unless one is given explicitly
+DEFAULT_TOOL_CACHE = ToolDeclarationCache()
+
+
+def server_identity_for(connection_params) -> str:
+    """Identifies the server a set of connection params points at."""
+    server_params = getattr(connection_params, "server_params", connection_params)
+    if isinstance(server_params, StdioServerParameters):
+        return f"stdio:{server_params.command} {' '.join(server_params.args)}"
+    return f"url:{connection_params.url}"
+
+
+class _CachedMcpTool(McpTool):
+    """McpTool that reuses an already translated declaration."""
+
+    def __init__(self, *, declaration: FunctionDeclaration, **kwargs):
+        super().__init__(**kwargs)
+        self._cached_declaration = declaration
+
+    def _get_declaration(self) -> FunctionDeclaration:
+        # Copy so callers such as tool_name_prefix can rename it without touching the cache
+        return self._cached_declaration.model_copy()
+
+
+class CachedMcpToolset(McpToolset):
+    """McpToolset that lists and translates a server's tools once per server version."""
+
+    def __init__(self, *, cache: ToolDeclarationCache = None, **kwargs):
+        """
+        Args:
+            cache: Cache to share listings through. Defaults to DEFAULT_TOOL_CACHE
+            **kwargs: `McpToolset` arguments
+        """
+        super().__init__(**kwargs)
+        self._tool_cache = cache or DEFAULT_TOOL_CACHE
+        self._server_identity = server_identity_for(self._connection_params)
+
+    @retry_on_closed_resource
+    async def get_tools(self, readonly_context=None):
+        headers = (
+            self._header_provider(readonly_context)
+            if self._header_provider and readonly_context
+            else None
+        )
+        session = await self._mcp_session_manager.create_session(headers=headers)
+        self._tool_cache.watch(session, self._server_identity)
+
+        # Pooled sessions know which server version they are talking to
+        server_version = None
+        if hasattr(self._mcp_session_manager, "server_version"):
+            server_version = self._mcp_session_manager.server_version(session)
+
+        listing = self._tool_cache.get(self._server_identity, server_version)
+        if listing is None:
+            tools_response = await session.list_tools()
+            listing = self._tool_cache.put(
+                self._server_identity,
+                server_version,
+                tools_response.tools,
+                translate=self._translate,
+            )
+
+        tools = []
+        for tool in listing.tools:
+            mcp_tool = _CachedMcpTool(
+                declaration=listing.declarations[tool.name],
+                mcp_tool=tool,
+                mcp_session_manager=self._mcp_session_manager,
+                auth_scheme=self._auth_scheme,
+                auth_credential=self._auth_credential,
+                require_confirmation=self._require_confirmation,
+                header_provider=self._header_provider,
+            )
+            if self._is_tool_selected(mcp_tool, readonly_context):
+                tools.append(mcp_tool)
+        return tools
+
+    def _translate(self, tool: mcp_types.Tool) -> FunctionDeclaration:
+        return McpTool(
+            mcp_tool=tool, mcp_session_manager=self._mcp_session_manager
+        )._get_declaration()
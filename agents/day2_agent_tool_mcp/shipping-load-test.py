@@ -0,0 +1,270 @@
+import argparse
+import asyncio
+import importlib.util
+import os
+import pickle
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+import warnings
+warnings.filterwarnings("ignore")
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import DatabaseSessionService, InMemorySessionService
+from google.genai import types
+
+from event_router import EventRouter
+from shipping_approvals import ApprovalStore, resume
+
+# Load test for the resumable shipping workflow in long-running-agent.py.
+#
+# Drives run_shipping_workflow-style traffic - create session, run until the
+# order completes or pauses for approval, wait for the "human", resume - for
+# thousands of concurrent sessions against a stub model (no API calls).
+# Small orders auto-approve; large ones pause and are resumed after a random
+# approval delay, so at peak about half the sessions sit paused.
+#
+# Reports p50/p99 latency (initial run, resume, end-to-end excluding approval
+# wait), events per session, session-store growth and sessions/s per
+# concurrency level; the best level is the throughput ceiling.
+#
+# Run from this folder:
+#   python shipping-load-test.py
+#   python shipping-load-test.py --sessions 5000 --concurrency 100 1000 5000 --large-ratio 0.5
+#   python shipping-load-test.py --store sqlite --sessions 500 --approval-delay 2
+#   python shipping-load-test.py --fast-path      # keep the deterministic fast path (no model calls)
+
+APP_NAME = "shipping_coordinator"
+
+
+class StubShippingModel(BaseLlm):
+    """Answers like the shipping agent would, after a fixed delay."""
+
+    model: str = "stub-shipping-model"
+    latency_s: float = 0.0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        await asyncio.sleep(self.latency_s)
+        part = llm_request.contents[-1].parts[-1]
+        if part.function_response:
+            text = f"Order {part.function_response.response.get('status')}: {part.function_response.response}"
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+            return
+        match = re.search(r"(\d+) containers? to (.+)", part.text or "")
+        if not match:
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="How many containers, and where to?")]))
+            return
+        yield LlmResponse(
+            content=types.Content(
+                role="model",
+                parts=[
+                    types.Part(
+                        function_call=types.FunctionCall(
+                            name="place_shipping_order",
+                            args={"num_containers": int(match.group(1)), "destination": match.group(2)},
+                        )
+                    )
+                ],
+            )
+        )
+
+
+def load_workflow_module():
+    """Imports long-running-agent.py (hyphenated, so not importable by name)."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "long-running-agent.py")
+    spec = importlib.util.spec_from_file_location("long_running_agent", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile_ms(values, pct):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))] * 1000
+
+
+def rss_mb() -> float:
+    """Current resident memory of this process (Linux), or 0 if unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1_000_000
+    except (OSError, ValueError):
+        return 0.0
+
+
+def store_size_mb(session_service, db_path) -> float:
+    if isinstance(session_service, InMemorySessionService):
+        return len(pickle.dumps(session_service.sessions)) / 1_000_000
+    return os.path.getsize(db_path) / 1_000_000 if os.path.exists(db_path) else 0.0
+
+
+async def run_one_session(runner, store, index, args, results):
+    """One order: create session, run until done or paused, wait for approval, resume."""
+    user_id = f"load_user_{index % 100}"
+    session_id = f"load_{index}"
+    large = random.random() < args.large_ratio
+    num_containers = random.randint(6, 50) if large else random.randint(1, 5)
+    query = f"Ship {num_containers} containers to Port {index}"
+
+    start = time.perf_counter()
+    await runner.session_service.create_session(
+        app_name=APP_NAME, user_id=user_id, session_id=session_id
+    )
+    router = EventRouter()
+    paused = await router.run_until_paused(
+        runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=types.Content(role="user", parts=[types.Part(text=query)]),
+        )
+    )
+    initial = time.perf_counter() - start
+    events = router.event_count
+    resume_seconds = 0.0
+    status = "approved"
+
+    if paused:
+        store.record(paused, app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        await asyncio.sleep(random.uniform(0, args.approval_delay))
+        outcome = await resume(
+            runner, store, paused.invocation_id, approved=random.random() < args.approve_ratio
+        )
+        resume_seconds = outcome.seconds
+        events += outcome.events
+        status = outcome.status
+
+    results.append(
+        {
+            "large": large,
+            "status": status,
+            "initial": initial,
+            "resume": resume_seconds,
+            "active": initial + resume_seconds,
+            "events": events,
+        }
+    )
+
+
+async def run_level(module, args, concurrency, workdir):
+    """Runs args.sessions sessions with at most `concurrency` in flight."""
+    db_path = os.path.join(workdir, f"sessions_{concurrency}.db")
+    if args.store == "sqlite":
+        session_service = DatabaseSessionService(db_url=f"sqlite:///{db_path}")
+    else:
+        session_service = InMemorySessionService()
+    runner = Runner(app=module.shipping_app, session_service=session_service)
+    store = ApprovalStore(os.path.join(workdir, f"approvals_{concurrency}.db"))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def limited(index):
+        async with semaphore:
+            await run_one_session(runner, store, index, args, results)
+
+    rss_before = rss_mb()
+    store_before = store_size_mb(session_service, db_path)
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(
+        *(limited(i) for i in range(args.sessions)), return_exceptions=True
+    )
+    elapsed = time.perf_counter() - start
+    errors = [o for o in outcomes if isinstance(o, Exception)]
+
+    report = {
+        "concurrency": concurrency,
+        "sessions": len(results),
+        "errors": len(errors),
+        "seconds": elapsed,
+        "sessions_per_s": len(results) / elapsed,
+        "initial_p50": percentile_ms([r["initial"] for r in results], 50),
+        "initial_p99": percentile_ms([r["initial"] for r in results], 99),
+        "resume_p50": percentile_ms([r["resume"] for r in results if r["large"]], 50),
+        "resume_p99": percentile_ms([r["resume"] for r in results if r["large"]], 99),
+        "active_p99": percentile_ms([r["active"] for r in results], 99),
+        "events_small": statistics.mean([r["events"] for r in results if not r["large"]] or [0]),
+        "events_large": statistics.mean([r["events"] for r in results if r["large"]] or [0]),
+        "store_mb": store_size_mb(session_service, db_path) - store_before,
+        "rss_mb": rss_mb() - rss_before,
+        "statuses": {},
+    }
+    for r in results:
+        report["statuses"][r["status"]] = report["statuses"].get(r["status"], 0) + 1
+    if errors:
+        report["first_error"] = repr(errors[0])
+    store.close()
+    return report
+
+
+def print_report(report):
+    print(
+        f"{report['concurrency']:>8}{report['sessions']:>9}{report['errors']:>7}"
+        f"{report['sessions_per_s']:>11.0f}"
+        f"{report['initial_p50']:>10.1f}{report['initial_p99']:>10.1f}"
+        f"{report['resume_p50']:>10.1f}{report['resume_p99']:>10.1f}"
+        f"{report['active_p99']:>10.1f}"
+        f"{report['events_small']:>7.1f}{report['events_large']:>7.1f}"
+        f"{report['store_mb']:>9.1f}{report['rss_mb']:>9.1f}"
+    )
+    if report.get("first_error"):
+        print(f"         first error: {report['first_error']}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test for the resumable shipping workflow")
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[5000], help="In-flight sessions; several values sweep for the ceiling")
+    parser.add_argument("--large-ratio", type=float, default=0.5, help="Share of orders above the approval threshold")
+    parser.add_argument("--approve-ratio", type=float, default=0.8, help="Share of large orders the approver accepts")
+    parser.add_argument("--approval-delay", type=float, default=1.0, help="Max seconds a human takes to decide")
+    parser.add_argument("--model-latency-ms", type=float, default=50)
+    parser.add_argument("--store", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--fast-path", action="store_true", help="Keep the deterministic fast path enabled")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # long-running-agent.py opens its SQLite files in the working directory on import
+        os.chdir(workdir)
+        module = load_workflow_module()
+        module.shipping_agent.model = StubShippingModel(latency_s=args.model_latency_ms / 1000)
+        if not args.fast_path:
+            module.shipping_agent.before_model_callback = None
+
+        print(
+            f"\n{args.sessions} sessions, {args.large_ratio:.0%} large, approval delay ≤{args.approval_delay}s, "
+            f"model {args.model_latency_ms:.0f} ms, store={args.store}, fast path={'on' if args.fast_path else 'off'}\n"
+        )
+        print(
+            f"{'in-flight':>8}{'sessions':>9}{'errors':>7}{'sess/s':>11}"
+            f"{'init p50':>10}{'init p99':>10}{'res p50':>10}{'res p99':>10}{'act p99':>10}"
+            f"{'ev/sm':>7}{'ev/lg':>7}{'store MB':>9}{'RSS MB':>9}"
+        )
+        reports = []
+        for concurrency in args.concurrency:
+            report = await run_level(module, args, concurrency, workdir)
+            reports.append(report)
+            print_report(report)
+
+        best = max(reports, key=lambda r: r["sessions_per_s"])
+        print(
+            f"\nThroughput ceiling: {best['sessions_per_s']:.0f} sessions/s at {best['concurrency']} in flight"
+            f"  (statuses {best['statuses']})"
+        )
+        print("Latencies in ms; 'act' = initial run + resume, excluding time waiting for the approver\n")
+        if args.fast_path:
+            print(f"Fast path: {module.shipping_fast_path.stats()}")
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
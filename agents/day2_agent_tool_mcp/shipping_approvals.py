@@ -0,0 +1,501 @@
+"""Durable queue of shipping orders paused for human approval.
+
+A resumable App can pick up a paused invocation in any process, as long as
+the session lives in a shared store and the worker knows which invocation to
+resume. `ApprovalStore` records every `adk_request_confirmation` in SQLite,
+together with the session it belongs to, so pending orders survive restarts
+and any worker can resume one by its invocation ID.
+
+Workers lease an invocation before resuming it. A lease is a single
+conditional UPDATE, so two workers can never resume the same invocation. A
+worker that crashes mid-resume simply lets its lease expire, and the order
+becomes available again.
+
+Usage:
+
+    store = ApprovalStore("shipping_approvals.db")
+
+    paused = await router.run_until_paused(runner.run_async(...))
+    if paused:
+        store.record(paused, app_name=..., user_id=..., session_id=...)
+
+    # Later, in any process sharing the session database:
+    outcome = await resume(runner, store, invocation_id, approved=True)
+
+    # Or clear a batch, streaming outcomes as each order finishes:
+    metrics = ResumeMetrics()
+    async for outcome in resume_many(runner, store, {id1: True, id2: False}, metrics=metrics):
+        print(outcome.invocation_id, outcome.status)
+    print(metrics.summary())
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import statistics
+import time
+import uuid
+from dataclasses import dataclass
+
+from google.genai import types
+
+from event_router import REQUEST_CONFIRMATION_FUNCTION_CALL_NAME, EventRouter
+
+# Status values of pending_approvals.status
+PENDING = "pending"
+LEASED = "leased"
+APPROVED = "approved"
+REJECTED = "rejected"
+
+DEFAULT_LEASE_SECONDS = 120
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_approvals (
+    invocation_id     TEXT PRIMARY KEY,
+    app_name          TEXT NOT NULL,
+    user_id           TEXT NOT NULL,
+    session_id        TEXT NOT NULL,
+    approval_ids      TEXT NOT NULL,
+    tool_name         TEXT,
+    tool_args         TEXT,
+    hint              TEXT,
+    payload           TEXT,
+    status            TEXT NOT NULL,
+    lease_owner       TEXT,
+    lease_expires_at  REAL,
+    result            TEXT,
+    created_at        REAL NOT NULL,
+    updated_at        REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_pending_approvals_status
+    ON pending_approvals (status, lease_expires_at, created_at);
+CREATE INDEX IF NOT EXISTS ix_pending_approvals_queue
+    ON pending_approvals (status, created_at, invocation_id);
+"""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+@dataclass
+class PendingApproval:
+    """A paused invocation waiting for (or holding) a human decision."""
+
+    invocation_id: str
+    app_name: str
+    user_id: str
+    session_id: str
+    approval_ids: list[str]
+    tool_name: str | None
+    tool_args: dict
+    hint: str | None
+    payload: dict | None
+    status: str
+    lease_owner: str | None = None
+    lease_expires_at: float | None = None
+    result: dict | None = None
+    created_at: float = 0.0
+    updated_at: float = 0.0
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "PendingApproval":
+        return cls(
+            invocation_id=row["invocation_id"],
+            app_name=row["app_name"],
+            user_id=row["user_id"],
+            session_id=row["session_id"],
+            approval_ids=json.loads(row["approval_ids"]),
+            tool_name=row["tool_name"],
+            tool_args=json.loads(row["tool_args"] or "{}"),
+            hint=row["hint"],
+            payload=json.loads(row["payload"]) if row["payload"] else None,
+            status=row["status"],
+            lease_owner=row["lease_owner"],
+            lease_expires_at=row["lease_expires_at"],
+            result=json.loads(row["result"]) if row["result"] else None,
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+        )
+
+
+@dataclass
+class ResumeOutcome:
+    """What happened when a paused invocation was resumed."""
+
+    invocation_id: str
+    status: str
+    approved: bool | None = None
+    final_text: str = ""
+    events: int = 0
+    seconds: float = 0.0
+    error: str | None = None
+    # Set when the resumed run paused again for another confirmation
+    paused_again: bool = False
+
+
+class ResumeMetrics:
+    """Aggregate counters for a batch of resumes."""
+
+    def __init__(self):
+        self.by_status: dict[str, int] = {}
+        self.latencies: list[float] = []
+        self.events = 0
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+    def add(self, outcome: ResumeOutcome):
+        self.by_status[outcome.status] = self.by_status.get(outcome.status, 0) + 1
+        self.events += outcome.events
+        if outcome.status != "skipped":
+            self.latencies.append(outcome.seconds)
+        self.finished_at = time.perf_counter()
+
+    def summary(self) -> dict:
+        total = sum(self.by_status.values())
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        latencies = sorted(self.latencies)
+        return {
+            "orders": total,
+            "by_status": dict(self.by_status),
+            "seconds": elapsed,
+            "orders_per_second": total / elapsed if elapsed > 0 else 0.0,
+            "events": self.events,
+            "p50_ms": statistics.median(latencies) * 1000 if latencies else None,
+            "p99_ms": latencies[int(0.99 * (len(latencies) - 1))] * 1000 if latencies else None,
+        }
+
+
+class ApprovalStore:
+    """SQLite-backed queue of paused invocations with worker leasing."""
+
+    def __init__(
+        self,
+        db_path: str = "shipping_approvals.db",
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    ):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        # Autocommit: every statement below is a single atomic write
+        self._conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def record(self, paused, app_name: str, user_id: str, session_id: str):
+        """Stores a PausedForConfirmation signal as pending.
+
+        Recording the same invocation again (it paused a second time after
+        being resumed) replaces its requests and makes it pending again.
+        """
+        now = time.time()
+        first = paused.requests[0]
+        self._conn.execute(
+            """
+            INSERT INTO pending_approvals (
+                invocation_id, app_name, user_id, session_id, approval_ids,
+                tool_name, tool_args, hint, payload, status, created_at, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (invocation_id) DO UPDATE SET
+                approval_ids = excluded.approval_ids,
+                tool_name = excluded.tool_name,
+                tool_args = excluded.tool_args,
+                hint = excluded.hint,
+                payload = excluded.payload,
+                status = excluded.status,
+                lease_owner = NULL,
+                lease_expires_at = NULL,
+                updated_at = excluded.updated_at
+            """,
+            (
+                paused.invocation_id,
+                app_name,
+                user_id,
+                session_id,
+                json.dumps([request.approval_id for request in paused.requests]),
+                first.tool_name,
+                json.dumps(first.tool_args),
+                first.hint,
+                json.dumps(first.payload) if first.payload is not None else None,
+                PENDING,
+                now,
+                now,
+            ),
+        )
+
+    def get(self, invocation_id: str) -> PendingApproval | None:
+        row = self._conn.execute(
+            "SELECT * FROM pending_approvals WHERE invocation_id = ?", (invocation_id,)
+        ).fetchone()
+        return PendingApproval.from_row(row) if row else None
+
+    def list_pending(
+        self, limit: int = 100, created_after: float = 0.0, after_invocation_id: str = ""
+    ) -> list[PendingApproval]:
+        """Oldest pending orders first.
+
+        To page through, pass the last order's `created_at` and `invocation_id`.
+        Orders recorded in the same instant are ordered by ID, so a page
+        boundary between them neither skips nor repeats any.
+        """
+        rows = self._conn.execute(
+            """
+            SELECT * FROM pending_approvals
+            WHERE status = ? AND (created_at, invocation_id) > (?, ?)
+            ORDER BY created_at, invocation_id
+            LIMIT ?
+            """,
+            (PENDING, created_after, after_invocation_id, limit),
+        ).fetchall()
+        return [PendingApproval.from_row(row) for row in rows]
+
+    def count_by_status(self) -> dict[str, int]:
+        rows = self._conn.execute(
+            "SELECT status, COUNT(*) FROM pending_approvals GROUP BY status"
+        ).fetchall()
+        return {status: count for status, count in rows}
+
+    def lease(self, invocation_id: str, worker_id: str) -> PendingApproval | None:
+        """Claims a pending (or abandoned) invocation for `worker_id`.
+
+        Returns:
+            The leased approval, or None if it doesn't exist, is already
+            resolved, or another worker holds a live lease on it
+        """
+        now = time.time()
+        cursor = self._conn.execute(
+            """
+            UPDATE pending_approvals
+            SET status = ?, lease_owner = ?, lease_expires_at = ?, updated_at = ?
+            WHERE invocation_id = ?
+              AND (status = ? OR (status = ? AND lease_expires_at < ?))
+            """,
+            (
+                LEASED,
+                worker_id,
+                now + self.lease_seconds,
+                now,
+                invocation_id,
+                PENDING,
+                LEASED,
+                now,
+            ),
+        )
+        if cursor.rowcount != 1:
+            return None
+        return self.get(invocation_id)
+
+    def release(self, invocation_id: str, worker_id: str):
+        """Gives a lease back without resolving the order (e.g. the resume failed)."""
+        self._conn.execute(
+            """
+            UPDATE pending_approvals
+            SET status = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+            WHERE invocation_id = ? AND status = ? AND lease_owner = ?
+            """,
+            (PENDING, time.time(), invocation_id, LEASED, worker_id),
+        )
+
+    def complete(self, invocation_id: str, worker_id: str, status: str, result: dict = None) -> bool:
+        """Marks a leased invocation resolved. Fails if the lease was lost."""
+        cursor = self._conn.execute(
+            """
+            UPDATE pending_approvals
+            SET status = ?, result = ?, lease_owner = NULL, lease_expires_at = NULL,
+                updated_at = ?
+            WHERE invocation_id = ? AND status = ? AND lease_owner = ?
+            """,
+            (
+                status,
+                json.dumps(result) if result is not None else None,
+                time.time(),
+                invocation_id,
+                LEASED,
+                worker_id,
+            ),
+        )
+        return cursor.rowcount == 1
+
+
+def create_approval_response(approval_ids: list[str], approved: bool) -> types.Content:
+    """Approval message answering every pending confirmation of one invocation."""
+    return types.Content(
+        role="user",
+        parts=[
+            types.Part(
+                function_response=types.FunctionResponse(
+                    id=approval_id,
+                    name=REQUEST_CONFIRMATION_FUNCTION_CALL_NAME,
+                    response={"confirmed": approved},
+                )
+            )
+            for approval_id in approval_ids
+        ],
+    )
+
+
+async def resume(
+    runner,
+    store: ApprovalStore,
+    invocation_id: str,
+    approved: bool,
+    worker_id: str = None,
+    router: EventRouter = None,
+) -> ResumeOutcome:
+    """Leases a paused invocation, resumes it with the decision and records the result.
+
+    Args:
+        runner: Runner for the resumable App, backed by a shared session service
+        store: Where the paused invocation was recorded
+        invocation_id: Invocation to resume
+        approved: The human decision
+        worker_id: Lease owner; defaults to host:pid:random
+        router: Optional router that also gets the resumed events (e.g. to
+            print agent text). Nothing is registered on it
+    """
+    worker_id = worker_id or default_worker_id()
+    start = time.perf_counter()
+
+    pending = store.lease(invocation_id, worker_id)
+    if pending is None:
+        current = store.get(invocation_id)
+        return ResumeOutcome(
+            invocation_id=invocation_id,
+            status="skipped",
+            error="not found" if current is None else f"already {current.status}",
+        )
+
+    # This resume's own router, so its text never mixes with other resumes
+    # sharing the caller's router
+    local_router = EventRouter()
+    final_text = []
+    local_router.on_text(lambda event, part: final_text.append(part.text))
+    events = runner.run_async(
+        user_id=pending.user_id,
+        session_id=pending.session_id,
+        new_message=create_approval_response(pending.approval_ids, approved),
+        invocation_id=invocation_id,
+    )
+    if router is not None:
+        events = _dispatched(events, router)
+
+    try:
+        paused = await local_router.run_until_paused(events)
+    except asyncio.CancelledError:
+        # Hand the order back now instead of when the lease expires
+        store.release(invocation_id, worker_id)
+        raise
+    except Exception as e:
+        store.release(invocation_id, worker_id)
+        return ResumeOutcome(
+            invocation_id=invocation_id,
+            status="failed",
+            approved=approved,
+            events=local_router.event_count,
+            seconds=time.perf_counter() - start,
+            error=str(e),
+        )
+
+    outcome = ResumeOutcome(
+        invocation_id=invocation_id,
+        status=APPROVED if approved else REJECTED,
+        approved=approved,
+        final_text="".join(final_text),
+        events=local_router.event_count,
+        seconds=time.perf_counter() - start,
+    )
+    if paused:
+        # The agent asked for another confirmation - back in the queue
+        store.record(
+            paused,
+            app_name=pending.app_name,
+            user_id=pending.user_id,
+            session_id=pending.session_id,
+        )
+        outcome.status = PENDING
+        outcome.paused_again = True
+    elif not store.complete(
+        invocation_id,
+        worker_id,
+        outcome.status,
+        {"approved": approved, "final_text": outcome.final_text},
+    ):
+        outcome.error = "lease expired before the result was recorded"
+    return outcome
+
+
+async def _dispatched(events, router: EventRouter):
+    """Passes events through, dispatching each to `router` first."""
+    try:
+        async for event in events:
+            await router.dispatch(event)
+            yield event
+    finally:
+        # Closing this generator (a pause) closes the run too
+        if hasattr(events, "aclose"):
+            await events.aclose()
+
+
+async def resume_many(
+    runner,
+    store: ApprovalStore,
+    decisions,
+    max_concurrency: int = 16,
+    worker_id: str = None,
+    metrics: ResumeMetrics = None,
+):
+    """Resumes many paused invocations concurrently, yielding each outcome as it finishes.
+
+    Args:
+        runner: Runner for the resumable App
+        store: Where the paused invocations were recorded
+        decisions: {invocation_id: approved} or an iterable of (invocation_id, approved)
+        max_concurrency: Maximum number of invocations resumed at once
+        worker_id: Lease owner for the whole batch; defaults to host:pid:random
+        metrics: Optional ResumeMetrics filled in as outcomes arrive
+
+    Yields:
+        ResumeOutcome per order, in completion order
+    """
+    if isinstance(decisions, dict):
+        decisions = decisions.items()
+    worker_id = worker_id or default_worker_id()
+
+    todo = asyncio.Queue()
+    for invocation_id, approved in decisions:
+        todo.put_nowait((invocation_id, approved))
+    total = todo.qsize()
+    done = asyncio.Queue()
+
+    async def worker():
+        while True:
+            try:
+                invocation_id, approved = todo.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                outcome = await resume(runner, store, invocation_id, approved, worker_id)
+            except Exception as e:
+                outcome = ResumeOutcome(
+                    invocation_id=invocation_id, status="failed", approved=approved, error=str(e)
+                )
+            await done.put(outcome)
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(max_concurrency, total))]
+    try:
+        for _ in range(total):
+            outcome = await done.get()
+            if metrics:
+                metrics.add(outcome)
+            yield outcome
+    finally:
+        # The caller may stop iterating early; don't leave resumes running unobserved
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
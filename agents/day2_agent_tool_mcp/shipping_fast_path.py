@@ -0,0 +1,182 @@
+"""Deterministic fast path for well-formed shipping requests.
+
+Most requests look like "Ship 10 containers to Rotterdam". The LLM is only
+extracting two arguments for `place_shipping_order`, whose approval policy is
+already rule-based. `ShippingFastPath.before_model_callback` parses such
+requests locally and answers the model turn itself: first with the tool call,
+then with a summary of the tool's result. Anything it cannot parse with
+certainty falls through to the LLM unchanged.
+
+Structured callers can skip parsing entirely by sending JSON:
+
+    {"num_containers": 10, "destination": "Rotterdam"}
+
+Usage:
+
+    fast_path = ShippingFastPath()
+    agent = LlmAgent(..., before_model_callback=fast_path.before_model_callback)
+    ...
+    print(fast_path.stats())   # includes llm_bypass_rate
+"""
+
+import functools
+import json
+import re
+from dataclasses import dataclass
+
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+TOOL_NAME = "place_shipping_order"
+
+# Deliberately strict: numbers written as words, several orders in one message,
+# hedging ("maybe", "around") etc. all go to the LLM
+_ORDER_PATTERN = re.compile(
+    r"^\s*(?:please\s+)?ship\s+(\d{1,6})\s+containers?\s+to\s+"
+    r"([A-Za-z][A-Za-z0-9 .'-]{0,80}?)\s*[.!]?\s*$",
+    re.IGNORECASE,
+)
+
+# A destination is a place name: capitalized words ("Los Angeles"), numbers
+# after the first word ("Port 12") and these lowercase particles
+# ("Rio de Janeiro", "Frankfurt am Main"). Anything else, e.g.
+# "Rotterdam maybe" or "Rotterdam or Hamburg", goes to the LLM.
+_PLACE_PARTICLES = frozenset(
+    "al am an da das de del der des di do dos du el en la las le les los on op sur upon van von y".split()
+)
+# Not part of a place name even when capitalized
+_HEDGE_WORDS = frozenset(
+    "about and approx approximately around asap later maybe now or perhaps please possibly "
+    "probably roughly soon thanks today tomorrow urgently".split()
+)
+
+
+@dataclass(frozen=True)
+class ShippingIntent:
+    num_containers: int
+    destination: str
+
+    def as_args(self) -> dict:
+        return {"num_containers": self.num_containers, "destination": self.destination}
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_shipping_request(text: str) -> ShippingIntent | None:
+    """Returns the order in `text` if it is unambiguous, else None. Results are cached."""
+    text = text.strip()
+    if text.startswith("{"):
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        num_containers = data.get("num_containers") if isinstance(data, dict) else None
+        destination = data.get("destination") if isinstance(data, dict) else None
+        if (
+            isinstance(num_containers, int)
+            and not isinstance(num_containers, bool)
+            and num_containers > 0
+            and isinstance(destination, str)
+            and destination.strip()
+        ):
+            return ShippingIntent(num_containers, destination.strip())
+        return None
+
+    match = _ORDER_PATTERN.match(text)
+    if not match:
+        return None
+    num_containers = int(match.group(1))
+    destination = match.group(2).strip()
+    if num_containers <= 0 or not _is_place_name(destination):
+        return None
+    return ShippingIntent(num_containers, destination)
+
+
+def _is_place_name(destination: str) -> bool:
+    words = destination.split()
+    if len(words) > 5 or not words[0][0].isupper():
+        return False
+    for word in words:
+        if word.lower().strip(".") in _HEDGE_WORDS:
+            return False
+        if not (word[0].isupper() or word.isdigit() or word in _PLACE_PARTICLES):
+            return False
+    return True
+
+
+def summarize_order_result(result: dict) -> str | None:
+    """The summary the agent's instruction asks for, built from the tool result."""
+    status = result.get("status")
+    if status not in ("approved", "rejected", "pending"):
+        return None
+    lines = [f"Order status: {status}"]
+    if result.get("order_id"):
+        lines.append(f"Order ID: {result['order_id']}")
+    if result.get("message"):
+        lines.append(result["message"])
+    if status == "pending":
+        lines.append("This order requires approval before it can be placed.")
+    return "\n".join(lines)
+
+
+class ShippingFastPath:
+    """before_model_callback that answers unambiguous shipping turns without the LLM."""
+
+    def __init__(self, tool_name: str = TOOL_NAME):
+        self.tool_name = tool_name
+        self.bypassed = 0
+        self.fallbacks = 0
+
+    def before_model_callback(self, callback_context, llm_request):
+        response = self._answer(llm_request)
+        if response is None:
+            self.fallbacks += 1
+        else:
+            self.bypassed += 1
+        return response
+
+    def _answer(self, llm_request) -> LlmResponse | None:
+        if not llm_request.contents or not llm_request.contents[-1].parts:
+            return None
+        last = llm_request.contents[-1]
+
+        # Turn 1: the user's request -> call the tool directly
+        texts = [part.text for part in last.parts if part.text]
+        if last.role == "user" and len(texts) == len(last.parts) == 1:
+            intent = parse_shipping_request(texts[0])
+            if intent is None:
+                return None
+            return LlmResponse(
+                content=types.Content(
+                    role="model",
+                    parts=[
+                        types.Part(
+                            function_call=types.FunctionCall(
+                                name=self.tool_name, args=intent.as_args()
+                            )
+                        )
+                    ],
+                )
+            )
+
+        # Turn 2: the tool's result -> summarize it
+        responses = [part.function_response for part in last.parts if part.function_response]
+        if len(responses) == len(last.parts) == 1 and responses[0].name == self.tool_name:
+            summary = summarize_order_result(responses[0].response or {})
+            if summary is None:
+                return None
+            return LlmResponse(
+                content=types.Content(role="model", parts=[types.Part(text=summary)])
+            )
+        return None
+
+    def stats(self) -> dict:
+        model_turns = self.bypassed + self.fallbacks
+        cache = parse_shipping_request.cache_info()
+        return {
+            "model_turns": model_turns,
+            "bypassed": self.bypassed,
+            "llm_calls": self.fallbacks,
+            "llm_bypass_rate": self.bypassed / model_turns if model_turns else 0.0,
+            "parse_cache_hits": cache.hits,
+            "parse_cache_misses": cache.misses,
+        }
@@ -0,0 +1,195 @@
+"""Idempotent side-effecting tools.
+
+A tool that places an order must not place it twice. The same call can reach
+a tool more than once: a worker crashes after the tool ran but before the
+result was saved, or a resumed invocation re-executes its tool calls.
+`IdempotentFunctionTool` keys each call by tool name + invocation ID + a hash
+of the arguments, and records results in a durable SQLite table. A repeated
+call returns the stored result instead of running the function again.
+
+The function_call ID is left out by default: when the model doesn't supply
+one, ADK generates a fresh `adk-...` ID each time the call is issued, so a
+re-executed call would never match its first run. With
+`include_function_call_id=True`, IDs the model supplied become part of the
+key (two identical calls in one turn both run); generated ones still don't.
+
+Results that only ask for human confirmation are not stored, so the call
+made after approval still runs for real.
+
+Usage:
+
+    store = IdempotencyStore("tool_calls.db")
+    tools = [IdempotentFunctionTool(place_shipping_order, store=store)]
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+
+from google.adk.flows.llm_flows.functions import AF_FUNCTION_CALL_ID_PREFIX
+from google.adk.tools.function_tool import FunctionTool
+from google.adk.tools.tool_context import ToolContext
+
+RUNNING = "running"
+DONE = "done"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tool_calls (
+    idempotency_key   TEXT PRIMARY KEY,
+    tool_name         TEXT NOT NULL,
+    invocation_id     TEXT,
+    function_call_id  TEXT,
+    args_hash         TEXT NOT NULL,
+    status            TEXT NOT NULL,
+    result            TEXT,
+    claimed_at        REAL NOT NULL,
+    completed_at      REAL
+);
+CREATE INDEX IF NOT EXISTS ix_tool_calls_invocation ON tool_calls (invocation_id);
+"""
+
+
+def args_hash(args: dict) -> str:
+    """Stable hash of tool arguments (key order doesn't matter)."""
+    canonical = json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Durable record of side-effecting tool calls and their results."""
+
+    def __init__(self, db_path: str = "tool_calls.db", claim_timeout: float = 300):
+        """
+        Args:
+            db_path: SQLite file (can be shared with other stores)
+            claim_timeout: Seconds after which a call still marked running is
+                assumed abandoned (its worker crashed) and may run again
+        """
+        self.db_path = db_path
+        self.claim_timeout = claim_timeout
+        self._conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+        self.hits = 0
+        self.executions = 0
+
+    def close(self):
+        self._conn.close()
+
+    def claim(self, key: str, tool_name: str, invocation_id, function_call_id, hashed_args) -> bool:
+        """Marks a call as running. Returns False if it is already claimed or done."""
+        now = time.time()
+        cursor = self._conn.execute(
+            """
+            INSERT INTO tool_calls (
+                idempotency_key, tool_name, invocation_id, function_call_id,
+                args_hash, status, claimed_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (idempotency_key) DO UPDATE SET claimed_at = excluded.claimed_at
+            WHERE tool_calls.status = ? AND tool_calls.claimed_at < ?
+            """,
+            (
+                key,
+                tool_name,
+                invocation_id,
+                function_call_id,
+                hashed_args,
+                RUNNING,
+                now,
+                RUNNING,
+                now - self.claim_timeout,
+            ),
+        )
+        return cursor.rowcount == 1
+
+    def get(self, key: str) -> sqlite3.Row | None:
+        return self._conn.execute(
+            "SELECT status, result FROM tool_calls WHERE idempotency_key = ?", (key,)
+        ).fetchone()
+
+    def complete(self, key: str, result):
+        self._conn.execute(
+            "UPDATE tool_calls SET status = ?, result = ?, completed_at = ? WHERE idempotency_key = ?",
+            (DONE, json.dumps(result, default=str), time.time(), key),
+        )
+
+    def forget(self, key: str):
+        """Drops a claim so the call can run again (it failed or wasn't final)."""
+        self._conn.execute(
+            "DELETE FROM tool_calls WHERE idempotency_key = ? AND status = ?", (key, RUNNING)
+        )
+
+    def stats(self) -> dict:
+        return {"executions": self.executions, "deduplicated": self.hits}
+
+
+class IdempotentFunctionTool(FunctionTool):
+    """FunctionTool that runs each (invocation, args) at most once."""
+
+    def __init__(
+        self,
+        func,
+        *,
+        store: IdempotencyStore,
+        include_function_call_id: bool = False,
+        poll_interval: float = 0.05,
+        **kwargs,
+    ):
+        """
+        Args:
+            func: The side-effecting function
+            store: Where calls and results are recorded
+            include_function_call_id: Also key by the function_call ID when the
+                model supplied it, so identical calls with different IDs in one
+                invocation each run (ADK-generated IDs are never used)
+            poll_interval: Seconds between checks while a concurrent identical
+                call is still running
+            **kwargs: `FunctionTool` arguments (require_confirmation, ...)
+        """
+        super().__init__(func, **kwargs)
+        self._store = store
+        self._include_function_call_id = include_function_call_id
+        self._poll_interval = poll_interval
+
+    def idempotency_key(self, args: dict, tool_context: ToolContext) -> tuple[str, str]:
+        hashed_args = args_hash(args)
+        parts = [self.name, tool_context.invocation_id or "", hashed_args]
+        function_call_id = tool_context.function_call_id
+        if (
+            self._include_function_call_id
+            and function_call_id
+            and not function_call_id.startswith(AF_FUNCTION_CALL_ID_PREFIX)
+        ):
+            parts.append(function_call_id)
+        return hashlib.sha256("\x1f".join(parts).encode()).hexdigest(), hashed_args
+
+    async def run_async(self, *, args: dict, tool_context: ToolContext):
+        key, hashed_args = self.idempotency_key(args, tool_context)
+
+        while not self._store.claim(
+            key, self.name, tool_context.invocation_id, tool_context.function_call_id, hashed_args
+        ):
+            row = self._store.get(key)
+            if row is not None and row["status"] == DONE:
+                self._store.hits += 1
+                return json.loads(row["result"])
+            # An identical call is running right now - wait for its result
+            await asyncio.sleep(self._poll_interval)
+
+        try:
+            result = await super().run_async(args=args, tool_context=tool_context)
+        except BaseException:
+            self._store.forget(key)
+            raise
+        self._store.executions += 1
+
+        if tool_context.function_call_id in (tool_context.actions.requested_tool_confirmations or {}):
+            # Only asked for approval; the approved call must still run
+            self._store.forget(key)
+        else:
+            self._store.complete(key, result)
+        return result
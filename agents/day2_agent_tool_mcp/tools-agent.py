@@ -9,6 +9,8 @@ from google.adk.sessions import InMemorySessionService
 from google.adk.tools import google_search, AgentTool, ToolContext
 from google.adk.code_executors import BuiltInCodeExecutor
 
+from event_router import EventRouter
+
 print("✅ ADK components imported successfully.")
 
 def load_api_key():
@@ -67,24 +69,49 @@ from google.adk.code_executors import BuiltInCodeExecutor
 
 print("✅ ADK components imported successfully.")
 
-def show_python_code_and_result(response):
-    for i in range(len(response)):
-        # Check if the response contains a valid function call result from the code executor
-        if (
-            (response[i].content.parts)
-            and (response[i].content.parts[0])
-            and (response[i].content.parts[0].function_response)
-            and (response[i].content.parts[0].function_response.response)
-        ):
-            response_code = response[i].content.parts[0].function_response.response
-            if "result" in response_code and response_code["result"] != "```":
-                if "tool_code" in response_code["result"]:
-                    print(
-                        "Generated Python Code >> ",
-                        response_code["result"].replace("tool_code", ""),
-                    )
-                else:
-                    print("Generated Python Response >> ", response_code["result"])
+def show_python_code_and_result(event, part):
+    """Prints code generated by the calculation agent as soon as its result arrives."""
+    response_code = part.function_response.response
+    # Check if the response contains a valid function call result from the code executor
+    if response_code and "result" in response_code and response_code["result"] != "```":
+        if "tool_code" in response_code["result"]:
+            print(
+                "Generated Python Code >> ",
+                response_code["result"].replace("tool_code", ""),
+            )
+        else:
+            print("Generated Python Response >> ", response_code["result"])
+
+
+def show_code_execution_result(event, part):
+    """Prints the output of code run by the built-in code executor."""
+    print("Code Execution Result >> ", part.code_execution_result.output)
+
+
+def print_agent_text(event, part):
+    """Prints the agent's text responses."""
+    print(f"Agent > {part.text}")
+
+
+async def run_streaming(runner_instance: InMemoryRunner, query: str):
+    """Runs a query and handles each event as soon as the runner yields it."""
+    session = await runner_instance.session_service.create_session(
+        app_name=runner_instance.app_name, user_id="debug_user_id"
+    )
+    print(f"\nUser > {query}")
+
+    router = EventRouter()
+    router.on_text(print_agent_text)
+    router.on_function_response(show_python_code_and_result)
+    router.on_code_result(show_code_execution_result)
+
+    await router.consume(
+        runner_instance.run_async(
+            user_id="debug_user_id",
+            session_id=session.id,
+            new_message=types.Content(role="user", parts=[types.Part(text=query)]),
+        )
+    )
 
 
 print("✅ Helper functions defined.")
@@ -263,17 +290,16 @@ print("✅ Runner created.")
 enhanced_runner = InMemoryRunner(agent=enhanced_currency_agent)
 
 async def run_debug():
-    response = await currency_runner.run_debug(
-    "I want to convert 500 US Dollars to Euros using my Platinum Credit Card. How much will I receive?"
-)
-    show_python_code_and_result(response)
+    await run_streaming(
+        currency_runner,
+        "I want to convert 500 US Dollars to Euros using my Platinum Credit Card. How much will I receive?",
+    )
 
 async def run_debug2():
-    response = await enhanced_runner.run_debug(
-    "Convert 1,250 USD to INR using a Bank Transfer. Show me the precise calculation."
-)
-    show_python_code_and_result(response)
+    await run_streaming(
+        enhanced_runner,
+        "Convert 1,250 USD to INR using a Bank Transfer. Show me the precise calculation.",
+    )
 
 asyncio.run(run_debug())
 asyncio.run(run_debug2())
-
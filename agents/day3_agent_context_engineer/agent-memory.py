@@ -11,7 +11,7 @@ from typing import Any, Dict
 from google.adk.agents import LlmAgent
 from google.adk.models.google_llm import Gemini
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
+from session_services import InMemorySessionService
 from google.adk.memory import InMemoryMemoryService
 from google.adk.tools import load_memory, preload_memory
 from google.genai import types
@@ -71,15 +71,10 @@ async def run_session(
     """Helper function to run queries in a session and display responses."""
     print(f"\n### Session: {session_id}")
 
-    # Create or retrieve session
-    try:
-        session = await session_service.create_session(
-            app_name=APP_NAME, user_id=USER_ID, session_id=session_id
-        )
-    except:
-        session = await session_service.get_session(
-            app_name=APP_NAME, user_id=USER_ID, session_id=session_id
-        )
+    # Create or retrieve session (single atomic call)
+    session = await session_service.get_or_create_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+    )
 
     # Convert single query to list
     if isinstance(user_queries, str):
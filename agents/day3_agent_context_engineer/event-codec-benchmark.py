@@ -0,0 +1,186 @@
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import warnings
+warnings.filterwarnings("ignore")
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.sessions.session import Session
+from google.genai import types
+from pydantic import TypeAdapter
+
+from event_codec import EventCodec
+from session_services import DatabaseSessionService, EventWindowConfig
+
+# Database size and session load latency for the same conversation stored as:
+#   adk:        ADK's layout (pickled actions, JSON text columns)
+#   codec:      event_codec.py without compression
+#   codec+zlib: event_codec.py, content over 1 KB zlib-compressed
+#
+# "data B/ev" is the stored bytes per event; the file size also includes page
+# overhead (rows above ~4 KB spill into whole overflow pages).
+#
+# Loads are timed three ways: get_session alone (content stays encoded with
+# the codec), get_session + reading every event's content (what building a
+# model request does), and the last 50 events. Each layout's freshly loaded
+# session must also survive JSON and back unchanged, both dumped itself and
+# as a declared Session (what API responses and caches do with it).
+#
+# Run from this folder:
+#   python event-codec-benchmark.py
+#   python event-codec-benchmark.py --turns 2000 --reply-bytes 7000
+
+APP_NAME = "default"
+USER_ID = "default"
+SESSION_ID = "long-conversation"
+
+WORDS = (
+    "the agent session event state tool call result user model reply order shipping container "
+    "port approval memory context summary research draft story token latency database index "
+    "compaction invocation runner callback response request quickly carefully because however"
+).split()
+
+
+def prose(rng, size):
+    text = []
+    length = 0
+    while length < size:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 16))).capitalize() + ". "
+        text.append(sentence)
+        length += len(sentence)
+    return "".join(text)
+
+
+def conversation(turns, reply_bytes, seed=7):
+    """User question, tool call, tool result and a long model reply per turn."""
+    rng = random.Random(seed)
+    events = []
+    for turn in range(turns):
+        invocation_id = f"inv-{turn}"
+        call = types.FunctionCall(id=f"call-{turn}", name="research", args={"topic": prose(rng, 40)})
+        events += [
+            Event(
+                invocation_id=invocation_id,
+                author="user",
+                content=types.Content(role="user", parts=[types.Part(text=prose(rng, 200))]),
+            ),
+            Event(
+                invocation_id=invocation_id,
+                author="research_agent",
+                content=types.Content(role="model", parts=[types.Part(function_call=call)]),
+            ),
+            Event(
+                invocation_id=invocation_id,
+                author="research_agent",
+                content=types.Content(
+                    role="user",
+                    parts=[
+                        types.Part(
+                            function_response=types.FunctionResponse(
+                                id=call.id, name="research", response={"findings": prose(rng, 1500)}
+                            )
+                        )
+                    ],
+                ),
+            ),
+            Event(
+                invocation_id=invocation_id,
+                author="research_agent",
+                content=types.Content(role="model", parts=[types.Part(text=prose(rng, reply_bytes))]),
+                actions=EventActions(state_delta={"last_topic": turn}),
+                usage_metadata=types.GenerateContentResponseUsageMetadata(
+                    prompt_token_count=1200 + turn, candidates_token_count=1700, total_token_count=2900 + turn
+                ),
+            ),
+        ]
+    return events
+
+
+async def time_load(service, repeat, config=None, touch_content=False):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        session = await service.get_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID, config=config
+        )
+        if touch_content:
+            for event in session.events:
+                event.content
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+async def check_round_trip(service, events):
+    async def load():
+        return await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
+
+    session = await load()
+    restored = type(session).model_validate_json(session.model_dump_json())
+    assert restored.model_dump() == session.model_dump(), "session changed through JSON"
+    # Serialized with the Session schema, as a FastAPI response_model does
+    restored = Session.model_validate_json(TypeAdapter(Session).dump_json(await load()))
+    for label, loaded in (("dumped", session), ("as Session", restored)):
+        contents = [event.content for event in loaded.events]
+        assert contents == [event.content for event in events], f"content lost ({label})"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Event codec: database size and load latency")
+    parser.add_argument("--turns", type=int, default=500, help="4 events per turn")
+    parser.add_argument("--reply-bytes", type=int, default=7000, help="Size of each model reply")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    codecs = {
+        "adk": None,
+        "codec": EventCodec(compress_threshold=1 << 30),
+        "codec+zlib": EventCodec(),
+    }
+    events = conversation(args.turns, args.reply_bytes)
+    print(f"\n{len(events)} events, {args.reply_bytes} byte model replies\n")
+    print(
+        f"{'layout':<12}{'DB MB':>8}{'B/event':>9}{'data B/ev':>11}{'write s':>9}"
+        f"{'load ms':>9}{'+content':>10}{'last 50':>9}"
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, codec in codecs.items():
+            db_path = os.path.join(tmp, f"{label}.db")
+            service = DatabaseSessionService(db_url=f"sqlite:///{db_path}", event_codec=codec)
+            session = await service.create_session(
+                app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
+            )
+            start = time.perf_counter()
+            for i in range(0, len(events), 200):
+                service._write_events(session, events[i:i + 200])
+            write_seconds = time.perf_counter() - start
+            size = os.path.getsize(db_path)
+            with sqlite3.connect(db_path) as connection:
+                data = connection.execute(
+                    "SELECT SUM(IFNULL(LENGTH(actions), 0) + IFNULL(LENGTH(content), 0)"
+                    " + IFNULL(LENGTH(usage_metadata), 0) + IFNULL(LENGTH(payload), 0)) FROM events"
+                ).fetchone()[0]
+
+            await check_round_trip(service, events)
+            load = await time_load(service, args.repeat)
+            with_content = await time_load(service, args.repeat, touch_content=True)
+            recent = await time_load(
+                service, args.repeat, EventWindowConfig(num_recent_events=50), touch_content=True
+            )
+            print(
+                f"{label:<12}{size / 1e6:>8.2f}{size / len(events):>9.0f}"
+                f"{data / len(events):>11.0f}{write_seconds:>9.2f}"
+                f"{load:>9.1f}{with_content:>10.1f}{recent:>9.1f}"
+            )
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
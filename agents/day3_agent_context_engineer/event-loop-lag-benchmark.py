@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import warnings
+warnings.filterwarnings("ignore")
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.genai import types
+
+from session_services import DatabaseSessionService
+from sqlite_session_service import SqliteSessionService
+from threaded_session_service import ThreadedSessionService
+
+# Event loop responsiveness while 100 chat sessions write to SQLite:
+#   adk:           ADK's DatabaseSessionService, called on the event loop
+#   sqlite:        SqliteSessionService (WAL, tuned), on the event loop
+#   ...+threads:   the same service behind ThreadedSessionService
+#
+# All sessions share one event loop, like one server process. Each turn
+# appends the user's message, "calls the model" (an asyncio.sleep), then
+# appends a long reply with a state update. A probe task asks for a 5 ms sleep
+# over and over; "lag" is how late it wakes up, i.e. how long something else
+# held the loop. A session's "turn" time is its whole turn minus the model's
+# simulated time.
+#
+# Run from this folder:
+#   python event-loop-lag-benchmark.py
+#   python event-loop-lag-benchmark.py --sessions 100 --turns 10 --reply-bytes 20000
+
+APP_NAME = "default"
+PROBE_INTERVAL = 0.005
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def probe(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+
+async def chat(service, user_id, turns, reply_bytes, model_seconds, turn_times):
+    session = await service.create_session(app_name=APP_NAME, user_id=user_id)
+    for turn in range(turns):
+        start = time.perf_counter()
+        invocation_id = f"inv-{turn}"
+        await service.append_event(
+            session,
+            Event(
+                invocation_id=invocation_id,
+                author="user",
+                content=types.Content(role="user", parts=[types.Part(text=f"Question {turn}?")]),
+            ),
+        )
+        await asyncio.sleep(model_seconds)
+        await service.append_event(
+            session,
+            Event(
+                invocation_id=invocation_id,
+                author="chat_bot",
+                content=types.Content(role="model", parts=[types.Part(text="a" * reply_bytes)]),
+                actions=EventActions(state_delta={"turns": turn + 1}),
+            ),
+        )
+        turn_times.append(time.perf_counter() - start - model_seconds)
+
+
+async def run(service, args):
+    lags, turn_times = [], []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[
+            chat(service, f"user-{i}", args.turns, args.reply_bytes, args.model_ms / 1000, turn_times)
+            for i in range(args.sessions)
+        ]
+    )
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+    events = args.sessions * args.turns * 2
+    return lags, turn_times, events / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Event loop lag with concurrent sessions writing to SQLite")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--reply-bytes", type=int, default=20_000)
+    parser.add_argument("--model-ms", type=float, default=50, help="Simulated model latency per turn")
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    print(
+        f"\n{args.sessions} sessions x {args.turns} turns, {args.reply_bytes} byte replies, "
+        f"{args.model_ms:.0f} ms model\n"
+    )
+    print(
+        f"{'service':<16}{'lag p50':>9}{'lag p99':>9}{'lag max':>9}"
+        f"{'turn p50':>10}{'turn p99':>10}{'events/s':>10}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        services = {
+            "adk": lambda path: DatabaseSessionService(f"sqlite:///{path}", auto_migrate=False),
+            "sqlite": lambda path: SqliteSessionService(path, batch_invocation_events=False),
+        }
+        for label, make in services.items():
+            for threaded in (False, True):
+                service = make(os.path.join(tmp, f"{label}-{threaded}.db"))
+                if threaded:
+                    service = ThreadedSessionService(service, threads=args.threads)
+                    label += "+threads"
+                lags, turn_times, throughput = await run(service, args)
+                if hasattr(service, "close"):
+                    service.close()
+                print(
+                    f"{label:<16}"
+                    f"{statistics.median(lags) * 1000:>9.1f}{percentile(lags, 0.99) * 1000:>9.1f}"
+                    f"{max(lags) * 1000:>9.1f}{statistics.median(turn_times) * 1000:>10.1f}"
+                    f"{percentile(turn_times, 0.99) * 1000:>10.1f}{throughput:>10.0f}"
+                )
+    print("\n(all times in ms)\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
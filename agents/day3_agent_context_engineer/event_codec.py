@@ -0,0 +1,243 @@
+"""Compact, versioned encoding for stored events.
+
+ADK's `DatabaseSessionService` stores every event with `actions` pickled
+(about 390 bytes even when empty) and each metadata object as its own JSON
+text column, and parses all of them on every load. `EventCodec` packs what
+isn't already a plain column into a single `payload` blob:
+
+    header   version (1 byte) | flags (1 byte) | extras length (4 bytes)
+    extras   compact JSON of actions + metadata, defaults and None left out
+             (pickle instead if a state value isn't JSON serializable)
+    content  compact JSON of event.content, zlib-compressed above
+             `compress_threshold` bytes
+
+Decoding builds a `StoredEvent`, which keeps `content` encoded until it's
+first needed. Loading a session for its state, its size, or the authors and
+timestamps of its events never parses the message bodies; serializing,
+copying or comparing it decodes them first (see `StoredEvent`).
+
+The format starts with a version byte, so old rows stay readable when it
+changes. session_migrations.py re-encodes existing databases
+(`--encode-events`). Stock ADK can't read encoded rows: `--decode-events`
+writes them back in its layout before switching a database back.
+
+Usage:
+
+    from event_codec import EventCodec
+    from sqlite_session_service import SqliteSessionService
+
+    session_service = SqliteSessionService("my_agent_data.db", event_codec=EventCodec())
+"""
+
+import json
+import pickle
+import struct
+import zlib
+from datetime import datetime
+from typing import Any, Optional
+
+from google.adk.events.event import Event
+from google.adk.sessions.database_session_service import StorageEvent
+from google.adk.sessions.session import Session
+from google.genai import types
+from pydantic import BaseModel, PrivateAttr
+from pydantic_core import PydanticSerializationError
+
+CODEC_VERSION = 1
+
+FLAG_CONTENT_ZLIB = 0x01
+FLAG_EXTRAS_PICKLE = 0x02
+
+_HEADER = struct.Struct("<BBI")
+
+# Stored in their own columns (indexed or shown by the inspection tools)
+COLUMN_FIELDS = {
+    "id",
+    "invocation_id",
+    "author",
+    "branch",
+    "timestamp",
+    "long_running_tool_ids",
+    "partial",
+    "turn_complete",
+    "error_code",
+    "error_message",
+    "interrupted",
+}
+
+# The real instance dict of a pydantic model (BaseModel declares the slot)
+_instance_dict = BaseModel.__dict__["__dict__"]
+
+
+class StoredEvent(Event):
+    """An Event loaded from storage whose content is decoded on first access.
+
+    Reading `content` decodes it. So does reading `__dict__`, which is where
+    pydantic takes the fields from to serialize, copy, compare or pickle a
+    model, including a Session dumping its events with the declared `Event`
+    schema (no method of the subclass is called there).
+    """
+
+    _encoded_content: Optional[bytes] = PrivateAttr(default=None)
+    _content_compressed: bool = PrivateAttr(default=False)
+
+    @property
+    def __dict__(self) -> dict[str, Any]:
+        fields = _instance_dict.__get__(self)
+        if "content" not in fields:
+            self._decode_content(fields)
+        return fields
+
+    @__dict__.setter
+    def __dict__(self, fields: dict[str, Any]):
+        _instance_dict.__set__(self, fields)
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "content":
+            return self.__dict__["content"]
+        return super().__getattr__(name)
+
+    def _decode_content(self, fields: dict[str, Any]):
+        private = self.__pydantic_private__
+        encoded = private["_encoded_content"]
+        if encoded is None:
+            # Another thread got here first
+            return
+        if private["_content_compressed"]:
+            encoded = zlib.decompress(encoded)
+        fields["content"] = types.Content.model_validate_json(encoded)
+        private["_encoded_content"] = None
+
+    @property
+    def content_decoded(self) -> bool:
+        return "content" in _instance_dict.__get__(self)
+
+
+class EventCodec:
+    """Encodes events into one compact payload and back."""
+
+    def __init__(self, compress_threshold: int = 1024, compress_level: int = 6):
+        """
+        Args:
+            compress_threshold: Content at least this many bytes (as JSON) is
+                zlib-compressed, if that makes it smaller
+            compress_level: zlib level, 1 (fast) to 9 (small)
+        """
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+
+    def encode(self, event: Event) -> bytes:
+        flags = 0
+        exclude = COLUMN_FIELDS | {"content"}
+        try:
+            extras = event.model_dump_json(
+                exclude=exclude, exclude_none=True, exclude_defaults=True
+            ).encode()
+        except PydanticSerializationError:
+            extras = pickle.dumps(
+                event.model_dump(exclude=exclude, exclude_none=True, exclude_defaults=True)
+            )
+            flags |= FLAG_EXTRAS_PICKLE
+
+        content = b""
+        if event.content is not None:
+            content = event.content.model_dump_json(exclude_none=True).encode()
+            if len(content) >= self.compress_threshold:
+                compressed = zlib.compress(content, self.compress_level)
+                if len(compressed) < len(content):
+                    content = compressed
+                    flags |= FLAG_CONTENT_ZLIB
+
+        return _HEADER.pack(CODEC_VERSION, flags, len(extras)) + extras + content
+
+    def decode(self, payload: bytes, **columns: Any) -> StoredEvent:
+        """Rebuilds the event from its payload and its column values (COLUMN_FIELDS)."""
+        version, flags, extras_length = _HEADER.unpack_from(payload)
+        if version != CODEC_VERSION:
+            raise ValueError(f"Unsupported event codec version {version}")
+        start = _HEADER.size
+        extras = payload[start:start + extras_length]
+        if flags & FLAG_EXTRAS_PICKLE:
+            fields = pickle.loads(extras)
+        else:
+            fields = json.loads(extras)
+        fields.update({key: value for key, value in columns.items() if value is not None})
+
+        event = StoredEvent.model_validate(fields)
+        content = payload[start + extras_length:]
+        if content:
+            event._encoded_content = bytes(content)
+            event._content_compressed = bool(flags & FLAG_CONTENT_ZLIB)
+            del _instance_dict.__get__(event)["content"]
+        return event
+
+
+def event_row(app_name: str, user_id: str, session_id: str, event: Event, codec: EventCodec) -> dict:
+    """Column values for an encoded event (see session_migrations.stored_events)."""
+    long_running_tool_ids = event.long_running_tool_ids
+    return {
+        "id": event.id,
+        "app_name": app_name,
+        "user_id": user_id,
+        "session_id": session_id,
+        "invocation_id": event.invocation_id,
+        "author": event.author,
+        "branch": event.branch,
+        "timestamp": datetime.fromtimestamp(event.timestamp),
+        "long_running_tool_ids_json": (
+            json.dumps(list(long_running_tool_ids)) if long_running_tool_ids is not None else None
+        ),
+        "partial": event.partial,
+        "turn_complete": event.turn_complete,
+        "error_code": event.error_code,
+        "error_message": event.error_message,
+        "interrupted": event.interrupted,
+        # NOT NULL in ADK's schema; everything it held is in the payload
+        "actions": b"",
+        "content": None,
+        "grounding_metadata": None,
+        "custom_metadata": None,
+        "usage_metadata": None,
+        "citation_metadata": None,
+        "payload": codec.encode(event),
+    }
+
+
+def adk_event_row(app_name: str, user_id: str, session_id: str, event: Event) -> dict:
+    """Column values for an event in ADK's layout, as its DatabaseSessionService writes it."""
+    session = Session(id=session_id, app_name=app_name, user_id=user_id)
+    storage_event = StorageEvent.from_event(session, event)
+    values = {key: getattr(storage_event, key) for key in StorageEvent.__table__.columns.keys()}
+    # stored_events reads `actions` as raw bytes
+    values["actions"] = pickle.dumps(event.actions, pickle.HIGHEST_PROTOCOL)
+    values["payload"] = None
+    return values
+
+
+_decoder = EventCodec()
+
+
+def row_to_event(row) -> Event:
+    """Event for a row of session_migrations.stored_events, encoded or in ADK's layout."""
+    if row.payload is None:
+        columns = {key: getattr(row, key) for key in StorageEvent.__table__.columns.keys()}
+        columns["actions"] = pickle.loads(row.actions)
+        return StorageEvent(**columns).to_event()
+
+    long_running_tool_ids = row.long_running_tool_ids_json
+    return _decoder.decode(
+        row.payload,
+        id=row.id,
+        invocation_id=row.invocation_id,
+        author=row.author,
+        branch=row.branch,
+        timestamp=row.timestamp.timestamp(),
+        long_running_tool_ids=(
+            set(json.loads(long_running_tool_ids)) if long_running_tool_ids else None
+        ),
+        partial=row.partial,
+        turn_complete=row.turn_complete,
+        error_code=row.error_code,
+        error_message=row.error_message,
+        interrupted=row.interrupted,
+    )
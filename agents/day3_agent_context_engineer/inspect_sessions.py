@@ -0,0 +1,261 @@
+"""Look inside a session database without loading it into memory.
+
+Rows are streamed in batches (`yield_per`; a server-side cursor on
+PostgreSQL), so memory stays flat on a multi-GB database. Filters on app,
+user and session, plus a time range, follow the
+`ix_events_session_timestamp` index from session_migrations.py. Events are
+read in index order, so nothing has to be sorted first. The author filter
+is checked on the rows the index selects. Events in ADK's layout and in the
+event_codec.py encoding both decode.
+
+Nothing is written: an unmigrated database is read as it is, only slower
+(run session_migrations.py for the index).
+
+Run from this folder:
+
+    python inspect_sessions.py my_agent_data.db
+    python inspect_sessions.py my_agent_data.db --app default --session test-db-session-01
+    python inspect_sessions.py my_agent_data_compact.db --author user --since 2025-11-20T10:00 --format jsonl
+    python inspect_sessions.py my_agent_data.db --sessions --user default
+
+Or from code:
+
+    import inspect_sessions
+    inspect_sessions.print_events("sqlite:///my_agent_data.db", app_name=APP_NAME)
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import warnings
+from datetime import datetime
+from typing import Iterator, Optional
+
+from google.adk.events.event_actions import EventCompaction
+from google.adk.sessions.database_session_service import StorageSession
+from sqlalchemy import create_engine, func, null, select
+from sqlalchemy.exc import SAWarning
+
+from event_codec import row_to_event
+from session_migrations import has_event_payload, stored_events
+
+sessions = StorageSession.__table__
+
+
+def _parse_time(value: str) -> datetime:
+    """ISO date/time or Unix seconds."""
+    try:
+        return datetime.fromtimestamp(float(value))
+    except ValueError:
+        return datetime.fromisoformat(value)
+
+
+def _event_query(
+    bind,
+    app_name: Optional[str] = None,
+    user_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+    author: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    if has_event_payload(bind):
+        query = select(stored_events)
+    else:
+        query = select(
+            *[column for column in stored_events.c if column.name != "payload"], null().label("payload")
+        )
+    c = stored_events.c
+    for column, value in (
+        (c.app_name, app_name),
+        (c.user_id, user_id),
+        (c.session_id, session_id),
+        (c.author, author),
+    ):
+        if value is not None:
+            query = query.where(column == value)
+    if since is not None:
+        query = query.where(c.timestamp >= since)
+    if until is not None:
+        query = query.where(c.timestamp < until)
+    # The index's own order, so rows stream without a sort
+    return query.order_by(c.app_name, c.user_id, c.session_id, c.timestamp)
+
+
+def iter_events(db_url: str, *, batch_size: int = 500, full: bool = False, **filters) -> Iterator[dict]:
+    """Matching events as dicts, streamed `batch_size` rows at a time.
+
+    Args:
+        db_url: SQLAlchemy database URL
+        batch_size: Rows fetched per round trip
+        full: The whole event (model_dump), instead of a one-line summary
+        **filters: app_name, user_id, session_id, author, since, until
+    """
+    engine = create_engine(db_url)
+    try:
+        with engine.connect() as connection:
+            rows = connection.execution_options(yield_per=batch_size).execute(
+                _event_query(connection, **filters)
+            )
+            for row in rows:
+                event = row_to_event(row)
+                if isinstance(event.actions.compaction, dict):
+                    # ADK's StorageEvent.to_event copies actions without validating them
+                    event.actions.compaction = EventCompaction.model_validate(event.actions.compaction)
+                record = {
+                    "app_name": row.app_name,
+                    "user_id": row.user_id,
+                    "session_id": row.session_id,
+                }
+                if full:
+                    record.update(event.model_dump(mode="json", exclude_none=True))
+                else:
+                    record.update(_summary(event))
+                yield record
+    finally:
+        engine.dispose()
+
+
+def _summary(event) -> dict:
+    parts = event.content.parts if event.content and event.content.parts else []
+    text = " ".join(part.text for part in parts if part.text)
+    calls = [part.function_call.name for part in parts if part.function_call]
+    results = [part.function_response.name for part in parts if part.function_response]
+    summary = {
+        "timestamp": datetime.fromtimestamp(event.timestamp).isoformat(sep=" ", timespec="seconds"),
+        "id": event.id,
+        "invocation_id": event.invocation_id,
+        "author": event.author,
+        "text": text,
+    }
+    if calls:
+        summary["calls"] = calls
+    if results:
+        summary["results"] = results
+    if event.actions.state_delta:
+        summary["state_delta"] = sorted(event.actions.state_delta)
+    if event.actions.compaction:
+        compacted = event.actions.compaction.compacted_content
+        summary["compaction"] = True
+        summary["text"] = " ".join(part.text for part in compacted.parts if part.text) if compacted else ""
+    return summary
+
+
+def iter_sessions(
+    db_url: str, *, app_name: Optional[str] = None, user_id: Optional[str] = None, batch_size: int = 500
+) -> Iterator[dict]:
+    """Sessions with their event counts (one index range count each), streamed."""
+    e = stored_events.c
+    event_count = (
+        select(func.count())
+        .where(e.app_name == sessions.c.app_name, e.user_id == sessions.c.user_id, e.session_id == sessions.c.id)
+        .scalar_subquery()
+    )
+    query = select(
+        sessions.c.app_name, sessions.c.user_id, sessions.c.id, sessions.c.update_time, event_count.label("events")
+    )
+    if app_name is not None:
+        query = query.where(sessions.c.app_name == app_name)
+    if user_id is not None:
+        query = query.where(sessions.c.user_id == user_id)
+    engine = create_engine(db_url)
+    try:
+        with engine.connect() as connection:
+            for row in connection.execution_options(yield_per=batch_size).execute(query):
+                yield {
+                    "app_name": row.app_name,
+                    "user_id": row.user_id,
+                    "session_id": row.id,
+                    "update_time": row.update_time.isoformat(sep=" ", timespec="seconds"),
+                    "events": row.events,
+                }
+    finally:
+        engine.dispose()
+
+
+def write_table(records: Iterator[dict], columns: list[str], out=sys.stdout):
+    """One line per record; the last column is cut to the terminal width."""
+    width = shutil.get_terminal_size((160, 24)).columns
+    fixed = {"timestamp": 19, "update_time": 19, "app_name": 14, "user_id": 14, "session_id": 22, "author": 16}
+    header = "  ".join(f"{name:<{fixed.get(name, 0)}}" for name in columns)
+    out.write(header.rstrip() + "\n")
+    count = 0
+    for record in records:
+        cells = []
+        for name in columns:
+            value = record.get(name, "")
+            if isinstance(value, list):
+                value = ",".join(map(str, value))
+            value = str(value).replace("\n", " ")
+            if name == "text" and record.get("compaction"):
+                value = f"[compaction] {value}"
+            elif name == "text" and not value:
+                value = " ".join(
+                    [f"[call] {call}" for call in record.get("calls", [])]
+                    + [f"[result] {result}" for result in record.get("results", [])]
+                )
+            size = fixed.get(name)
+            cells.append(f"{value[:size]:<{size}}" if size else value)
+        out.write("  ".join(cells)[:width] + "\n")
+        count += 1
+    out.write(f"({count} rows)\n")
+
+
+def write_jsonl(records: Iterator[dict], out=sys.stdout):
+    for record in records:
+        out.write(json.dumps(record, default=str) + "\n")
+
+
+def print_events(db_url: str, *, format: str = "table", batch_size: int = 500, **filters):
+    """Prints the matching events as a table, "jsonl" summaries or "jsonl-full" events."""
+    records = iter_events(db_url, batch_size=batch_size, full=(format == "jsonl-full"), **filters)
+    if format == "table":
+        write_table(records, ["timestamp", "session_id", "author", "text"])
+    else:
+        write_jsonl(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream and filter a session database")
+    parser.add_argument("database", help="SQLite file or SQLAlchemy URL")
+    parser.add_argument("--app", dest="app_name")
+    parser.add_argument("--user", dest="user_id")
+    parser.add_argument("--session", dest="session_id")
+    parser.add_argument("--author")
+    parser.add_argument("--since", type=_parse_time, help="ISO time or Unix seconds (inclusive)")
+    parser.add_argument("--until", type=_parse_time, help="ISO time or Unix seconds (exclusive)")
+    parser.add_argument("--format", choices=["table", "jsonl", "jsonl-full"], default="table")
+    parser.add_argument("--sessions", action="store_true", help="List sessions instead of events")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    # ADK's JSON column type doesn't declare itself cacheable
+    warnings.filterwarnings("ignore", category=SAWarning)
+
+    db_url = args.database if "://" in args.database else f"sqlite:///{args.database}"
+    try:
+        if args.sessions:
+            records = iter_sessions(db_url, app_name=args.app_name, user_id=args.user_id, batch_size=args.batch_size)
+            if args.format == "table":
+                write_table(records, ["update_time", "app_name", "user_id", "session_id", "events"])
+            else:
+                write_jsonl(records)
+            return
+        print_events(
+            db_url,
+            format=args.format,
+            batch_size=args.batch_size,
+            app_name=args.app_name,
+            user_id=args.user_id,
+            session_id=args.session_id,
+            author=args.author,
+            since=args.since,
+            until=args.until,
+        )
+    except BrokenPipeError:
+        # Piped into head & co.
+        sys.stderr.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 import os
 import uuid
 import asyncio
-import sqlite3
 
 from typing import Any, Dict
 
@@ -11,7 +10,12 @@ from google.adk.agents import LlmAgent, Agent
 from google.adk.apps.app import App, ResumabilityConfig, EventsCompactionConfig
 from google.adk.models.google_llm import Gemini
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService, DatabaseSessionService
+from session_services import InMemorySessionService, DatabaseSessionService
+from sqlite_session_service import SqliteSessionService
+from threaded_session_service import ThreadedSessionService
+from session_cache import SessionCache
+from session_archive import SessionArchive
+import inspect_sessions
 from google.adk.tools.function_tool import FunctionTool
 from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
 from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
@@ -78,15 +82,10 @@ async def run_session(
     # Get app name from the Runner
     app_name = runner_instance.app_name
 
-    # Attempt to create a new session or retrieve an existing one
-    try:
-        session = await session_service.create_session(
-            app_name=app_name, user_id=USER_ID, session_id=session_name
-        )
-    except:
-        session = await session_service.get_session(
-            app_name=app_name, user_id=USER_ID, session_id=session_name
-        )
+    # Create a new session or retrieve an existing one (single atomic call)
+    session = await session_service.get_or_create_session(
+        app_name=app_name, user_id=USER_ID, session_id=session_name
+    )
 
     # Process queries if provided
     if user_queries:
@@ -138,7 +137,13 @@ chatbot_agent = LlmAgent(
 # Step 2: Switch to DatabaseSessionService
 # SQLite database will be created automatically
 db_url = "sqlite:///my_agent_data.db"  # Local SQLite file
-session_service = DatabaseSessionService(db_url=db_url)
+# WAL + tuned pragmas, and each invocation's events written in one transaction.
+# The database work runs on its own threads so commits never block the event loop,
+# and the session of the previous turn is reused from memory instead of reloaded
+# Sessions archived by session_retention.py come back from here on their next use
+session_service = ThreadedSessionService(
+    SqliteSessionService(db_url, session_cache=SessionCache(), archive=SessionArchive("my_agent_data_archive"))
+)
 
 # Step 3: Create a new runner with persistent storage
 runner = Runner(agent=chatbot_agent, app_name=APP_NAME, session_service=session_service)
@@ -149,14 +154,9 @@ print(f"   - Sessions will survive restarts!")
 
 # Database Check Function
 def check_data_in_db():
-    with sqlite3.connect("my_agent_data.db") as connection:
-        cursor = connection.cursor()
-        result = cursor.execute(
-            "select app_name, session_id, author, content from events"
-        )
-        print([_[0] for _ in result.description])
-        for each in result.fetchall():
-            print(each)
+    # Streams this app's events from the database the session service writes;
+    # `python inspect_sessions.py --help` has more filters and JSONL output
+    inspect_sessions.print_events(db_url, app_name=APP_NAME)
 
 
 async def main():
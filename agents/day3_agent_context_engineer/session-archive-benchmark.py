@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import warnings
+warnings.filterwarnings("ignore")
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.genai import types
+
+from session_archive import SessionArchive
+from sqlite_session_service import SqliteSessionService
+
+# A session database where most conversations are finished, before and
+# after moving them to cold storage with archive_session (what
+# session_retention.py does for sessions idle past --idle-days):
+#
+#   db MB       the SQLite file (VACUUMed after archiving)
+#   archive MB  the gzipped segments
+#   get ms      median get_session of a still-active session
+#   list ms     list_sessions for the whole app (archived sessions included)
+#   backup s    copying the database file
+#
+# and the cost of bringing an archived session back on its next use.
+#
+# Run from this folder:
+#   python session-archive-benchmark.py
+#   python session-archive-benchmark.py --sessions 2000 --events 100 --active 0.05
+
+APP_NAME = "default"
+
+
+def conversation(turns):
+    def event(author, text, state_delta=None):
+        return Event(
+            invocation_id=f"inv-{len(text)}",
+            author=author,
+            content=types.Content(role="user" if author == "user" else "model", parts=[types.Part(text=text)]),
+            actions=EventActions(state_delta=state_delta or {}),
+        )
+
+    for turn in range(turns):
+        yield event("user", f"Question number {turn}, what about the order?")
+        yield event("assistant", f"Here is a long answer about turn {turn}. " * 12, {"turns": turn})
+
+
+async def timed_gets(service, keys, repeat=5):
+    times = []
+    for _ in range(repeat):
+        for user_id, session_id in keys:
+            start = time.perf_counter()
+            await service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+            times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+async def measure(service, db_path, active_keys):
+    get_ms = await timed_gets(service, active_keys)
+    start = time.perf_counter()
+    listed = await service.list_sessions(app_name=APP_NAME)
+    list_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    with open(db_path, "rb") as src, open(db_path + ".backup", "wb") as dst:
+        while chunk := src.read(1 << 20):
+            dst.write(chunk)
+        dst.flush()
+        os.fsync(dst.fileno())
+    backup_s = time.perf_counter() - start
+    os.remove(db_path + ".backup")
+    return os.path.getsize(db_path) / 1e6, get_ms, list_ms, len(listed.sessions), backup_s
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Hot database size and speed before/after archiving idle sessions")
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--events", type=int, default=40, help="Events per session")
+    parser.add_argument("--active", type=float, default=0.1, help="Share of sessions still in use")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "sessions.db")
+        archive = SessionArchive(os.path.join(tmp, "archive"))
+        service = SqliteSessionService(db_path, archive=archive)
+        keys = [(f"user-{i % 50}", f"order_{i}") for i in range(args.sessions)]
+        for user_id, session_id in keys:
+            session = await service.get_or_create_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+            for event in conversation(args.events // 2):
+                await service.append_event(session, event)
+        service.flush()
+
+        active = int(len(keys) * args.active)
+        active_keys, finished_keys = keys[:active], keys[active:]
+        print(f"\n{len(keys)} sessions x {args.events} events, {len(finished_keys)} finished\n")
+        print(f"{'':<16}{'db MB':>8}{'archive MB':>12}{'get ms':>8}{'list ms':>9}{'listed':>8}{'backup s':>10}")
+        db_mb, get_ms, list_ms, listed, backup_s = await measure(service, db_path, active_keys)
+        print(f"{'all in the db':<16}{db_mb:>8.1f}{0:>12.1f}{get_ms:>8.2f}{list_ms:>9.1f}{listed:>8}{backup_s:>10.3f}")
+
+        start = time.perf_counter()
+        for user_id, session_id in finished_keys:
+            service.archive_session(APP_NAME, user_id, session_id)
+        archive_s = time.perf_counter() - start
+        with service.db_engine.connect() as connection:
+            connection.exec_driver_sql("VACUUM")
+        db_mb, get_ms, list_ms, listed, backup_s = await measure(service, db_path, active_keys)
+        archive_mb = archive.size() / 1e6
+        print(f"{'archived':<16}{db_mb:>8.1f}{archive_mb:>12.1f}{get_ms:>8.2f}{list_ms:>9.1f}{listed:>8}{backup_s:>10.3f}")
+
+        rehydrate, again = [], []
+        for user_id, session_id in finished_keys[:50]:
+            start = time.perf_counter()
+            session = await service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+            rehydrate.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            await service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+            again.append(time.perf_counter() - start)
+        print(
+            f"\narchiving: {archive_s / len(finished_keys) * 1000:.2f} ms/session"
+            f"  first get of an archived session: {statistics.median(rehydrate) * 1000:.2f} ms"
+            f" (next get {statistics.median(again) * 1000:.2f} ms, {len(session.events)} events)\n"
+        )
+        service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
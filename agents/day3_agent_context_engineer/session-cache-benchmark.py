@@ -0,0 +1,110 @@
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import warnings
+warnings.filterwarnings("ignore")
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.genai import types
+from sqlalchemy import event as sa_event
+
+from session_cache import SessionCache
+from sqlite_session_service import SqliteSessionService
+
+# Cost of the Runner's per-turn session load on a hot conversation:
+#   no cache:       SqliteSessionService, every turn loads the session from SQLite
+#   cache:          with session_cache=SessionCache()
+#   cache+check:    SessionCache(check_version=True), one version read per hit
+#
+# Each turn does what Runner.run_async does with the session: get_session,
+# then append the user message, a tool call, its result and the answer.
+# "queries/get" counts SQL statements sent by get_session.
+#
+# Run from this folder:
+#   python session-cache-benchmark.py
+#   python session-cache-benchmark.py --history 1000 --turns 200
+
+APP_NAME = "default"
+USER_ID = "default"
+SESSION_ID = "hot-conversation"
+
+
+def turn_events(turn):
+    def event(author, part, state_delta=None):
+        return Event(
+            invocation_id=f"inv-{turn}",
+            author=author,
+            content=types.Content(role="user" if author == "user" else "model", parts=[part]),
+            actions=EventActions(state_delta=state_delta or {}),
+        )
+
+    call = types.FunctionCall(id=f"call-{turn}", name="lookup", args={"turn": turn})
+    return [
+        event("user", types.Part(text=f"Question number {turn}, please look it up.")),
+        event("assistant", types.Part(function_call=call)),
+        event(
+            "assistant",
+            types.Part(
+                function_response=types.FunctionResponse(id=call.id, name="lookup", response={"result": "x" * 500})
+            ),
+        ),
+        event("assistant", types.Part(text=f"Here is the answer to question {turn}. " * 10), {"turns": turn}),
+    ]
+
+
+async def run(service, history, turns):
+    session = await service.get_or_create_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
+    for turn in range(history // 4):
+        for event in turn_events(turn):
+            await service.append_event(session, event)
+
+    queries = 0
+
+    def count(*_):
+        nonlocal queries
+        queries += 1
+
+    sa_event.listen(service.db_engine, "before_cursor_execute", count)
+    gets, totals, get_queries = [], [], 0
+    for turn in range(history // 4, history // 4 + turns):
+        start = time.perf_counter()
+        before = queries
+        session = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
+        gets.append(time.perf_counter() - start)
+        get_queries += queries - before
+        for event in turn_events(turn):
+            await service.append_event(session, event)
+        totals.append(time.perf_counter() - start)
+    sa_event.remove(service.db_engine, "before_cursor_execute", count)
+    return statistics.median(gets) * 1000, statistics.median(totals) * 1000, get_queries / turns, len(session.events)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Per-turn session loads with and without SessionCache")
+    parser.add_argument("--history", type=int, default=400, help="Events already in the conversation")
+    parser.add_argument("--turns", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"\n{args.history} events of history, {args.turns} more turns of 4 events\n")
+    print(f"{'service':<14}{'get ms':>8}{'turn ms':>9}{'queries/get':>13}{'events':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        caches = {
+            "no cache": None,
+            "cache": SessionCache(),
+            "cache+check": SessionCache(check_version=True),
+        }
+        for label, cache in caches.items():
+            service = SqliteSessionService(os.path.join(tmp, f"{label}.db"), session_cache=cache)
+            get_ms, turn_ms, queries, events = await run(service, args.history, args.turns)
+            service.close()
+            print(f"{label:<14}{get_ms:>8.2f}{turn_ms:>9.2f}{queries:>13.1f}{events:>8}")
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
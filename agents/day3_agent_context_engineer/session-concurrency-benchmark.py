@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+import warnings
+warnings.filterwarnings("ignore")
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.sessions.session import Session
+from google.genai import types
+
+from sqlite_session_service import SqliteSessionService
+
+# Several requests writing to the same session at once (double submits,
+# retries, a background compaction), each on its own thread: load the
+# session, append the user message, append the answer with a state change.
+#
+#   own keys:  every writer sets its own state key
+#   counter:   every writer increments the same `counter` key from the value
+#              it loaded, reloading and retrying when a write is refused
+#
+# Modes:
+#   adk check:  plain Session objects, ADK's update_time staleness check
+#   cas:        VersionedSession objects, compare-and-swap + rebase
+#
+#   failed   writes refused (stale or conflicting), each retried from a reload
+#   lost     counter increments that were silently overwritten
+#   misordered  writers whose own events aren't stored in the order they
+#               were written (question before answer, turn after turn)
+#
+# Run from this folder:
+#   python session-concurrency-benchmark.py
+#   python session-concurrency-benchmark.py --writers 16 --turns 50
+
+APP_NAME = "default"
+USER_ID = "default"
+SESSION_ID = "double-submit"
+
+
+def turn_events(writer, turn, state_delta):
+    def event(author, text, delta=None):
+        return Event(
+            invocation_id=f"w{writer}-{turn}",
+            author=author,
+            content=types.Content(role="user" if author == "user" else "model", parts=[types.Part(text=text)]),
+            actions=EventActions(state_delta=delta or {}),
+        )
+
+    return [event("user", f"w{writer} t{turn} q"), event("assistant", f"w{writer} t{turn} a", state_delta)]
+
+
+async def write_turns(service, writer, turns, workload, plain):
+    failed = 0
+    for turn in range(turns):
+        while True:
+            session = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
+            if plain:
+                session = Session.model_construct(**{name: getattr(session, name) for name in Session.model_fields})
+            if workload == "own keys":
+                delta = {f"w{writer}": turn}
+            else:
+                delta = {"counter": session.state.get("counter", 0) + 1}
+            try:
+                for event in turn_events(writer, turn, delta):
+                    await service.append_event(session, event)
+                break
+            except ValueError:
+                failed += 1
+    return failed
+
+
+def run(path, workload, plain, writers, turns):
+    # Each turn's events are written in one transaction (the default), so a
+    # refused turn leaves nothing behind
+    service = SqliteSessionService(path, pool_size=writers, pragmas={"busy_timeout": 60_000})
+    asyncio.run(service.get_or_create_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID))
+    failures, errors = [], []
+    start_line = threading.Barrier(writers + 1)
+
+    def worker(writer):
+        start_line.wait()
+        try:
+            failures.append(asyncio.run(write_turns(service, writer, turns, workload, plain)))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    start_line.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    session = asyncio.run(service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID))
+    texts = [event.content.parts[0].text for event in session.events]
+    misordered = 0
+    for writer in range(writers):
+        own = [text for text in texts if text.startswith(f"w{writer} ")]
+        if own != [f"w{writer} t{turn} {part}" for turn in range(turns) for part in ("q", "a")]:
+            misordered += 1
+    if workload == "own keys":
+        lost = sum(session.state.get(f"w{writer}") != turns - 1 for writer in range(writers))
+    else:
+        lost = writers * turns - session.state.get("counter", 0)
+    service.close()
+    return writers * turns / elapsed, sum(failures), len(session.events), lost, misordered, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent writes to one session: ADK's check vs compare-and-swap")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=25, help="Turns per writer (2 events each)")
+    args = parser.parse_args()
+
+    print(f"\n{args.writers} writers x {args.turns} turns on one session\n")
+    print(f"{'workload':<10}{'mode':<11}{'turns/s':>8}{'failed':>8}{'events':>8}{'lost':>6}{'misordered':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for workload in ("own keys", "counter"):
+            for mode, plain in (("adk check", True), ("cas", False)):
+                path = os.path.join(tmp, f"{workload}-{mode}.db".replace(" ", "-"))
+                throughput, failed, events, lost, misordered, errors = run(
+                    path, workload, plain, args.writers, args.turns
+                )
+                print(f"{workload:<10}{mode:<11}{throughput:>8.0f}{failed:>8}{events:>8}{lost:>6}{misordered:>12}")
+                if errors:
+                    print(f"          {len(errors)} writers crashed, first: {errors[0]!r}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import warnings
+warnings.filterwarnings("ignore")
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions, EventCompaction
+from google.adk.sessions.database_session_service import StorageEvent
+from google.genai import types
+from sqlalchemy import create_engine
+
+import session_migrations
+from session_services import DatabaseSessionService, EventWindowConfig
+
+# get_session latency for one long conversation (10k events by default) in a
+# database that also holds other sessions, before and after the migrations in
+# session_migrations.py (the events index and the compaction table):
+#   full:        every event, what ADK's get_session does by default
+#   last 50:     EventWindowConfig(num_recent_events=50)
+#   after ts:    events of the last ~100 turns via after_timestamp
+#   compaction:  latest compaction summary plus everything after it
+#
+# Run from this folder:
+#   python session-load-benchmark.py
+#   python session-load-benchmark.py --events 10000 --other-sessions 50 --repeat 20
+
+APP_NAME = "default"
+USER_ID = "default"
+SESSION_ID = "long-conversation"
+START_TIME = 1_700_000_000.0
+
+
+def conversation_events(count, compaction_every):
+    """`count` user/model messages one second apart, with a compaction summary every `compaction_every`."""
+    events = []
+    for i in range(count):
+        author = "user" if i % 2 == 0 else "text_chat_bot"
+        events.append(
+            Event(
+                invocation_id=f"inv-{i // 2}",
+                author=author,
+                timestamp=START_TIME + i,
+                content=types.Content(
+                    role="user" if author == "user" else "model",
+                    parts=[types.Part(text=f"Message {i}: " + "lorem ipsum " * 20)],
+                ),
+            )
+        )
+        if compaction_every and (i + 1) % compaction_every == 0:
+            events.append(
+                Event(
+                    invocation_id=Event.new_id(),
+                    author="user",
+                    timestamp=START_TIME + i + 0.5,
+                    actions=EventActions(
+                        compaction=EventCompaction(
+                            start_timestamp=START_TIME + i + 1 - compaction_every,
+                            end_timestamp=START_TIME + i,
+                            compacted_content=types.Content(
+                                role="model", parts=[types.Part(text="Summary so far. " * 30)]
+                            ),
+                        )
+                    ),
+                )
+            )
+    return events
+
+
+async def fill(service, session_id, count, compaction_every):
+    """Writes a session's events straight to the table (fast setup, same rows as append_event)."""
+    session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    events = conversation_events(count, compaction_every)
+    with service.database_session_factory() as sql_session:
+        for start in range(0, len(events), 1000):
+            sql_session.add_all(
+                [StorageEvent.from_event(session, e) for e in events[start:start + 1000]]
+            )
+            sql_session.flush()
+        sql_session.commit()
+
+
+async def time_load(service, config, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        session = await service.get_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID, config=config
+        )
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000, len(session.events)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="get_session latency on a long conversation")
+    parser.add_argument("--events", type=int, default=10_000)
+    parser.add_argument("--compaction-every", type=int, default=800)
+    parser.add_argument("--other-sessions", type=int, default=20, help="Other sessions in the same database")
+    parser.add_argument("--other-events", type=int, default=1000, help="Events per other session")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    windows = {
+        "full": None,
+        "last 50": EventWindowConfig(num_recent_events=50),
+        "after ts": EventWindowConfig(after_timestamp=START_TIME + args.events - 200),
+        "compaction": EventWindowConfig(since_latest_compaction=True),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        before_path = os.path.join(tmp, "before.db")
+        before = DatabaseSessionService(db_url=f"sqlite:///{before_path}", auto_migrate=False)
+        print(f"\nBuilding: {args.events} events + {args.other_sessions} x {args.other_events} other events ...")
+        await fill(before, SESSION_ID, args.events, args.compaction_every)
+        for i in range(args.other_sessions):
+            await fill(before, f"other-{i}", args.other_events, args.compaction_every)
+        before.db_engine.dispose()
+
+        after_path = os.path.join(tmp, "after.db")
+        shutil.copy(before_path, after_path)
+        engine = create_engine(f"sqlite:///{after_path}")
+        start = time.perf_counter()
+        applied = session_migrations.migrate(engine)
+        print(f"Migrated a copy ({', '.join(applied)}) in {time.perf_counter() - start:.2f}s\n")
+        engine.dispose()
+        after = DatabaseSessionService(db_url=f"sqlite:///{after_path}")
+
+        print(f"{'window':<12}{'events':>8}{'no index ms':>14}{'migrated ms':>14}")
+        before = DatabaseSessionService(db_url=f"sqlite:///{before_path}", auto_migrate=False)
+        for label, config in windows.items():
+            if config is not None and config.since_latest_compaction:
+                unindexed = "-"  # needs the compaction table
+            else:
+                unindexed = f"{(await time_load(before, config, args.repeat))[0]:.1f}"
+            latency, count = await time_load(after, config, args.repeat)
+            print(f"{label:<12}{count:>8}{unindexed:>14}{latency:>14.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
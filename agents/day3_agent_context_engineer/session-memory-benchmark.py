@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import warnings
+warnings.filterwarnings("ignore")
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.genai import types
+
+from session_services import InMemorySessionService
+
+# Memory held by InMemorySessionService in a long-lived worker, unbounded and
+# with the caps from session_services.py. Sessions arrive one after another
+# (a few turns each); then returning users pick earlier sessions, recent ones
+# more often, and continue them.
+#   unbounded:  ADK's behaviour, everything stays in memory
+#   max N:      max_sessions=N, evicted sessions are dropped
+#   max N+spill: max_sessions=N with spill_dir, evicted sessions are reloaded
+#   max MB+spill: max_bytes instead of a session count
+#
+# "MB" is what Python still holds at the end (tracemalloc), "lost" is the
+# returning users whose session was gone.
+#
+# Run from this folder:
+#   python session-memory-benchmark.py
+#   python session-memory-benchmark.py --sessions 5000 --turns 10 --returning 2000
+
+APP_NAME = "default"
+
+
+def turn_events(turn, reply_bytes):
+    return [
+        Event(
+            invocation_id=f"inv-{turn}",
+            author="user",
+            content=types.Content(role="user", parts=[types.Part(text=f"Question {turn}?")]),
+        ),
+        Event(
+            invocation_id=f"inv-{turn}",
+            author="chat_bot",
+            content=types.Content(role="model", parts=[types.Part(text="a" * reply_bytes)]),
+            actions=EventActions(state_delta={"turns": turn + 1}),
+        ),
+    ]
+
+
+async def run(service, args):
+    rng = random.Random(7)
+    tracemalloc.start()
+    for i in range(args.sessions):
+        session = await service.get_or_create_session(app_name=APP_NAME, user_id=f"user-{i}", session_id="chat")
+        for turn in range(args.turns):
+            for event in turn_events(turn, args.reply_bytes):
+                await service.append_event(session, event)
+
+    lost = 0
+    timings = []
+    for _ in range(args.returning):
+        # Recent sessions come back more often than old ones
+        i = args.sessions - 1 - min(int(rng.expovariate(4 / args.sessions)), args.sessions - 1)
+        start = time.perf_counter()
+        session = await service.get_session(app_name=APP_NAME, user_id=f"user-{i}", session_id="chat")
+        timings.append(time.perf_counter() - start)
+        if session is None or len(session.events) < args.turns * 2:
+            lost += 1
+            continue
+        for event in turn_events(args.turns, args.reply_bytes):
+            await service.append_event(session, event)
+
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / 1e6, peak / 1e6, lost, statistics.median(timings) * 1000, max(timings) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="InMemorySessionService memory with and without caps")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--reply-bytes", type=int, default=2000)
+    parser.add_argument("--returning", type=int, default=1000)
+    parser.add_argument("--max-sessions", type=int, default=200)
+    parser.add_argument("--max-mb", type=float, default=2)
+    args = parser.parse_args()
+
+    print(
+        f"\n{args.sessions} sessions x {args.turns} turns ({args.reply_bytes} byte replies), "
+        f"{args.returning} returning users\n"
+    )
+    print(f"{'service':<16}{'MB':>8}{'peak MB':>9}{'lost':>6}{'get p50':>9}{'get max':>9}  stats")
+    with tempfile.TemporaryDirectory() as tmp:
+        services = {
+            "unbounded": lambda: InMemorySessionService(),
+            f"max {args.max_sessions}": lambda: InMemorySessionService(max_sessions=args.max_sessions),
+            f"max {args.max_sessions}+spill": lambda: InMemorySessionService(
+                max_sessions=args.max_sessions, spill_dir=f"{tmp}/sessions"
+            ),
+            f"{args.max_mb:g} MB+spill": lambda: InMemorySessionService(
+                max_bytes=int(args.max_mb * 1e6), spill_dir=f"{tmp}/bytes"
+            ),
+        }
+        for label, make in services.items():
+            service = make()
+            current, peak, lost, get_p50, get_max = await run(service, args)
+            stats = service.stats()
+            summary = ", ".join(f"{key} {stats[key]}" for key in ("hits", "reloads", "evictions", "spills"))
+            print(f"{label:<16}{current:>8.1f}{peak:>9.1f}{lost:>6}{get_p50:>9.2f}{get_max:>9.2f}  {summary}")
+    print("\n(get in ms)\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import warnings
+warnings.filterwarnings("ignore")
+
+from session_services import DatabaseSessionService
+
+# Session open latency on SQLite:
+#   try/except: create_session, and on failure get_session (what run_session used to do)
+#   get_or_create: one INSERT ... ON CONFLICT DO NOTHING plus one load
+# for brand-new sessions and for resuming existing ones (the common case).
+#
+# Run from this folder:
+#   python session-open-benchmark.py
+#   python session-open-benchmark.py --sessions 500 --events 20
+
+APP_NAME = "default"
+USER_ID = "default"
+
+
+async def open_with_try_except(service, session_id):
+    try:
+        return await service.create_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+        )
+    except:
+        return await service.get_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+        )
+
+
+async def open_with_get_or_create(service, session_id):
+    return await service.get_or_create_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+    )
+
+
+async def add_history(service, session, events):
+    from google.adk.events.event import Event
+    from google.genai import types
+
+    for i in range(events):
+        await service.append_event(
+            session,
+            Event(
+                invocation_id=f"inv-{i}",
+                author="user" if i % 2 == 0 else "text_chat_bot",
+                content=types.Content(role="user", parts=[types.Part(text=f"message {i}")]),
+            ),
+        )
+
+
+async def time_opens(open_fn, service, session_ids):
+    timings = []
+    for session_id in session_ids:
+        start = time.perf_counter()
+        await open_fn(service, session_id)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def describe(label, timings):
+    ordered = sorted(timings)
+    p99 = ordered[int(0.99 * (len(ordered) - 1))]
+    print(f"  {label:<32} p50 {statistics.median(timings) * 1000:7.3f} ms   p99 {p99 * 1000:7.3f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Session open latency on SQLite")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--events", type=int, default=10, help="History per existing session")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        services = {
+            "try/except": DatabaseSessionService(db_url=f"sqlite:///{os.path.join(tmp, 'a.db')}"),
+            "get_or_create": DatabaseSessionService(db_url=f"sqlite:///{os.path.join(tmp, 'b.db')}"),
+        }
+        open_fns = {"try/except": open_with_try_except, "get_or_create": open_with_get_or_create}
+        new_ids = [f"session-{i}" for i in range(args.sessions)]
+
+        print(f"\n{args.sessions} sessions, {args.events} events of history each")
+        print("New sessions")
+        for label, service in services.items():
+            describe(label, await time_opens(open_fns[label], service, new_ids))
+
+        for service in services.values():
+            for session_id in new_ids:
+                session = await service.get_session(
+                    app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+                )
+                await add_history(service, session, args.events)
+
+        print("Existing sessions (resume)")
+        for label, service in services.items():
+            describe(label, await time_opens(open_fns[label], service, new_ids))
+        print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -11,7 +11,7 @@ from google.adk.agents import LlmAgent, Agent
 from google.adk.apps.app import App, ResumabilityConfig, EventsCompactionConfig
 from google.adk.models.google_llm import Gemini
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService, DatabaseSessionService
+from session_services import InMemorySessionService, DatabaseSessionService
 from google.adk.tools.function_tool import FunctionTool
 from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
 from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
@@ -75,15 +75,10 @@ async def run_session(runner_instance: Runner,
     # Get app name from the Runner
     app_name = runner_instance.app_name
 
-    # Attempt to create a new session or retrieve an existing one
-    try:
-        session = await session_service.create_session(
-            app_name=app_name, user_id=USER_ID, session_id=session_name
-        )
-    except:
-        session = await session_service.get_session(
-            app_name=app_name, user_id=USER_ID, session_id=session_name
-        )
+    # Create a new session or retrieve an existing one (single atomic call)
+    session = await session_service.get_or_create_session(
+        app_name=app_name, user_id=USER_ID, session_id=session_name
+    )
 
     # Process queries if provided
     if user_queries:
@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+import warnings
+warnings.filterwarnings("ignore")
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.genai import types
+
+from session_services import DatabaseSessionService
+from sqlite_session_service import SqliteSessionService
+
+# Event write throughput (events/s) on SQLite at 1, 8 and 64 concurrent sessions:
+#   default: ADK's DatabaseSessionService (rollback journal, one commit per event)
+#   tuned:   SqliteSessionService with WAL/pragmas/sized pool, one commit per event
+#   batched: SqliteSessionService with each invocation's events in one transaction
+#
+# Every session runs on its own thread (like separate requests in a server) and
+# replays invocations shaped like an agent turn with one tool call: user message,
+# function call, function response, final answer with a state update.
+#
+# Run from this folder:
+#   python session-write-benchmark.py
+#   python session-write-benchmark.py --invocations 50 --concurrency 1 8 64 128
+
+APP_NAME = "default"
+USER_ID = "default"
+
+
+def invocation_events(invocation_id, turn):
+    def event(author, part, state_delta=None):
+        return Event(
+            invocation_id=invocation_id,
+            author=author,
+            content=types.Content(role="user" if author == "user" else "model", parts=[part]),
+            actions=EventActions(state_delta=state_delta or {}),
+        )
+
+    call = types.FunctionCall(id=f"call-{turn}", name="lookup", args={"turn": turn})
+    return [
+        event("user", types.Part(text=f"Question number {turn}, please look it up.")),
+        event("assistant", types.Part(function_call=call)),
+        event(
+            "assistant",
+            types.Part(
+                function_response=types.FunctionResponse(
+                    id=call.id, name="lookup", response={"result": "x" * 200}
+                )
+            ),
+        ),
+        event(
+            "assistant",
+            types.Part(text=f"Here is the answer to question {turn}. " * 5),
+            {"turns": turn, "user:last_question": turn},
+        ),
+    ]
+
+
+async def run_session(service, session_id, invocations):
+    session = await service.get_or_create_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+    )
+    written = 0
+    for turn in range(invocations):
+        for event in invocation_events(f"{session_id}-inv-{turn}", turn):
+            await service.append_event(session, event)
+            written += 1
+    return written
+
+
+def run_level(service, concurrency, invocations, label):
+    """Runs `concurrency` sessions at once, each on its own thread and event loop."""
+    counts, errors = [], []
+    start_line = threading.Barrier(concurrency + 1)
+
+    def worker(index):
+        start_line.wait()
+        try:
+            counts.append(
+                asyncio.run(run_session(service, f"{label}-{concurrency}-{index}", invocations))
+            )
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    start_line.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return sum(counts), elapsed, errors
+
+
+def make_service(label, db_path):
+    if label == "default":
+        return DatabaseSessionService(db_url=f"sqlite:///{db_path}")
+    return SqliteSessionService(db_path, batch_invocation_events=(label == "batched"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite session write throughput")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 8, 64])
+    parser.add_argument("--invocations", type=int, default=20, help="Invocations per session (4 events each)")
+    args = parser.parse_args()
+
+    labels = ["default", "tuned", "batched"]
+    print(f"\n{args.invocations} invocations x 4 events per session\n")
+    print(f"{'sessions':>9}" + "".join(f"{label + ' ev/s':>16}" for label in labels))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for concurrency in args.concurrency:
+            row, notes = [], []
+            for label in labels:
+                service = make_service(label, os.path.join(tmp, f"{label}-{concurrency}.db"))
+                events, elapsed, errors = run_level(service, concurrency, args.invocations, label)
+                row.append(f"{events / elapsed:>16.0f}")
+                if errors:
+                    notes.append(f"{label}: {len(errors)} sessions failed, first: {errors[0]!r}")
+                if isinstance(service, SqliteSessionService):
+                    service.close()
+                else:
+                    service.db_engine.dispose()
+            print(f"{concurrency:>9}" + "".join(row))
+            for note in notes:
+                print(f"          {note}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Compressed cold storage for sessions nobody uses any more.
+
+Finished conversations (`test-db-session-*`, `compaction_demo`, `order_*`)
+stay in the session database forever, and every one of them makes the
+events table, its index and the backups bigger. `SessionArchive` is where
+DatabaseSessionService moves them instead:
+
+- One segment file per day, `sessions-YYYY-MM-DD.jsonl.gz`, named after
+  the day the session was last active (UTC). Expiring old sessions then
+  means deleting whole files.
+- Each session is one JSON document holding its rows exactly as stored
+  (events in whichever layout they were written, state rows, version),
+  compressed as its own gzip member and appended to the segment. The
+  `archived_sessions` table (migration 6 in session_migrations.py) records
+  its offset and length, so reading one session back is a single seek and
+  never decompresses its neighbours.
+- Members are whole gzip streams, so a segment is also a valid `.gz` file:
+  `zcat sessions-2025-11-20.jsonl.gz` prints one session per line.
+
+Appends open the segment with O_APPEND, so several processes can archive
+into the same directory, and are fsynced before the database forgets the
+session.
+
+Usage:
+
+    from session_archive import SessionArchive
+    from sqlite_session_service import SqliteSessionService
+
+    session_service = SqliteSessionService("my_agent_data.db", archive=SessionArchive("my_agent_data_archive"))
+    session_service.archive_idle_sessions(idle_seconds=30 * 86400)
+    # Archived sessions come back on their next get_session / get_or_create_session
+
+Moving sessions out on a schedule is session_retention.py's job.
+"""
+
+import base64
+import gzip
+import json
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import Table
+
+SEGMENT_PATTERN = re.compile(r"^sessions-(\d{4}-\d{2}-\d{2})\.jsonl\.gz$")
+
+
+class SessionArchive:
+    """A directory of per-day segment files of gzipped session documents."""
+
+    def __init__(self, directory: str, *, compress_level: int = 6, fsync: bool = True):
+        """
+        Args:
+            directory: Where the segments live (created on the first append)
+            compress_level: gzip level, 1 (fast) to 9 (small)
+            fsync: Force each appended session to disk before it is
+                removed from the database
+        """
+        self.directory = directory
+        self.compress_level = compress_level
+        self.fsync = fsync
+
+    @staticmethod
+    def segment_for(timestamp: float) -> str:
+        """Segment file name for a session last active at `timestamp` (Unix seconds)."""
+        day = datetime.fromtimestamp(timestamp, timezone.utc).date()
+        return f"sessions-{day.isoformat()}.jsonl.gz"
+
+    def append(self, segment: str, document: dict[str, Any]) -> tuple[int, int]:
+        """Appends one session document to `segment`.
+
+        Returns:
+            (offset, length) of its gzip member in the file
+        """
+        member = gzip.compress(
+            (json.dumps(document, default=_encode_value) + "\n").encode(), compresslevel=self.compress_level
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(os.path.join(self.directory, segment), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, member)
+            # Our own file offset ends where our write did, whatever other
+            # appenders wrote before or after
+            end = os.lseek(fd, 0, os.SEEK_CUR)
+            if self.fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+        return end - len(member), len(member)
+
+    def read(self, segment: str, offset: int, length: int) -> dict[str, Any]:
+        with open(os.path.join(self.directory, segment), "rb") as f:
+            f.seek(offset)
+            return json.loads(gzip.decompress(f.read(length)))
+
+    def scan(self, segment: str) -> Iterator[dict[str, Any]]:
+        """Every document in a segment, including ones since rehydrated or deleted."""
+        with gzip.open(os.path.join(self.directory, segment), "rt") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def segments(self, before: Optional[date] = None) -> dict[str, date]:
+        """Segment file name -> its day, optionally only the days before `before`."""
+        if not os.path.isdir(self.directory):
+            return {}
+        found = {}
+        for name in os.listdir(self.directory):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                day = date.fromisoformat(match.group(1))
+                if before is None or day < before:
+                    found[name] = day
+        return dict(sorted(found.items()))
+
+    def remove(self, segment: str) -> int:
+        """Deletes a segment file. Returns the bytes freed."""
+        path = os.path.join(self.directory, segment)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return 0
+        return size
+
+    def size(self) -> int:
+        return sum(os.path.getsize(os.path.join(self.directory, name)) for name in self.segments())
+
+
+def encode_rows(rows) -> list[dict[str, Any]]:
+    """Result rows as JSON-ready dicts (see `decode_rows`)."""
+    return [dict(row._mapping) for row in rows]
+
+
+def decode_rows(table: Table, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Undoes the JSON encoding of `rows` for inserting into `table`.
+
+    JSON has no bytes or datetimes; `append` writes them as base64 and ISO
+    strings, and the column types say which strings to turn back.
+    """
+    decoders = {}
+    for column in table.columns:
+        python_type = _python_type(column.type)
+        if python_type is bytes:
+            decoders[column.name] = base64.b64decode
+        elif python_type is datetime:
+            decoders[column.name] = datetime.fromisoformat
+    return [
+        {
+            name: decoders[name](value) if name in decoders and value is not None else value
+            for name, value in row.items()
+        }
+        for row in rows
+    ]
+
+
+def _encode_value(value):
+    if isinstance(value, (bytes, memoryview)):
+        return base64.b64encode(bytes(value)).decode()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Can't archive a value of type {type(value).__name__}")
+
+
+def _python_type(column_type):
+    try:
+        return column_type.python_type
+    except NotImplementedError:
+        # ADK's column types wrap a standard one (PreciseTimestamp a DateTime)
+        impl = getattr(column_type, "impl_instance", None)
+        return _python_type(impl) if impl is not None else None
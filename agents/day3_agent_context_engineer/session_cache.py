@@ -0,0 +1,145 @@
+"""In-process cache of hot sessions for DatabaseSessionService.
+
+The Runner loads the session from the database at the start of every turn,
+even when the same process served the previous turn a few seconds earlier
+and still has it. `SessionCache` keeps the most recently used sessions in
+memory:
+
+- `get_session` on a cached session returns a copy without touching the
+  database. Windowed loads (`config=...`) still go to the database.
+- `app:` and `user:` state is shared by many sessions, so it is cached
+  once per app and per user (a scope) rather than inside each session, and
+  merged into the copy a hit returns. A session sees the app state another
+  session just wrote without re-reading anything.
+- Writes go to the database as before (write-through). The object that was
+  just written becomes the cached copy, so the next turn sees its events and
+  state, and the app and user state it changed are updated in place.
+- Every write moves the session's version on (migration 5 in
+  session_migrations.py) with a compare-and-swap. If someone else wrote to
+  the session since it was read (another worker, or ADK's background
+  compaction with an older copy), the write first picks up their events, so
+  the object it caches is complete again. App and user state have versions
+  of their own in the same table; a cached scope whose version didn't move
+  on by exactly this process's write is dropped and read again.
+
+With several workers on one database, a worker only notices the others'
+writes when it writes itself. Pass `check_version=True` to also compare
+versions on every hit: the session's, the app's and the user's come back in
+one small indexed read, and only what changed is loaded again.
+
+Usage:
+
+    from session_cache import SessionCache
+    from sqlite_session_service import SqliteSessionService
+
+    session_service = SqliteSessionService("my_agent_data.db", session_cache=SessionCache())
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from google.adk.sessions.session import Session
+
+
+class SessionCache:
+    """LRU map of session key to the newest Session object this process holds."""
+
+    def __init__(self, max_sessions: int = 1000, *, check_version: bool = False):
+        """
+        Args:
+            max_sessions: Sessions kept, least recently used dropped first
+            check_version: Compare the cached version with the database's on
+                every hit (for several workers sharing one database)
+        """
+        self.max_sessions = max_sessions
+        self.check_version = check_version
+        self._sessions: OrderedDict[tuple[str, str, str], Session] = OrderedDict()
+        # (app_name, user_id) -> (version, state without prefixes); user_id "" is the app
+        self._scopes: OrderedDict[tuple[str, str], tuple[int, dict]] = OrderedDict()
+        # Calls can come from several threads (ThreadedSessionService)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key) -> Optional[Session]:
+        """The cached session itself (callers hand out copies)."""
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                self.misses += 1
+                return None
+            self._sessions.move_to_end(key)
+            self.hits += 1
+            return session
+
+    def put(self, key, session: Session):
+        with self._lock:
+            self._sessions[key] = session
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._sessions.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def get_scope(self, key) -> Optional[tuple[int, dict]]:
+        """(version, state) of an app (user_id "") or user scope, None if not cached."""
+        with self._lock:
+            scope = self._scopes.get(key)
+            if scope is not None:
+                self._scopes.move_to_end(key)
+            return scope
+
+    def put_scope(self, key, version: int, state: dict):
+        with self._lock:
+            self._scopes[key] = (version, state)
+            self._scopes.move_to_end(key)
+            while len(self._scopes) > self.max_sessions:
+                self._scopes.popitem(last=False)
+
+    def advance_scope(self, key, version: int, delta: dict):
+        """Applies this process's write, which moved the scope to `version`.
+
+        If the cached copy wasn't at the version right before it, someone
+        else wrote in between: the copy is dropped and read again when needed.
+        """
+        with self._lock:
+            scope = self._scopes.get(key)
+            if scope is None:
+                return
+            if scope[0] == version - 1:
+                self._scopes[key] = (version, scope[1] | copy.deepcopy(delta))
+            else:
+                del self._scopes[key]
+                self.invalidations += 1
+
+    def invalidate_scope(self, key):
+        with self._lock:
+            if self._scopes.pop(key, None) is not None:
+                self.invalidations += 1
+
+    @staticmethod
+    def copy(session: Session) -> Session:
+        """A copy the caller can append to without touching the cached one.
+
+        Events aren't changed once appended, so the list is copied but the
+        events are shared. The state is copied deeply (tools may hold on to
+        nested values).
+        """
+        return session.model_copy(
+            update={"events": list(session.events), "state": copy.deepcopy(session.state)}
+        )
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "scopes": len(self._scopes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
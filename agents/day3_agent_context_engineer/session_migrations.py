@@ -0,0 +1,368 @@
+"""Schema migrations for the session database.
+
+ADK's `DatabaseSessionService` creates its tables and nothing else. The
+migrations here add what our session services need on top. Each one runs
+once per database, in order, and is recorded in `session_schema_migrations`.
+
+1. `ix_events_session_timestamp`: index on events (app_name, user_id,
+   session_id, timestamp). The primary key starts with the event id, so
+   without it loading one session's history scans the whole table.
+2. `event_compactions`: where each compaction summary sits and which events
+   it covers, so "latest summary plus everything after it" is one index
+   lookup. Existing compaction events are backfilled.
+3. `events.payload`: the event_codec.py encoding of an event. Rows written
+   without a codec leave it NULL and keep ADK's layout.
+4. `state_entries`: one row per changed state key (app, user or session
+   scope), layered over the JSON state columns, which become periodic
+   snapshots. Nothing to backfill: the existing columns are the snapshot.
+5. `session_versions`: a counter per session, bumped by every write. A
+   process that cached a session can tell whether anyone else wrote to it
+   since. Sessions without a row are at version 0 until their next write.
+   App and user state are counted the same way, under session_id "" (and
+   user_id "" for the app), like their state_entries rows.
+6. `archived_sessions`: where each session moved to cold storage sits in
+   the session_archive.py segment files, so reading it again is one index
+   lookup plus one seek.
+
+`DatabaseSessionService` applies pending migrations on startup. To migrate
+a database ahead of a deploy (or just see where it stands), run from this
+folder:
+
+    python session_migrations.py my_agent_data_compact.db
+    python session_migrations.py sqlite:///my_agent_data.db --status
+
+`--encode-events` also rewrites existing events in the compact encoding, in
+batches that commit as they go (safe to interrupt and rerun):
+
+    python session_migrations.py my_agent_data.db --encode-events --vacuum
+
+Stock ADK can't read encoded events. `--decode-events` rewrites them in its
+layout again (pickled actions, JSON content), the same way, before a
+database goes back to ADK's own `DatabaseSessionService`:
+
+    python session_migrations.py my_agent_data.db --decode-events
+"""
+
+import argparse
+import os
+import time
+
+from google.adk.sessions.database_session_service import Base, StorageEvent
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Float,
+    Index,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    Text,
+    create_engine,
+    insert,
+    inspect,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+
+from event_codec import EventCodec, adk_event_row, event_row, row_to_event
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    "session_schema_migrations",
+    metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(128), nullable=False),
+    Column("applied_at", Float, nullable=False),
+)
+
+event_compactions = Table(
+    "event_compactions",
+    metadata,
+    Column("app_name", String(128), primary_key=True),
+    Column("user_id", String(128), primary_key=True),
+    Column("session_id", String(128), primary_key=True),
+    Column("event_id", String(128), primary_key=True),
+    Column("timestamp", Float, nullable=False),
+    Column("start_timestamp", Float, nullable=False),
+    Column("end_timestamp", Float, nullable=False),
+    Index("ix_event_compactions_session_timestamp", "app_name", "user_id", "session_id", "timestamp"),
+)
+
+# State keys changed since the scope's last snapshot. App-scope rows have
+# user_id = session_id = "", user-scope rows session_id = ""
+state_entries = Table(
+    "state_entries",
+    metadata,
+    Column("app_name", String(128), primary_key=True),
+    Column("user_id", String(128), primary_key=True),
+    Column("session_id", String(128), primary_key=True),
+    Column("key", String(256), primary_key=True),
+    Column("value", Text, nullable=False),
+    Column("updated_at", Float, nullable=False),
+)
+
+# Kept out of ADK's sessions table: in SQLite an UPDATE rewrites the whole
+# row, state column included
+session_versions = Table(
+    "session_versions",
+    metadata,
+    Column("app_name", String(128), primary_key=True),
+    Column("user_id", String(128), primary_key=True),
+    Column("session_id", String(128), primary_key=True),
+    Column("version", Integer, nullable=False),
+)
+
+# Sessions moved out to session_archive.py segments. `state` is the
+# session-scope state, so listing sessions doesn't have to open segments
+archived_sessions = Table(
+    "archived_sessions",
+    metadata,
+    Column("app_name", String(128), primary_key=True),
+    Column("user_id", String(128), primary_key=True),
+    Column("session_id", String(128), primary_key=True),
+    Column("segment", String(64), nullable=False),
+    Column("offset", BigInteger, nullable=False),
+    Column("length", Integer, nullable=False),
+    Column("last_active", Float, nullable=False),
+    Column("archived_at", Float, nullable=False),
+    Column("events", Integer, nullable=False),
+    Column("state", Text, nullable=False),
+    Index("ix_archived_sessions_segment", "segment"),
+)
+
+events = StorageEvent.__table__
+
+# The same events table as the session services read it: `actions` as raw
+# bytes (a pickle in ADK rows, empty in encoded rows) plus `payload`
+stored_events = Table(
+    "events",
+    metadata,
+    *[
+        Column("actions", LargeBinary, nullable=False) if c.name == "actions" else c._copy()
+        for c in events.columns
+    ],
+    Column("payload", LargeBinary, nullable=True),
+)
+
+# On this module's copy of the table, so ADK's own create_all doesn't pick it up
+events_session_timestamp_index = Index(
+    "ix_events_session_timestamp",
+    stored_events.c.app_name,
+    stored_events.c.user_id,
+    stored_events.c.session_id,
+    stored_events.c.timestamp,
+)
+
+
+def compaction_row(app_name, user_id, session_id, event_id, timestamp, compaction) -> dict:
+    return {
+        "app_name": app_name,
+        "user_id": user_id,
+        "session_id": session_id,
+        "event_id": event_id,
+        "timestamp": timestamp,
+        "start_timestamp": compaction.start_timestamp,
+        "end_timestamp": compaction.end_timestamp,
+    }
+
+
+def _add_event_timestamp_index(connection):
+    existing = {index["name"] for index in inspect(connection).get_indexes("events")}
+    if events_session_timestamp_index.name not in existing:
+        events_session_timestamp_index.create(connection)
+
+
+def _add_event_compactions(connection):
+    event_compactions.create(connection, checkfirst=True)
+    # Compaction summaries are the only events without content; `actions` is
+    # pickled, so each candidate has to be loaded to check
+    candidates = connection.execution_options(yield_per=500).execute(
+        select(
+            events.c.app_name,
+            events.c.user_id,
+            events.c.session_id,
+            events.c.id,
+            events.c.timestamp,
+            events.c.actions,
+        ).where(events.c.content.is_(None))
+    )
+    rows = []
+    for row in candidates:
+        compaction = getattr(row.actions, "compaction", None)
+        if compaction is not None:
+            rows.append(
+                compaction_row(
+                    row.app_name, row.user_id, row.session_id, row.id, row.timestamp.timestamp(), compaction
+                )
+            )
+    if rows:
+        connection.execute(insert(event_compactions), rows)
+
+
+def _add_event_payload(connection):
+    if not has_event_payload(connection):
+        column_type = LargeBinary().compile(dialect=connection.dialect)
+        connection.execute(text(f"ALTER TABLE events ADD COLUMN payload {column_type}"))
+
+
+def _add_state_entries(connection):
+    state_entries.create(connection, checkfirst=True)
+
+
+def _add_session_versions(connection):
+    session_versions.create(connection, checkfirst=True)
+
+
+def _add_archived_sessions(connection):
+    archived_sessions.create(connection, checkfirst=True)
+
+
+# (version, name, function) - append only, never renumber
+MIGRATIONS = [
+    (1, "events_session_timestamp_index", _add_event_timestamp_index),
+    (2, "event_compactions", _add_event_compactions),
+    (3, "event_payload", _add_event_payload),
+    (4, "state_entries", _add_state_entries),
+    (5, "session_versions", _add_session_versions),
+    (6, "archived_sessions", _add_archived_sessions),
+]
+
+
+def has_event_payload(bind) -> bool:
+    return "payload" in {column["name"] for column in inspect(bind).get_columns("events")}
+
+
+def applied_versions(engine) -> set[int]:
+    schema_migrations.create(engine, checkfirst=True)
+    with engine.connect() as connection:
+        return set(connection.scalars(select(schema_migrations.c.version)))
+
+
+def migrate(engine) -> list[str]:
+    """Applies pending migrations, each in its own transaction.
+
+    Returns:
+        Names of the migrations applied by this call
+    """
+    Base.metadata.create_all(engine)
+    done = applied_versions(engine)
+    applied = []
+    for version, name, apply in MIGRATIONS:
+        if version in done:
+            continue
+        try:
+            with engine.begin() as connection:
+                apply(connection)
+                connection.execute(
+                    insert(schema_migrations).values(version=version, name=name, applied_at=time.time())
+                )
+        except IntegrityError:
+            # Another process applied it first
+            continue
+        applied.append(name)
+    return applied
+
+
+def encode_events(engine, codec: EventCodec, batch_size: int = 500) -> int:
+    """Rewrites events stored in ADK's layout with `codec`, one transaction per batch.
+
+    Returns:
+        Number of events re-encoded
+    """
+    key = [stored_events.c[name] for name in ("id", "app_name", "user_id", "session_id")]
+    total = 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                select(stored_events).where(stored_events.c.payload.is_(None)).limit(batch_size)
+            ).all()
+            for row in rows:
+                values = event_row(row.app_name, row.user_id, row.session_id, row_to_event(row), codec)
+                connection.execute(
+                    update(stored_events)
+                    .where(*[column == getattr(row, column.name) for column in key])
+                    .values(values)
+                )
+        total += len(rows)
+        if len(rows) < batch_size:
+            return total
+
+
+def decode_events(engine, batch_size: int = 500) -> int:
+    """Rewrites encoded events in ADK's layout, one transaction per batch.
+
+    Returns:
+        Number of events decoded
+    """
+    key = [stored_events.c[name] for name in ("id", "app_name", "user_id", "session_id")]
+    total = 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                select(stored_events).where(stored_events.c.payload.is_not(None)).limit(batch_size)
+            ).all()
+            for row in rows:
+                values = adk_event_row(row.app_name, row.user_id, row.session_id, row_to_event(row))
+                connection.execute(
+                    update(stored_events)
+                    .where(*[column == getattr(row, column.name) for column in key])
+                    .values(values)
+                )
+        total += len(rows)
+        if len(rows) < batch_size:
+            return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply session database migrations")
+    parser.add_argument("database", help="SQLite file or SQLAlchemy URL")
+    parser.add_argument("--status", action="store_true", help="Only show which migrations are applied")
+    parser.add_argument("--encode-events", action="store_true", help="Re-encode existing events with event_codec.py")
+    parser.add_argument("--decode-events", action="store_true", help="Rewrite encoded events in ADK's layout")
+    parser.add_argument("--compress-threshold", type=int, default=1024, help="Bytes of content above which it is zlib-compressed")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--vacuum", action="store_true", help="SQLite: reclaim the freed space afterwards")
+    args = parser.parse_args()
+    if args.encode_events and args.decode_events:
+        parser.error("--encode-events and --decode-events are exclusive")
+
+    db_url = args.database if "://" in args.database else f"sqlite:///{args.database}"
+    engine = create_engine(db_url)
+    if args.status:
+        done = applied_versions(engine)
+        for version, name, _ in MIGRATIONS:
+            print(f"  {'✅' if version in done else '⏳'} {version:>3} {name}")
+        return
+
+    db_path = engine.url.database if engine.dialect.name == "sqlite" else None
+    size_before = os.path.getsize(db_path) if db_path and os.path.exists(db_path) else None
+
+    start = time.perf_counter()
+    applied = migrate(engine)
+    for name in applied:
+        print(f"✅ Applied {name}")
+    print(f"{len(applied)} migration(s) applied in {time.perf_counter() - start:.2f}s")
+
+    if args.encode_events:
+        start = time.perf_counter()
+        count = encode_events(engine, EventCodec(args.compress_threshold), args.batch_size)
+        print(f"✅ Re-encoded {count} event(s) in {time.perf_counter() - start:.2f}s")
+    if args.decode_events:
+        start = time.perf_counter()
+        count = decode_events(engine, args.batch_size)
+        print(f"✅ Decoded {count} event(s) in {time.perf_counter() - start:.2f}s")
+    if args.vacuum and db_path:
+        with engine.connect() as connection:
+            connection.exec_driver_sql("VACUUM")
+    if size_before is not None:
+        size_after = os.path.getsize(db_path)
+        print(f"   {db_path}: {size_before / 1e6:.2f} MB -> {size_after / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
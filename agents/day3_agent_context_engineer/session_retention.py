@@ -0,0 +1,74 @@
+"""Retention for a session database: archive idle sessions, expire old archives.
+
+Sessions with no activity for `--idle-days` move out of the database into
+the per-day segments of session_archive.py. A session service given the
+same directory as `archive` brings them back on their next use. With
+`--delete-after-days`, whole segments older than that are deleted, and the
+sessions in them are gone for good.
+
+Run it from cron or a scheduled job, one at a time per database. Run from
+this folder:
+
+    python session_retention.py my_agent_data.db --archive-dir my_agent_data_archive --idle-days 30
+    python session_retention.py my_agent_data.db --archive-dir my_agent_data_archive --idle-days 30 --delete-after-days 365 --vacuum
+    python session_retention.py my_agent_data_compact.db --archive-dir my_agent_data_compact_archive --idle-days 7 --dry-run
+
+SQLite files don't shrink on their own: the freed pages are reused by new
+sessions, and `--vacuum` gives them back to the disk.
+"""
+
+import argparse
+import os
+import time
+import warnings
+
+from sqlalchemy.exc import SAWarning
+
+from session_archive import SessionArchive
+from session_services import DatabaseSessionService
+
+DAY = 86400
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive idle sessions and expire old archives")
+    parser.add_argument("database", help="SQLite file or SQLAlchemy URL")
+    parser.add_argument("--archive-dir", required=True, help="Segment directory (the services' archive=)")
+    parser.add_argument("--idle-days", type=float, default=30, help="Archive sessions idle this long")
+    parser.add_argument("--delete-after-days", type=float, help="Delete archived sessions idle this long")
+    parser.add_argument("--app", dest="app_name", help="Only this app's sessions")
+    parser.add_argument("--limit", type=int, help="Archive at most this many sessions per run")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the sessions that would be archived")
+    parser.add_argument("--vacuum", action="store_true", help="SQLite: reclaim the freed space afterwards")
+    args = parser.parse_args()
+    # ADK's JSON column type doesn't declare itself cacheable
+    warnings.filterwarnings("ignore", category=SAWarning)
+
+    db_url = args.database if "://" in args.database else f"sqlite:///{args.database}"
+    service = DatabaseSessionService(db_url, archive=SessionArchive(args.archive_dir))
+    db_path = service.db_engine.url.database if service.db_engine.dialect.name == "sqlite" else None
+    size_before = os.path.getsize(db_path) if db_path else None
+
+    if args.dry_run:
+        idle = service.idle_sessions(args.idle_days * DAY, app_name=args.app_name)[: args.limit]
+        for app_name, user_id, session_id, _ in idle:
+            print(f"  {app_name}  {user_id}  {session_id}")
+        print(f"{len(idle)} session(s) idle for {args.idle_days:g}+ days")
+        return
+
+    start = time.perf_counter()
+    archived = service.archive_idle_sessions(args.idle_days * DAY, app_name=args.app_name, limit=args.limit)
+    print(f"✅ Archived {archived} session(s) idle for {args.idle_days:g}+ days in {time.perf_counter() - start:.2f}s")
+    if args.delete_after_days is not None:
+        expired = service.expire_archive(args.delete_after_days * DAY)
+        print(f"🗑️  Deleted {expired} archived session(s) idle for {args.delete_after_days:g}+ days")
+    if args.vacuum and db_path:
+        with service.db_engine.connect() as connection:
+            connection.exec_driver_sql("VACUUM")
+    if size_before is not None:
+        print(f"   {db_path}: {size_before / 1e6:.2f} MB -> {os.path.getsize(db_path) / 1e6:.2f} MB")
+    print(f"   {args.archive_dir}: {service.archive.size() / 1e6:.2f} MB in {len(service.archive.segments())} segment(s)")
+
+
+if __name__ == "__main__":
+    main()
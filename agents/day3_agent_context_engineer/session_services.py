@@ -0,0 +1,1445 @@
+"""Drop-in session services with a native get-or-create operation.
+
+Resuming a conversation used to look like this in every `run_session` helper:
+
+    try:
+        session = await session_service.create_session(...)
+    except:
+        session = await session_service.get_session(...)
+
+With `DatabaseSessionService` that is two round trips plus an exception on
+every resumed session, and the bare except also hides real errors. Both
+services here keep ADK's class names and behaviour and add
+`get_or_create_session`:
+
+- InMemorySessionService: one dictionary lookup, then create if missing
+- DatabaseSessionService: one `INSERT ... ON CONFLICT DO NOTHING` for the
+  session (and its app/user state rows), then one load of the session
+
+Long conversations don't have to be loaded whole. Pass an `EventWindowConfig`
+to `get_session` for the last N events, the events after a timestamp, or
+the latest compaction summary plus everything after it (what the model
+actually sees once compaction has run). DatabaseSessionService applies the
+migrations in session_migrations.py on startup, which index events by
+session and timestamp so these are range reads.
+
+Pass `event_codec=EventCodec()` to store events in the compact encoding of
+event_codec.py instead of ADK's pickled actions and JSON text columns.
+
+State is written as deltas. A state change upserts one `state_entries` row
+per changed key instead of rewriting the scope's whole JSON document, so
+updating a counter next to a large `blog_draft` writes only the counter.
+Reads lay those rows over the JSON column, which serves as a snapshot. Every
+`state_snapshot_every` writes to a scope, its rows are folded back into the
+column.
+
+`InMemorySessionService` keeps every session forever by default. For a
+long-lived worker, cap it with `max_sessions`, `max_bytes` (an estimate of
+the JSON size) and/or `idle_ttl`. The least recently used sessions are
+evicted first. With `spill_dir`, an evicted session is written there
+(gzipped JSON) and reloaded when it is next used. Without it, the session is
+gone. `stats()` reports hits, reloads, evictions and spills.
+
+The caps are checked whenever a session is used. Idle sessions also have to
+go when nothing is used at all, so with `idle_ttl` a background task on the
+event loop calls `evict_expired()` every `sweep_interval` seconds (idle_ttl
+by default). It starts with the first call made on a running loop; `close()`
+stops it.
+
+Two requests for the same session (a double submit, a background
+compaction) can write at once. Sessions from `get_session` carry the version
+they were loaded at, and a write only moves the database from that version
+to the next (compare-and-swap on the session's own version row, so other
+sessions never wait). If someone else wrote first, their events and state
+are merged into the session object ahead of the new events, which are
+re-timestamped after them, and the write is retried. Only when both writes
+set the same state key does the second one fail, with `SessionConflictError`.
+
+Sessions nobody uses any more can leave the database. With
+`archive=SessionArchive(...)`, `archive_idle_sessions` moves every session
+idle for longer than a threshold into compressed per-day segment files (see
+session_archive.py), and `expire_archive` deletes the segments past
+retention. An archived session is still listed, and the next
+`get_session`, `get_or_create_session` or append brings it back into the
+database first. session_retention.py runs both on a schedule.
+
+Usage:
+
+    from session_services import DatabaseSessionService
+
+    session_service = DatabaseSessionService(db_url="sqlite:///my_agent_data.db")
+    session = await session_service.get_or_create_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id="test-db-session-01"
+    )
+
+    recent = await session_service.get_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id="test-db-session-01",
+        config=EventWindowConfig(since_latest_compaction=True),
+    )
+"""
+
+import asyncio
+import copy
+import gzip
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events.event import Event
+from google.adk.sessions import _session_util
+from google.adk.sessions import DatabaseSessionService as AdkDatabaseSessionService
+from google.adk.sessions import InMemorySessionService as AdkInMemorySessionService
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig
+from google.adk.sessions.database_session_service import (
+    StorageAppState,
+    StorageEvent,
+    StorageSession,
+    StorageUserState,
+    _merge_state,
+)
+from google.adk.sessions.session import Session
+from google.adk.sessions.state import State
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+import session_migrations
+from event_codec import EventCodec, event_row, row_to_event
+from session_archive import SessionArchive, decode_rows, encode_rows
+from session_cache import SessionCache
+from session_migrations import (
+    archived_sessions,
+    compaction_row,
+    event_compactions,
+    session_versions,
+    state_entries,
+    stored_events,
+)
+
+sessions = StorageSession.__table__
+
+# State keys merged into every session of the app / the user
+_SHARED_PREFIXES = (State.APP_PREFIX, State.USER_PREFIX)
+
+
+class EventWindowConfig(GetSessionConfig):
+    """Which events `get_session` loads.
+
+    - num_recent_events: only the last N events
+    - after_timestamp: only events at or after this time
+    - since_latest_compaction: the newest compaction summary and every event
+      it doesn't cover (all events if the session was never compacted)
+
+    They combine, e.g. the last 20 events since the latest compaction.
+    """
+
+    since_latest_compaction: bool = False
+
+
+class VersionedSession(Session):
+    """A Session loaded from the database, with the version it reflects.
+
+    Every write to the session bumps the version in the database, but only
+    from the version this object holds (compare-and-swap). If someone else
+    wrote first, their events are merged into this object ahead of the new
+    ones and the write is retried (see `DatabaseSessionService._rebase`).
+    """
+
+    version: int = 0
+
+
+class SessionConflictError(ValueError):
+    """Concurrent writes to one session changed the same state key.
+
+    A ValueError like ADK's stale-session error, so code that already handles
+    that one handles this too. Nothing was written: reload the session and
+    try again.
+    """
+
+
+def _window_after(config, compacted_until):
+    """Plain GetSessionConfig for `config`, starting after the compacted range."""
+    after_timestamp = config.after_timestamp
+    if compacted_until is not None:
+        # The summary itself is appended after the events it covers, so it's in range
+        after_timestamp = max(after_timestamp or 0, compacted_until)
+    return GetSessionConfig(
+        num_recent_events=config.num_recent_events, after_timestamp=after_timestamp
+    )
+
+
+@dataclass
+class _Resident:
+    """LRU bookkeeping for a session held in memory."""
+
+    size: int
+    last_access: float
+
+
+class InMemorySessionService(AdkInMemorySessionService):
+    """ADK's InMemorySessionService plus `get_or_create_session`, event windows and memory caps."""
+
+    def __init__(
+        self,
+        *,
+        max_sessions: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        spill_dir: Optional[str] = None,
+        sweep_interval: Optional[float] = None,
+    ):
+        """
+        Args:
+            max_sessions: Sessions kept in memory
+            max_bytes: Approximate bytes of sessions kept in memory (JSON size;
+                a state change counts its whole event, even if it overwrites a key)
+            idle_ttl: Seconds without use after which a session is evicted
+            spill_dir: Write evicted sessions here and reload them on access
+                (app and user state always stay in memory)
+            sweep_interval: Seconds between background `evict_expired()` runs
+                (defaults to idle_ttl; 0 evicts only when sessions are used)
+        """
+        super().__init__()
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.spill_dir = spill_dir
+        self.sweep_interval = idle_ttl if sweep_interval is None else sweep_interval
+        self._sweep_task: Optional[asyncio.Task] = None
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        # Without any limit nothing is tracked and this is ADK's service
+        self._limited = any(limit is not None for limit in (max_sessions, max_bytes, idle_ttl))
+        self._resident: OrderedDict[tuple[str, str, str], _Resident] = OrderedDict()
+        self._spilled: dict[tuple[str, str, str], str] = {}
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+        self.spills = 0
+
+    async def get_session(self, *, app_name, user_id, session_id, config=None):
+        if self._limited:
+            found = self._touch((app_name, user_id, session_id))
+            if found == "hit":
+                self.hits += 1
+            elif found is None:
+                self.misses += 1
+        if getattr(config, "since_latest_compaction", False):
+            stored = self.sessions.get(app_name, {}).get(user_id, {}).get(session_id)
+            compacted_until = None
+            for event in reversed(stored.events if stored else []):
+                if event.actions and event.actions.compaction:
+                    compacted_until = event.actions.compaction.end_timestamp
+                    break
+            config = _window_after(config, compacted_until)
+        session = await super().get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        self._evict(keep=(app_name, user_id, session_id))
+        return session
+
+    async def get_or_create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: Optional[str] = None,
+        state: Optional[dict[str, Any]] = None,
+    ) -> Session:
+        """Returns the session, creating it (with `state`) if it doesn't exist.
+
+        There is no await between the lookup and the insert, so concurrent
+        callers on the same event loop can't both create the session.
+        """
+        if session_id and self._touch((app_name, user_id, session_id)):
+            session = self._get_session_impl(
+                app_name=app_name, user_id=user_id, session_id=session_id
+            )
+            self._evict(keep=(app_name, user_id, session_id))
+            return session
+        return self._create_session_impl(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+
+    def _create_session_impl(self, *, app_name, user_id, state=None, session_id=None):
+        if self._limited and session_id:
+            # A spilled session still exists; bring it back so creating it again fails as usual
+            self._touch((app_name, user_id, session_id))
+        session = super()._create_session_impl(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        if self._limited:
+            key = (app_name, user_id, session.id)
+            size = self._measure(self.sessions[app_name][user_id][session.id])
+            self._resident[key] = _Resident(size, time.monotonic())
+            self.resident_bytes += size
+            self._evict(keep=key)
+        return session
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if not self._limited or event.partial:
+            return await super().append_event(session, event)
+        key = (session.app_name, session.user_id, session.id)
+        # An evicted session is reloaded, instead of the event being dropped with a warning
+        if self._touch(key) is None:
+            return await super().append_event(session, event)
+        event = await super().append_event(session, event)
+        if self.max_bytes is not None:
+            size = len(event.model_dump_json(exclude_none=True))
+            self._resident[key].size += size
+            self.resident_bytes += size
+        self._evict(keep=key)
+        return event
+
+    def _list_sessions_impl(self, *, app_name, user_id=None):
+        response = super()._list_sessions_impl(app_name=app_name, user_id=user_id)
+        for (spilled_app, spilled_user, _), path in self._spilled.items():
+            if spilled_app != app_name or user_id not in (None, spilled_user):
+                continue
+            session = self._read_spilled(path)
+            session.events = []
+            response.sessions.append(self._merge_state(app_name, spilled_user, session))
+        return response
+
+    def _delete_session_impl(self, *, app_name, user_id, session_id):
+        key = (app_name, user_id, session_id)
+        resident = self._resident.pop(key, None)
+        if resident is not None:
+            self.resident_bytes -= resident.size
+        path = self._spilled.pop(key, None)
+        if path is not None:
+            os.remove(path)
+        super()._delete_session_impl(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    def _touch(self, key) -> Optional[str]:
+        """Marks a session as used, reloading it if it was spilled.
+
+        Returns:
+            "hit" if it was in memory, "reload" if it was spilled, None if it doesn't exist
+        """
+        resident = self._resident.get(key)
+        if resident is not None:
+            resident.last_access = time.monotonic()
+            self._resident.move_to_end(key)
+            return "hit"
+        path = self._spilled.pop(key, None)
+        if path is None:
+            # Untracked when no limit is set
+            app_name, user_id, session_id = key
+            return "hit" if session_id in self.sessions.get(app_name, {}).get(user_id, {}) else None
+
+        session = self._read_spilled(path)
+        os.remove(path)
+        app_name, user_id, session_id = key
+        self.sessions.setdefault(app_name, {}).setdefault(user_id, {})[session_id] = session
+        size = self._measure(session)
+        self._resident[key] = _Resident(size, time.monotonic())
+        self.resident_bytes += size
+        self.reloads += 1
+        return "reload"
+
+    def evict_expired(self) -> int:
+        """Evicts sessions idle for longer than idle_ttl (or over a limit) now.
+
+        Returns:
+            Number of sessions evicted
+        """
+        evictions = self.evictions
+        self._evict()
+        return self.evictions - evictions
+
+    def close(self):
+        """Stops the background sweep."""
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            self._sweep_task = None
+
+    def _start_sweep(self):
+        if not self.sweep_interval or (self._sweep_task and not self._sweep_task.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Not on a loop yet; the next call from one starts it
+            return
+        self._sweep_task = loop.create_task(self._sweep_loop())
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.evict_expired()
+
+    def _evict(self, keep=None):
+        """Evicts idle sessions, then least recently used ones until back under the limits."""
+        if not self._limited:
+            return
+        if keep is not None:
+            self._start_sweep()
+        now = time.monotonic()
+        while self._resident:
+            key, resident = next(iter(self._resident.items()))
+            if key == keep:
+                # The session in use is never evicted, even if it alone is over max_bytes
+                break
+            idle = self.idle_ttl is not None and now - resident.last_access > self.idle_ttl
+            over = (self.max_sessions is not None and len(self._resident) > self.max_sessions) or (
+                self.max_bytes is not None and self.resident_bytes > self.max_bytes
+            )
+            if not (idle or over):
+                break
+            self._evict_session(key)
+
+    def _evict_session(self, key):
+        app_name, user_id, session_id = key
+        resident = self._resident.pop(key)
+        self.resident_bytes -= resident.size
+        user_sessions = self.sessions[app_name][user_id]
+        session = user_sessions.pop(session_id)
+        if not user_sessions:
+            del self.sessions[app_name][user_id]
+        self.evictions += 1
+        if self.spill_dir:
+            digest = hashlib.sha1("\x00".join(key).encode()).hexdigest()
+            path = os.path.join(self.spill_dir, f"{digest}.json.gz")
+            with open(path, "wb") as f:
+                f.write(gzip.compress(session.model_dump_json().encode(), compresslevel=1))
+            self._spilled[key] = path
+            self.spills += 1
+
+    def _measure(self, session: Session) -> int:
+        if self.max_bytes is None:
+            return 0
+        return len(session.model_dump_json(exclude_none=True))
+
+    @staticmethod
+    def _read_spilled(path: str) -> Session:
+        with open(path, "rb") as f:
+            return Session.model_validate_json(gzip.decompress(f.read()))
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._resident),
+            "bytes": self.resident_bytes,
+            "spilled": len(self._spilled),
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "evictions": self.evictions,
+            "spills": self.spills,
+        }
+
+
+class DatabaseSessionService(AdkDatabaseSessionService):
+    """ADK's DatabaseSessionService plus `get_or_create_session`, event windows and delta state."""
+
+    # Retries of a compare-and-swap write that lost to another writer
+    max_rebases = 10
+
+    def __init__(
+        self,
+        db_url: str,
+        *,
+        auto_migrate: bool = True,
+        event_codec: Optional[EventCodec] = None,
+        state_snapshot_every: int = 100,
+        session_cache: Optional[SessionCache] = None,
+        archive: Optional[SessionArchive] = None,
+        **kwargs: Any,
+    ):
+        """
+        Args:
+            db_url: SQLAlchemy database URL
+            auto_migrate: Apply pending session_migrations on startup
+            event_codec: Store new events in this compact encoding instead of
+                ADK's pickle + JSON columns (reading handles both)
+            state_snapshot_every: Fold a scope's changed keys back into its
+                state column after this many state writes (per process)
+            session_cache: Serve repeated loads of hot sessions from memory
+                (see session_cache.py)
+            archive: Where `archive_idle_sessions` moves idle sessions and
+                where they are read back from (see session_archive.py)
+            **kwargs: Passed to `create_engine`
+        """
+        super().__init__(db_url, **kwargs)
+        if auto_migrate:
+            session_migrations.migrate(self.db_engine)
+        # Without the migrations this behaves exactly like ADK's service
+        self.schema_version = max(session_migrations.applied_versions(self.db_engine), default=0)
+        self._migrated = self.schema_version >= 3
+        self._delta_state = self.schema_version >= 4
+        self._versioned = self.schema_version >= 5
+        self._archiving = self.schema_version >= 6
+        if event_codec is not None and not self._migrated:
+            raise ValueError("event_codec needs the session_migrations (auto_migrate=True)")
+        if session_cache is not None and not self._versioned:
+            raise ValueError("session_cache needs the session_migrations (auto_migrate=True)")
+        if archive is not None and not self._archiving:
+            raise ValueError("archive needs the session_migrations (auto_migrate=True)")
+        self.session_cache = session_cache
+        self.archive = archive
+        self.event_codec = event_codec
+        self.state_snapshot_every = state_snapshot_every
+        self._state_writes: dict[tuple[str, str, str], int] = {}
+        self.rebases = 0
+        self.conflicts = 0
+
+    async def create_session(self, *, app_name, user_id, state=None, session_id=None):
+        session_id = session_id or str(uuid.uuid4())
+        if not self._create_session_rows(app_name, user_id, session_id, state):
+            raise AlreadyExistsError(f"Session with id {session_id} already exists.")
+        return await self.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def get_or_create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: Optional[str] = None,
+        state: Optional[dict[str, Any]] = None,
+    ) -> Session:
+        """Returns the session, creating it (with `state`) if it doesn't exist.
+
+        Creation is a single upsert that does nothing when the session already
+        exists, so concurrent callers and other processes sharing the database
+        can race safely. Initial app/user state is only applied by the caller
+        that actually created the session.
+        """
+        session, _ = await self.create_session_if_missing(
+            app_name=app_name, user_id=user_id, session_id=session_id, state=state
+        )
+        return session
+
+    async def create_session_if_missing(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: Optional[str] = None,
+        state: Optional[dict[str, Any]] = None,
+    ) -> tuple[Session, bool]:
+        """`get_or_create_session` that also says whether this call created the session."""
+        session_id = session_id or str(uuid.uuid4())
+        created = self._create_session_rows(app_name, user_id, session_id, state)
+        session = await self.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        return session, created
+
+    def _create_session_rows(self, app_name, user_id, session_id, state) -> bool:
+        """Inserts the session (and missing app/user state rows). Returns False if it existed."""
+        state_deltas = _session_util.extract_state_delta(state)
+
+        with self.database_session_factory() as sql_session:
+            created = self._insert_ignore(
+                sql_session,
+                StorageSession,
+                app_name=app_name,
+                user_id=user_id,
+                id=session_id,
+                state=state_deltas["session"],
+            )
+            if not created:
+                # Nothing was written; ending the transaction without a commit skips the sync
+                sql_session.rollback()
+                return False
+            if self._archived_entry(sql_session, app_name, user_id, session_id) is not None:
+                # The id belongs to an archived session: bring that one back instead
+                sql_session.rollback()
+                self._rehydrate(sql_session, app_name, user_id, session_id)
+                sql_session.commit()
+                return False
+            self._insert_ignore(sql_session, StorageAppState, app_name=app_name, state={})
+            self._insert_ignore(
+                sql_session, StorageUserState, app_name=app_name, user_id=user_id, state={}
+            )
+            bumped = self._apply_state_deltas(
+                sql_session, app_name, user_id, session_id, state_deltas["app"], state_deltas["user"], {}
+            )
+            if self._versioned:
+                sql_session.execute(
+                    insert(session_versions).values(
+                        app_name=app_name, user_id=user_id, session_id=session_id, version=1
+                    )
+                )
+            sql_session.commit()
+        self._track_scopes(bumped)
+        return True
+
+    def update_app_state(self, app_name: str, app_delta: dict[str, Any]):
+        """Writes app-scope state (keys without the `app:` prefix) outside of any event."""
+        with self.database_session_factory() as sql_session:
+            self._insert_ignore(sql_session, StorageAppState, app_name=app_name, state={})
+            bumped = self._apply_state_deltas(sql_session, app_name, "", "", app_delta, {}, {})
+            sql_session.commit()
+        self._track_scopes(bumped)
+
+    async def get_session(self, *, app_name, user_id, session_id, config=None):
+        if not self._migrated:
+            return await super().get_session(
+                app_name=app_name, user_id=user_id, session_id=session_id, config=config
+            )
+
+        key = (app_name, user_id, session_id)
+        scope_keys = ((app_name, ""), (app_name, user_id))
+        if self.session_cache is not None and config is None:
+            cached = self.session_cache.get(key)
+            if cached is not None:
+                scopes = {scope: self.session_cache.get_scope(scope) for scope in scope_keys}
+                if self.session_cache.check_version:
+                    with self.database_session_factory() as sql_session:
+                        versions = self._read_versions(sql_session, *key)
+                    if versions.get((user_id, session_id), 0) != cached.version:
+                        self.session_cache.invalidate(key)
+                        cached = None
+                    for scope in scope_keys:
+                        if scopes[scope] is not None and scopes[scope][0] != versions.get((scope[1], ""), 0):
+                            scopes[scope] = None
+            if cached is not None:
+                return self._with_shared_state(self.session_cache.copy(cached), scopes)
+
+        with self.database_session_factory() as sql_session:
+            # Read before the events and state: the reads may not share a
+            # snapshot, and a version older than the data only costs a rebase
+            # on write (or a re-read of a cached scope), while a newer one would
+            # let a write skip someone's events
+            versions = self._read_versions(sql_session, *key) if self._versioned else {}
+            version = versions.get((user_id, session_id), 0)
+            storage_session = sql_session.get(StorageSession, key)
+            if storage_session is None and self._rehydrate(sql_session, *key):
+                sql_session.commit()
+                version = self._read_version(sql_session, *key)
+                storage_session = sql_session.get(StorageSession, key)
+            if storage_session is None:
+                return None
+
+            if getattr(config, "since_latest_compaction", False):
+                compacted_until = sql_session.scalar(
+                    select(event_compactions.c.end_timestamp)
+                    .where(
+                        event_compactions.c.app_name == app_name,
+                        event_compactions.c.user_id == user_id,
+                        event_compactions.c.session_id == session_id,
+                    )
+                    .order_by(event_compactions.c.timestamp.desc())
+                    .limit(1)
+                )
+                config = _window_after(config, compacted_until)
+
+            query = select(stored_events).where(
+                stored_events.c.app_name == app_name,
+                stored_events.c.user_id == user_id,
+                stored_events.c.session_id == session_id,
+            )
+            if config and config.after_timestamp:
+                query = query.where(
+                    stored_events.c.timestamp >= datetime.fromtimestamp(config.after_timestamp)
+                )
+            query = query.order_by(stored_events.c.timestamp.desc())
+            if config and config.num_recent_events:
+                query = query.limit(config.num_recent_events)
+            rows = sql_session.execute(query).all()
+
+            storage_app_state = sql_session.get(StorageAppState, (app_name,))
+            storage_user_state = sql_session.get(StorageUserState, (app_name, user_id))
+            changed = self._load_state_entries(sql_session, app_name, user_id, session_id)
+            app_state = (storage_app_state.state if storage_app_state else {}) | changed[(app_name, "", "")]
+            user_state = (storage_user_state.state if storage_user_state else {}) | changed[(app_name, user_id, "")]
+            merged_state = _merge_state(
+                app_state, user_state, storage_session.state | changed[(app_name, user_id, session_id)]
+            )
+            if self.session_cache is not None:
+                self.session_cache.put_scope(scope_keys[0], versions.get(("", ""), 0), copy.deepcopy(app_state))
+                self.session_cache.put_scope(scope_keys[1], versions.get((user_id, ""), 0), copy.deepcopy(user_state))
+            events = [row_to_event(row) for row in reversed(rows)]
+            session = storage_session.to_session(state=merged_state, events=events)
+            if not self._versioned:
+                return session
+            session = VersionedSession.model_construct(**session.__dict__, version=version)
+        if self.session_cache is not None and config is None:
+            self.session_cache.put(key, session)
+            return self.session_cache.copy(session)
+        return session
+
+    async def get_session_version(self, *, app_name, user_id, session_id) -> Optional[int]:
+        """The session's current version (one indexed read), None if versions aren't tracked."""
+        if not self._versioned:
+            return None
+        with self.database_session_factory() as sql_session:
+            return self._read_version(sql_session, app_name, user_id, session_id)
+
+    @staticmethod
+    def _read_version(sql_session, app_name, user_id, session_id) -> int:
+        version = sql_session.scalar(
+            select(session_versions.c.version).where(
+                session_versions.c.app_name == app_name,
+                session_versions.c.user_id == user_id,
+                session_versions.c.session_id == session_id,
+            )
+        )
+        return version or 0
+
+    @staticmethod
+    def _read_versions(sql_session, app_name, user_id, session_id) -> dict[tuple[str, str], int]:
+        """The session's, the user's and the app's versions in one read, keyed by (user_id, session_id).
+
+        App and user state are versioned in session_versions too, under
+        session_id "" (and user_id "" for the app), like their state_entries.
+        """
+        v = session_versions.c
+        rows = sql_session.execute(
+            select(v.user_id, v.session_id, v.version).where(
+                v.app_name == app_name,
+                or_(
+                    and_(v.user_id == user_id, v.session_id.in_((session_id, ""))),
+                    and_(v.user_id == "", v.session_id == ""),
+                ),
+            )
+        )
+        return {(row.user_id, row.session_id): row.version for row in rows}
+
+    def _bump_version(self, sql_session, app_name, user_id, session_id) -> int:
+        """Increments the session's version and returns the new one."""
+        bumped = sql_session.execute(
+            update(session_versions)
+            .where(
+                session_versions.c.app_name == app_name,
+                session_versions.c.user_id == user_id,
+                session_versions.c.session_id == session_id,
+            )
+            .values(version=session_versions.c.version + 1)
+        )
+        if bumped.rowcount == 0:
+            # Created before migration 5
+            self._insert_ignore(
+                sql_session,
+                session_versions,
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id,
+                version=1,
+            )
+            return 1
+        return self._read_version(sql_session, app_name, user_id, session_id)
+
+    async def list_sessions(self, *, app_name, user_id=None):
+        response = await super().list_sessions(app_name=app_name, user_id=user_id)
+        if self._archiving:
+            response.sessions.extend(self._list_archived(app_name, user_id))
+        if not self._delta_state:
+            return response
+        with self.database_session_factory() as sql_session:
+            changed = self._load_state_entries(sql_session, app_name, user_id)
+        if len(changed) == 0:
+            return response
+        for session in response.sessions:
+            # Keys changed since the last snapshot, least specific scope first
+            for scope, prefix in (
+                ((app_name, "", ""), State.APP_PREFIX),
+                ((app_name, session.user_id, ""), State.USER_PREFIX),
+                ((app_name, session.user_id, session.id), ""),
+            ):
+                for key, value in changed[scope].items():
+                    session.state[prefix + key] = value
+        return response
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if not self._migrated:
+            return await super().append_event(session, event)
+        if event.partial:
+            return event
+        event = self._trim_temp_delta_state(event)
+        self._write_events(session, [event])
+        # Also update the in-memory session
+        await BaseSessionService.append_event(self, session=session, event=event)
+        return event
+
+    def _write_events(self, session: Session, events: list[Event]):
+        """Stores `events` and their state changes in one transaction.
+
+        A VersionedSession is written with a compare-and-swap of its version
+        (`_swap_version`); other sessions get ADK's update_time check.
+        """
+        key = (session.app_name, session.user_id, session.id)
+        cas = self._versioned and isinstance(session, VersionedSession)
+        with self.database_session_factory() as sql_session:
+            if cas:
+                # First statement of the transaction: in SQLite it takes the write
+                # lock before anything is read, so no read can go stale under it
+                version = self._swap_version(sql_session, session, events)
+                self._order_events(session, events)
+            storage_session = sql_session.get(StorageSession, key)
+            if storage_session is None and self._rehydrate(sql_session, *key):
+                # Archived while this object was held; written back in this transaction
+                storage_session = sql_session.get(StorageSession, key)
+            if not cas and storage_session.update_timestamp_tz > session.last_update_time:
+                if self.session_cache is not None:
+                    self.session_cache.invalidate(key)
+                raise ValueError(
+                    "The last_update_time provided in the session object"
+                    f" {datetime.fromtimestamp(session.last_update_time):'%Y-%m-%d %H:%M:%S'} is"
+                    " earlier than the update_time in the storage_session"
+                    f" {datetime.fromtimestamp(storage_session.update_timestamp_tz):'%Y-%m-%d %H:%M:%S'}."
+                    " Please check if it is a stale session."
+                )
+
+            app_delta, user_delta, session_delta = {}, {}, {}
+            for event in events:
+                if event.actions and event.actions.state_delta:
+                    state_deltas = _session_util.extract_state_delta(event.actions.state_delta)
+                    app_delta.update(state_deltas["app"])
+                    user_delta.update(state_deltas["user"])
+                    session_delta.update(state_deltas["session"])
+            bumped = self._apply_state_deltas(
+                sql_session,
+                session.app_name,
+                session.user_id,
+                session.id,
+                app_delta,
+                user_delta,
+                session_delta,
+                storage_session,
+            )
+
+            if self.event_codec is None:
+                sql_session.add_all([StorageEvent.from_event(session, e) for e in events])
+            else:
+                sql_session.execute(
+                    insert(stored_events),
+                    [
+                        event_row(session.app_name, session.user_id, session.id, e, self.event_codec)
+                        for e in events
+                    ],
+                )
+            self._record_compactions(sql_session, session, events)
+            if not cas:
+                version = None
+                if self._versioned:
+                    version = self._bump_version(sql_session, *key)
+            sql_session.commit()
+            sql_session.refresh(storage_session)
+            # Update timestamp with commit time
+            session.last_update_time = storage_session.update_timestamp_tz
+        self._track_scopes(bumped)
+        if isinstance(session, VersionedSession):
+            self._track_version(session, version)
+
+    def _swap_version(self, sql_session, session: VersionedSession, events: list[Event]) -> int:
+        """Moves the version from `session.version` to the next, rebasing `session` when it lost a race.
+
+        The UPDATE only matches at the version this object holds, and it locks
+        the session's version row (in SQLite, the file) until commit. Writers
+        of one session go one at a time, in version order; other sessions'
+        rows aren't involved.
+
+        Returns:
+            The new version
+
+        Raises:
+            SessionConflictError: Someone else changed a key `events` change
+        """
+        key = (session.app_name, session.user_id, session.id)
+        where = self._session_rows(session_versions, *key)
+        for _ in range(self.max_rebases + 1):
+            swapped = sql_session.execute(
+                update(session_versions)
+                .where(*where, session_versions.c.version == session.version)
+                .values(version=session.version + 1)
+            )
+            if swapped.rowcount == 1:
+                return session.version + 1
+            current = sql_session.scalar(select(session_versions.c.version).where(*where))
+            if current is None:
+                if self._rehydrate(sql_session, *key):
+                    continue
+                # Created before migration 5
+                app_name, user_id, session_id = key
+                if self._insert_ignore(
+                    sql_session,
+                    session_versions,
+                    app_name=app_name,
+                    user_id=user_id,
+                    session_id=session_id,
+                    version=session.version + 1,
+                ):
+                    return session.version + 1
+                continue
+            self._rebase(sql_session, session, events, current)
+        raise SessionConflictError(
+            f"Session {session.id} kept changing under this write ({self.max_rebases} rebases); reload it and retry."
+        )
+
+    def _rebase(self, sql_session, session: VersionedSession, events: list[Event], version: int):
+        """Puts the events written since `session.version` into `session`, ahead of `events`.
+
+        Their state changes are applied to `session.state` as well. Nothing
+        changes if both sides set the same state key: this write was computed
+        without the other one's value (a counter would lose an increment), so
+        it is a conflict, even when the values happen to match.
+
+        Raises:
+            SessionConflictError: On a conflicting state key
+        """
+        key = (session.app_name, session.user_id, session.id)
+        # With batching (SqliteSessionService) `events` are already at the end of session.events
+        writing = {id(event) for event in events}
+        known = [event for event in session.events if id(event) not in writing]
+        query = select(stored_events).where(*self._session_rows(stored_events, *key))
+        if known:
+            query = query.where(stored_events.c.timestamp >= datetime.fromtimestamp(known[-1].timestamp))
+        known_ids = {event.id for event in known}
+        theirs = [
+            row_to_event(row)
+            for row in sql_session.execute(query.order_by(stored_events.c.timestamp))
+            if row.id not in known_ids
+        ]
+
+        ours, their_delta = {}, {}
+        for event in events:
+            ours.update(event.actions.state_delta if event.actions else {})
+        for event in theirs:
+            their_delta.update(event.actions.state_delta if event.actions else {})
+        conflicts = sorted(ours.keys() & their_delta.keys())
+        if conflicts:
+            self.conflicts += 1
+            if self.session_cache is not None:
+                self.session_cache.invalidate(key)
+            raise SessionConflictError(
+                f"Session {session.id} was changed concurrently (now at version {version}, this copy"
+                f" is at {session.version}) and both writes set {', '.join(conflicts)}; reload it and retry."
+            )
+
+        for event in theirs:
+            self._update_session_state(session, event)
+        session.events = known + theirs + [event for event in session.events if id(event) in writing]
+        session.version = version
+        self.rebases += 1
+
+    @staticmethod
+    def _order_events(session: Session, events: list[Event]):
+        """Moves `events` after every event already stored, so timestamp order is write order.
+
+        The events of a session load by timestamp, but a writer that had to
+        rebase created its events before the ones it rebased onto.
+        """
+        writing = {id(event) for event in events}
+        stored = [event.timestamp for event in session.events if id(event) not in writing]
+        latest = stored[-1] if stored else 0.0
+        for event in events:
+            if event.timestamp <= latest:
+                # The columns store microseconds
+                event.timestamp = round(latest + 1e-6, 6)
+            latest = event.timestamp
+
+    def _track_version(self, session: VersionedSession, version: int):
+        """Moves the session's version along after its write, or drops it from the cache."""
+        key = (session.app_name, session.user_id, session.id)
+        if version == session.version + 1:
+            session.version = version
+            if self.session_cache is not None:
+                # Write-through: the object just written is the newest copy
+                self.session_cache.put(key, session)
+        elif self.session_cache is not None:
+            self.session_cache.invalidate(key)
+
+    def _track_scopes(self, bumped: dict[tuple[str, str], tuple[int, dict]]):
+        """Applies committed app/user state writes to their cached scopes."""
+        if self.session_cache is not None:
+            for scope, (version, delta) in bumped.items():
+                self.session_cache.advance_scope(scope, version, delta)
+
+    async def delete_session(self, *, app_name, user_id, session_id):
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        if self.session_cache is not None:
+            self.session_cache.invalidate((app_name, user_id, session_id))
+        if not self._migrated:
+            return
+        with self.database_session_factory() as sql_session:
+            tables = [event_compactions]
+            if self._delta_state:
+                tables.append(state_entries)
+            if self._versioned:
+                tables.append(session_versions)
+            if self._archiving:
+                # The archived copy itself stays in its segment until the segment expires
+                tables.append(archived_sessions)
+            for table in tables:
+                sql_session.execute(
+                    delete(table).where(
+                        table.c.app_name == app_name,
+                        table.c.user_id == user_id,
+                        table.c.session_id == session_id,
+                    )
+                )
+            sql_session.commit()
+        self._state_writes.pop((app_name, user_id, session_id), None)
+
+    def idle_sessions(self, idle_seconds: float, *, app_name: Optional[str] = None) -> list[tuple[str, str, str, int]]:
+        """Sessions without an event or state change in the last `idle_seconds`.
+
+        Returns:
+            (app_name, user_id, session_id, version) of each
+        """
+        e, v = stored_events.c, session_versions.c
+        # With delta state the sessions row rarely changes, so its update_time
+        # alone says little; the newest event is one index probe per session
+        last_event = (
+            select(func.max(e.timestamp))
+            .where(e.app_name == sessions.c.app_name, e.user_id == sessions.c.user_id, e.session_id == sessions.c.id)
+            .scalar_subquery()
+        )
+        version = (
+            select(v.version)
+            .where(v.app_name == sessions.c.app_name, v.user_id == sessions.c.user_id, v.session_id == sessions.c.id)
+            .scalar_subquery()
+        )
+        query = select(
+            sessions.c.app_name,
+            sessions.c.user_id,
+            sessions.c.id,
+            sessions.c.update_time,
+            last_event.label("last_event"),
+            version.label("version"),
+        )
+        if app_name is not None:
+            query = query.where(sessions.c.app_name == app_name)
+        cutoff = time.time() - idle_seconds
+        idle = []
+        with self.db_engine.connect() as connection:
+            for row in connection.execution_options(yield_per=500).execute(query):
+                if self._last_active(row.update_time, row.last_event) <= cutoff:
+                    idle.append((row.app_name, row.user_id, row.id, row.version or 0))
+        return idle
+
+    def archive_idle_sessions(
+        self, idle_seconds: float, *, app_name: Optional[str] = None, limit: Optional[int] = None
+    ) -> int:
+        """Moves every session idle for `idle_seconds` into the archive.
+
+        A session written to after it was picked stays in the database.
+
+        Returns:
+            Number of sessions archived
+        """
+        archived = 0
+        for app, user, session_id, version in self.idle_sessions(idle_seconds, app_name=app_name)[:limit]:
+            archived += self.archive_session(app, user, session_id, if_version=version)
+        return archived
+
+    def archive_session(self, app_name: str, user_id: str, session_id: str, *, if_version: Optional[int] = None) -> bool:
+        """Moves one session (events, session state, version) into the archive.
+
+        The session's rows are appended to the segment of the day it was last
+        active, recorded in `archived_sessions` and deleted, in one
+        transaction. App and user state stay: other sessions share them.
+
+        Args:
+            if_version: Only archive if nobody wrote to the session since it
+                was at this version
+
+        Returns:
+            True if the session was archived
+        """
+        if self.archive is None:
+            raise ValueError("archive_session needs archive=SessionArchive(...)")
+        key = (app_name, user_id, session_id)
+        with self.database_session_factory() as sql_session:
+            # A write first: it takes the lock an append would need, so nothing
+            # slips in between reading the rows and deleting them
+            version = self._bump_version(sql_session, *key)
+            session_row = sql_session.execute(
+                select(sessions).where(
+                    sessions.c.app_name == app_name, sessions.c.user_id == user_id, sessions.c.id == session_id
+                )
+            ).first()
+            if session_row is None or (if_version is not None and version != if_version + 1):
+                sql_session.rollback()
+                return False
+
+            rows = {}
+            for table in (stored_events, state_entries, event_compactions):
+                query = select(table).where(*self._session_rows(table, *key))
+                if table is stored_events:
+                    query = query.order_by(stored_events.c.timestamp)
+                rows[table.name] = sql_session.execute(query).all()
+            events = rows[stored_events.name]
+            last_active = self._last_active(session_row.update_time, events[-1].timestamp if events else None)
+            state = session_row.state | {entry.key: json.loads(entry.value) for entry in rows[state_entries.name]}
+
+            segment = self.archive.segment_for(last_active)
+            offset, length = self.archive.append(
+                segment,
+                {
+                    "app_name": app_name,
+                    "user_id": user_id,
+                    "session_id": session_id,
+                    "version": version,
+                    "last_active": last_active,
+                    sessions.name: encode_rows([session_row]),
+                    **{name: encode_rows(table_rows) for name, table_rows in rows.items()},
+                },
+            )
+            sql_session.execute(
+                insert(archived_sessions).values(
+                    app_name=app_name,
+                    user_id=user_id,
+                    session_id=session_id,
+                    segment=segment,
+                    offset=offset,
+                    length=length,
+                    last_active=last_active,
+                    archived_at=time.time(),
+                    events=len(events),
+                    state=json.dumps(state),
+                )
+            )
+            for table in (stored_events, state_entries, event_compactions, session_versions):
+                sql_session.execute(delete(table).where(*self._session_rows(table, *key)))
+            sql_session.execute(
+                delete(sessions).where(
+                    sessions.c.app_name == app_name, sessions.c.user_id == user_id, sessions.c.id == session_id
+                )
+            )
+            sql_session.commit()
+        if self.session_cache is not None:
+            self.session_cache.invalidate(key)
+        self._state_writes.pop(key, None)
+        return True
+
+    def expire_archive(self, retain_seconds: float) -> int:
+        """Deletes the archived sessions last active more than `retain_seconds` ago.
+
+        Whole segments go, so a session can outlive the cutoff by up to a day.
+
+        Returns:
+            Number of sessions deleted
+        """
+        if self.archive is None:
+            raise ValueError("expire_archive needs archive=SessionArchive(...)")
+        cutoff = datetime.fromtimestamp(time.time() - retain_seconds, timezone.utc).date()
+        expired = 0
+        for segment in self.archive.segments(before=cutoff):
+            # Index first: a crash in between leaves an orphaned file, never a dangling entry
+            with self.database_session_factory() as sql_session:
+                expired += sql_session.execute(
+                    delete(archived_sessions).where(archived_sessions.c.segment == segment)
+                ).rowcount
+                sql_session.commit()
+            self.archive.remove(segment)
+        return expired
+
+    def _archived_entry(self, sql_session, app_name, user_id, session_id):
+        if not self._archiving:
+            return None
+        return sql_session.execute(
+            select(archived_sessions).where(*self._session_rows(archived_sessions, app_name, user_id, session_id))
+        ).first()
+
+    def _rehydrate(self, sql_session, app_name, user_id, session_id) -> bool:
+        """Writes an archived session back into the database, in the caller's transaction.
+
+        Returns:
+            True if the session was archived (the caller should look again)
+        """
+        entry = self._archived_entry(sql_session, app_name, user_id, session_id)
+        if entry is None:
+            return False
+        if self.archive is None:
+            raise ValueError(f"Session {session_id} is archived; pass archive=SessionArchive(...) to read it")
+        where = self._session_rows(archived_sessions, app_name, user_id, session_id)
+        if sql_session.execute(delete(archived_sessions).where(*where)).rowcount == 0:
+            # Another caller brought it back first
+            return True
+        document = self.archive.read(entry.segment, entry.offset, entry.length)
+        for table in (sessions, stored_events, state_entries, event_compactions):
+            rows = decode_rows(table, document[table.name])
+            if rows:
+                sql_session.execute(insert(table), rows)
+        # Past the version it was archived at, so copies cached before that don't match
+        sql_session.execute(
+            insert(session_versions).values(
+                app_name=app_name, user_id=user_id, session_id=session_id, version=document["version"] + 1
+            )
+        )
+        return True
+
+    def _list_archived(self, app_name, user_id=None) -> list[Session]:
+        query = select(archived_sessions).where(archived_sessions.c.app_name == app_name)
+        if user_id is not None:
+            query = query.where(archived_sessions.c.user_id == user_id)
+        with self.database_session_factory() as sql_session:
+            rows = sql_session.execute(query).all()
+            if not rows:
+                return []
+            storage_app_state = sql_session.get(StorageAppState, (app_name,))
+            user_states = {
+                user_state.user_id: user_state.state
+                for user_state in sql_session.scalars(
+                    select(StorageUserState).where(
+                        StorageUserState.app_name == app_name,
+                        StorageUserState.user_id.in_({row.user_id for row in rows}),
+                    )
+                )
+            }
+        return [
+            Session(
+                app_name=app_name,
+                user_id=row.user_id,
+                id=row.session_id,
+                state=_merge_state(
+                    storage_app_state.state if storage_app_state else {},
+                    user_states.get(row.user_id, {}),
+                    json.loads(row.state),
+                ),
+                last_update_time=row.last_active,
+            )
+            for row in rows
+        ]
+
+    def _last_active(self, update_time: datetime, last_event: Optional[datetime]) -> float:
+        if self.db_engine.dialect.name == "sqlite":
+            # ADK's update_time is UTC, and SQLite returns it without a zone
+            updated = update_time.replace(tzinfo=timezone.utc).timestamp()
+        else:
+            updated = update_time.timestamp()
+        return max(updated, last_event.timestamp()) if last_event is not None else updated
+
+    @staticmethod
+    def _session_rows(table, app_name, user_id, session_id):
+        return (table.c.app_name == app_name, table.c.user_id == user_id, table.c.session_id == session_id)
+
+    def _record_compactions(self, sql_session, session: Session, events: list[Event]):
+        """Indexes the compaction summaries among `events` (same transaction as the events)."""
+        rows = [
+            compaction_row(
+                session.app_name, session.user_id, session.id, e.id, e.timestamp, e.actions.compaction
+            )
+            for e in events
+            if e.actions and e.actions.compaction
+        ]
+        if rows:
+            sql_session.execute(insert(event_compactions), rows)
+
+    def _apply_state_deltas(
+        self,
+        sql_session,
+        app_name,
+        user_id,
+        session_id,
+        app_delta,
+        user_delta,
+        session_delta,
+        storage_session=None,
+    ):
+        """Writes state changes: one row per changed key, or (before migration 4) whole JSON columns.
+
+        Returns:
+            {(app_name, user_id): (new version, delta)} for the app scope
+            (user_id "") and user scope it changed, for `_track_scopes`
+        """
+        bumped = {}
+        if self._versioned:
+            for scope_user, delta in (("", app_delta), (user_id, user_delta)):
+                if delta:
+                    version = self._bump_version(sql_session, app_name, scope_user, "")
+                    bumped[(app_name, scope_user)] = (version, delta)
+        scoped = (
+            ((app_name, "", ""), app_delta),
+            ((app_name, user_id, ""), user_delta),
+            ((app_name, user_id, session_id), session_delta),
+        )
+        deltas = {scope: delta for scope, delta in scoped if delta}
+        if not self._delta_state:
+            if app_delta:
+                app_state = sql_session.get(StorageAppState, (app_name,))
+                app_state.state = app_state.state | app_delta
+            if user_delta:
+                user_state = sql_session.get(StorageUserState, (app_name, user_id))
+                user_state.state = user_state.state | user_delta
+            if session_delta:
+                storage_session = storage_session or sql_session.get(
+                    StorageSession, (app_name, user_id, session_id)
+                )
+                storage_session.state = storage_session.state | session_delta
+            return bumped
+
+        now = time.time()
+        rows = [
+            {
+                "app_name": scope[0],
+                "user_id": scope[1],
+                "session_id": scope[2],
+                "key": key,
+                "value": json.dumps(value),
+                "updated_at": now,
+            }
+            for scope, delta in deltas.items()
+            for key, value in delta.items()
+        ]
+        if not rows:
+            return bumped
+        self._upsert_state_entries(sql_session, rows)
+
+        for scope in deltas:
+            writes = self._state_writes.get(scope, 0) + 1
+            if writes >= self.state_snapshot_every:
+                self._snapshot_state(sql_session, scope)
+                writes = 0
+            self._state_writes[scope] = writes
+        return bumped
+
+    def _upsert_state_entries(self, sql_session, rows):
+        dialect = self.db_engine.dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            stmt = (sqlite if dialect == "sqlite" else postgresql).insert(state_entries)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["app_name", "user_id", "session_id", "key"],
+                set_={"value": stmt.excluded.value, "updated_at": stmt.excluded.updated_at},
+            )
+        elif dialect in ("mysql", "mariadb"):
+            stmt = mysql.insert(state_entries)
+            stmt = stmt.on_duplicate_key_update(
+                value=stmt.inserted.value, updated_at=stmt.inserted.updated_at
+            )
+        else:
+            # No portable upsert (e.g. Spanner): update, and insert the rows
+            # that weren't there yet, each in a savepoint like _insert_ignore
+            for row in rows:
+                self._update_state_entry(sql_session, row)
+            return
+        sql_session.execute(stmt, rows)
+
+    def _update_state_entry(self, sql_session, row):
+        where = (
+            state_entries.c.app_name == row["app_name"],
+            state_entries.c.user_id == row["user_id"],
+            state_entries.c.session_id == row["session_id"],
+            state_entries.c.key == row["key"],
+        )
+        changes = {"value": row["value"], "updated_at": row["updated_at"]}
+        if sql_session.execute(update(state_entries).where(*where).values(**changes)).rowcount:
+            return
+        try:
+            with sql_session.begin_nested():
+                sql_session.execute(insert(state_entries).values(**row))
+        except IntegrityError:
+            # Another writer inserted the key in between
+            sql_session.execute(update(state_entries).where(*where).values(**changes))
+
+    def _load_state_entries(self, sql_session, app_name, user_id=None, session_id=None):
+        """Changed keys per scope, {(app_name, user_id, session_id): {key: value}}.
+
+        With `session_id`, only the app, user and that session's scopes; with just
+        `user_id`, the app scope and everything of that user; otherwise the whole app.
+        """
+        changed = defaultdict(dict)
+        if not self._delta_state:
+            return changed
+        query = select(state_entries).where(state_entries.c.app_name == app_name)
+        if session_id is not None:
+            query = query.where(
+                state_entries.c.user_id.in_(("", user_id)),
+                state_entries.c.session_id.in_(("", session_id)),
+            )
+        elif user_id is not None:
+            query = query.where(state_entries.c.user_id.in_(("", user_id)))
+        for row in sql_session.execute(query):
+            if row.user_id == "" and row.session_id != "":
+                continue
+            changed[(row.app_name, row.user_id, row.session_id)][row.key] = json.loads(row.value)
+        return changed
+
+    def _load_scope(self, sql_session, app_name, user_id) -> tuple[int, dict]:
+        """(version, state) of the app's state (user_id "") or one user's, prefixes left out."""
+        version = self._read_version(sql_session, app_name, user_id, "")
+        if user_id:
+            row = sql_session.get(StorageUserState, (app_name, user_id))
+        else:
+            row = sql_session.get(StorageAppState, (app_name,))
+        # session_id "" keeps it to the app and user scopes
+        changed = self._load_state_entries(sql_session, app_name, user_id, "")
+        return version, (row.state if row else {}) | changed[(app_name, user_id, "")]
+
+    def _with_shared_state(self, session: Session, scopes: dict) -> Session:
+        """Replaces the session's `app:` / `user:` keys with its cached scopes, loading any not cached."""
+        missing = [scope for scope, cached in scopes.items() if cached is None]
+        if missing:
+            with self.database_session_factory() as sql_session:
+                for scope in missing:
+                    scopes[scope] = self._load_scope(sql_session, *scope)
+                    self.session_cache.put_scope(scope, *scopes[scope])
+        (_, app_state), (_, user_state) = scopes.values()
+        for name in [name for name in session.state if name.startswith(_SHARED_PREFIXES)]:
+            del session.state[name]
+        session.state.update(copy.deepcopy(_merge_state(app_state, user_state, {})))
+        return session
+
+    def _snapshot_state(self, sql_session, scope):
+        """Folds a scope's changed keys into its JSON state column and drops the rows."""
+        app_name, user_id, session_id = scope
+        where = (
+            state_entries.c.app_name == app_name,
+            state_entries.c.user_id == user_id,
+            state_entries.c.session_id == session_id,
+        )
+        rows = sql_session.execute(select(state_entries).where(*where)).all()
+        if not rows:
+            return
+        if session_id:
+            target = sql_session.get(StorageSession, scope)
+        elif user_id:
+            target = sql_session.get(StorageUserState, (app_name, user_id))
+        else:
+            target = sql_session.get(StorageAppState, (app_name,))
+        target.state = target.state | {row.key: json.loads(row.value) for row in rows}
+        # Only the versions folded in; a concurrent writer's newer value stays as a row
+        for row in rows:
+            sql_session.execute(
+                delete(state_entries).where(
+                    *where, state_entries.c.key == row.key, state_entries.c.updated_at == row.updated_at
+                )
+            )
+
+    def snapshot_state(self):
+        """Folds every pending state change into the JSON state columns (e.g. before a backup)."""
+        if not self._delta_state:
+            return
+        with self.database_session_factory() as sql_session:
+            scopes = sql_session.execute(
+                select(state_entries.c.app_name, state_entries.c.user_id, state_entries.c.session_id)
+                .distinct()
+            ).all()
+            for scope in scopes:
+                self._snapshot_state(sql_session, tuple(scope))
+            sql_session.commit()
+        self._state_writes.clear()
+
+    def _insert_ignore(self, sql_session, model, **values) -> bool:
+        """INSERT that silently does nothing on a primary key conflict.
+
+        Returns:
+            True if the row was inserted
+        """
+        dialect = self.db_engine.dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            stmt = (sqlite if dialect == "sqlite" else postgresql).insert(model)
+            stmt = stmt.values(**values).on_conflict_do_nothing()
+        elif dialect in ("mysql", "mariadb"):
+            # No ON CONFLICT in MySQL; INSERT IGNORE skips the duplicate row
+            stmt = mysql.insert(model).values(**values).prefix_with("IGNORE")
+        else:
+            # No portable "do nothing": insert in a savepoint, and on a
+            # conflict roll back just that, keeping the rest of the transaction
+            try:
+                with sql_session.begin_nested():
+                    sql_session.execute(insert(model).values(**values))
+            except IntegrityError:
+                return False
+            return True
+        return sql_session.execute(stmt).rowcount == 1
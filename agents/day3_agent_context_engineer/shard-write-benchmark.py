@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+import warnings
+warnings.filterwarnings("ignore")
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.genai import types
+from sqlalchemy import event as sa_event
+
+from sharded_session_service import ShardedSessionService
+
+# Event write throughput (events/s) with the sessions spread over 1, 2, 4 and
+# 8 SQLite files by ShardedSessionService. Every conversation belongs to a
+# different user and runs on its own thread (like separate requests in a
+# server), one commit per event.
+#
+# A commit holds its file's write lock until the disk confirms it, which is
+# the time a single file serializes and shards overlap. A local SSD's fsync
+# (well under a millisecond) hides that behind Python's own per-event work,
+# so --commit-ms adds a sleep inside each commit, with the lock held, to model
+# a network volume. Use --commit-ms 0 to measure the disk you have.
+#
+# Run from this folder:
+#   python shard-write-benchmark.py
+#   python shard-write-benchmark.py --sessions 128 --shards 1 4 16 --commit-ms 2
+
+APP_NAME = "default"
+
+
+def invocation_events(invocation_id, turn):
+    def event(author, text, state_delta=None):
+        return Event(
+            invocation_id=invocation_id,
+            author=author,
+            content=types.Content(role="user" if author == "user" else "model", parts=[types.Part(text=text)]),
+            actions=EventActions(state_delta=state_delta or {}),
+        )
+
+    return [
+        event("user", f"Question number {turn}?"),
+        event("assistant", f"Here is the answer to question {turn}. " * 5, {"turns": turn}),
+    ]
+
+
+async def run_session(service, user_id, invocations):
+    session = await service.get_or_create_session(app_name=APP_NAME, user_id=user_id, session_id="chat")
+    written = 0
+    for turn in range(invocations):
+        for event in invocation_events(f"inv-{turn}", turn):
+            await service.append_event(session, event)
+            written += 1
+    return written
+
+
+def run_level(service, sessions, invocations):
+    """Runs all sessions at once, each on its own thread and event loop."""
+    counts, errors = [], []
+    start_line = threading.Barrier(sessions + 1)
+
+    def worker(index):
+        start_line.wait()
+        try:
+            counts.append(asyncio.run(run_session(service, f"user-{index}", invocations)))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    start_line.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return sum(counts), time.perf_counter() - start, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session write throughput across SQLite shards")
+    parser.add_argument("--shards", type=int, nargs="*", default=[1, 2, 4, 8])
+    parser.add_argument("--sessions", type=int, default=64)
+    parser.add_argument("--invocations", type=int, default=10, help="Invocations per session (2 events each)")
+    parser.add_argument("--commit-ms", type=float, default=10, help="Extra disk latency per commit")
+    args = parser.parse_args()
+
+    print(f"\n{args.sessions} concurrent sessions x {args.invocations} invocations, {args.commit_ms:g} ms per commit\n")
+    print(f"{'shards':>7}{'events/s':>10}{'speedup':>9}  sessions per shard")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for shards in args.shards:
+            service = ShardedSessionService.sqlite(
+                os.path.join(tmp, f"{shards}-shards-{{shard}}.db"),
+                shards,
+                batch_invocation_events=False,
+                pool_size=args.sessions,
+                # 64 writers queueing on one file can wait past the default 5 s
+                pragmas={"busy_timeout": 120_000},
+            )
+            if args.commit_ms:
+                for shard in service.shards.values():
+                    sa_event.listen(shard.db_engine, "commit", lambda _: time.sleep(args.commit_ms / 1000))
+            events, elapsed, errors = run_level(service, args.sessions, args.invocations)
+            service.close()
+            throughput = events / elapsed
+            baseline = baseline or throughput
+            spread = sorted(
+                sum(service.shard_for(APP_NAME, f"user-{i}") == name for i in range(args.sessions))
+                for name in service.shards
+            )
+            print(f"{shards:>7}{throughput:>10.0f}{throughput / baseline:>8.1f}x  {spread}")
+            if errors:
+                print(f"         {len(errors)} sessions failed, first: {errors[0]!r}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
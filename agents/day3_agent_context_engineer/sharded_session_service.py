@@ -0,0 +1,207 @@
+"""Session storage spread over several databases.
+
+SQLite commits one writer at a time per file, so a single
+`my_agent_data.db` caps the whole process at one commit at a time, however
+many conversations are in flight. `ShardedSessionService` puts each
+(app_name, user_id) on one of N session services, usually one SQLite file
+each, so writes to different shards commit in parallel.
+
+Routing uses consistent hashing. Every shard owns `replicas` points on a
+hash ring, and a user belongs to the first point after the hash of their
+key. Adding a fifth shard to four moves about a fifth of the users, not
+nearly all of them as `hash % N` would. A user's sessions always live
+together, so their `user:` state needs no cross-shard work.
+
+Cross-shard operations:
+
+- `list_sessions(app_name=...)` without a user asks every shard at once and
+  concatenates the results.
+- `app:` state is written to the owning shard with the event (or with the
+  session that actually got created), then copied to every other shard at
+  once, off the event loop, so each shard's sessions see it. The copies
+  are not in the same transaction: a crash in between leaves the other
+  shards one update behind until the key is next written.
+- `stats()`, `flush()` and `close()` cover every shard.
+
+Usage:
+
+    from sharded_session_service import ShardedSessionService
+
+    session_service = ShardedSessionService.sqlite("my_agent_data_{shard}.db", shards=4)
+    print(session_service.shard_for(APP_NAME, USER_ID))
+"""
+
+import asyncio
+import bisect
+import hashlib
+from typing import Any, Optional
+
+from google.adk.events.event import Event
+from google.adk.sessions import _session_util
+from google.adk.sessions.base_session_service import BaseSessionService, ListSessionsResponse
+from google.adk.sessions.session import Session
+
+from sqlite_session_service import SqliteSessionService
+from threaded_session_service import ThreadedSessionService
+
+
+def _ring_hash(value: str) -> int:
+    # Stable across processes (unlike hash()), so every worker routes alike
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class ShardedSessionService(BaseSessionService):
+    """Routes each (app_name, user_id) to one of several session services by consistent hashing."""
+
+    def __init__(self, shards: dict[str, BaseSessionService], *, replicas: int = 64):
+        """
+        Args:
+            shards: Shard name -> session service. Names place the shard on
+                the ring, so keep them stable when adding shards. Each must
+                be a DatabaseSessionService (app state is copied between
+                them), optionally wrapped in a ThreadedSessionService
+            replicas: Ring points per shard (more points, more even spread)
+        """
+        if not shards:
+            raise ValueError("ShardedSessionService needs at least one shard")
+        for name, shard in shards.items():
+            inner = shard
+            while isinstance(inner, ThreadedSessionService):
+                inner = inner.service
+            if not hasattr(inner, "update_app_state"):
+                raise TypeError(
+                    f"Shard {name!r} ({type(inner).__name__}) can't take app state copies;"
+                    " use DatabaseSessionService or SqliteSessionService shards"
+                )
+        self.shards = dict(shards)
+        self._ring = sorted(
+            (_ring_hash(f"{name}#{replica}"), name)
+            for name in self.shards
+            for replica in range(replicas)
+        )
+        self._points = [point for point, _ in self._ring]
+
+    @classmethod
+    def sqlite(cls, path_pattern: str, shards: int, *, replicas: int = 64, **kwargs: Any):
+        """One SqliteSessionService per shard.
+
+        Args:
+            path_pattern: File name with a `{shard}` placeholder, e.g. "my_agent_data_{shard}.db"
+            shards: Number of shards (named "0", "1", ...)
+            **kwargs: Passed to every SqliteSessionService
+        """
+        return cls(
+            {
+                str(shard): SqliteSessionService(path_pattern.format(shard=shard), **kwargs)
+                for shard in range(shards)
+            },
+            replicas=replicas,
+        )
+
+    def shard_for(self, app_name: str, user_id: str) -> str:
+        """Name of the shard holding this user's sessions."""
+        index = bisect.bisect(self._points, _ring_hash(f"{app_name}\x00{user_id}"))
+        return self._ring[index % len(self._ring)][1]
+
+    def _shard(self, app_name: str, user_id: str) -> BaseSessionService:
+        return self.shards[self.shard_for(app_name, user_id)]
+
+    async def create_session(self, *, app_name, user_id, state=None, session_id=None):
+        session = await self._shard(app_name, user_id).create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        await self._copy_app_state(app_name, user_id, state)
+        return session
+
+    async def get_or_create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: Optional[str] = None,
+        state: Optional[dict[str, Any]] = None,
+    ) -> Session:
+        shard = self._shard(app_name, user_id)
+        if hasattr(shard, "create_session_if_missing"):
+            session, created = await shard.create_session_if_missing(
+                app_name=app_name, user_id=user_id, session_id=session_id, state=state
+            )
+        else:
+            session = None
+            if session_id is not None:
+                session = await shard.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+            created = session is None
+            if created:
+                session = await shard.create_session(
+                    app_name=app_name, user_id=user_id, state=state, session_id=session_id
+                )
+        # The initial state only applies to a session this call created
+        if created:
+            await self._copy_app_state(app_name, user_id, state)
+        return session
+
+    async def get_session(self, *, app_name, user_id, session_id, config=None):
+        return await self._shard(app_name, user_id).get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+
+    async def get_session_version(self, *, app_name, user_id, session_id) -> Optional[int]:
+        return await self._shard(app_name, user_id).get_session_version(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+
+    async def list_sessions(self, *, app_name, user_id=None):
+        if user_id is not None:
+            return await self._shard(app_name, user_id).list_sessions(
+                app_name=app_name, user_id=user_id
+            )
+        responses = await asyncio.gather(
+            *[shard.list_sessions(app_name=app_name) for shard in self.shards.values()]
+        )
+        return ListSessionsResponse(
+            sessions=[session for response in responses for session in response.sessions]
+        )
+
+    async def delete_session(self, *, app_name, user_id, session_id):
+        await self._shard(app_name, user_id).delete_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await self._shard(session.app_name, session.user_id).append_event(session, event)
+        if not event.partial and event.actions and event.actions.state_delta:
+            await self._copy_app_state(session.app_name, session.user_id, event.actions.state_delta)
+        return event
+
+    async def _copy_app_state(self, app_name: str, user_id: str, state: Optional[dict[str, Any]]):
+        """Writes the `app:` keys of `state` to every shard except the user's."""
+        app_delta = _session_util.extract_state_delta(state)["app"]
+        if not app_delta:
+            return
+        owner = self.shard_for(app_name, user_id)
+        # update_app_state is a blocking database write
+        await asyncio.gather(
+            *[
+                asyncio.to_thread(shard.update_app_state, app_name, app_delta)
+                for name, shard in self.shards.items()
+                if name != owner
+            ]
+        )
+
+    def flush(self):
+        for shard in self.shards.values():
+            if hasattr(shard, "flush"):
+                shard.flush()
+
+    def close(self):
+        for shard in self.shards.values():
+            if hasattr(shard, "close"):
+                shard.close()
+            elif hasattr(shard, "db_engine"):
+                shard.db_engine.dispose()
+
+    def stats(self) -> dict:
+        return {
+            name: shard.stats() if hasattr(shard, "stats") else {}
+            for name, shard in self.shards.items()
+        }
@@ -0,0 +1,217 @@
+"""DatabaseSessionService tuned for a local SQLite file.
+
+ADK's `DatabaseSessionService` runs SQLite with its defaults: a rollback
+journal, `synchronous=FULL`, a 2 MB page cache, and one transaction (with
+its fsyncs) for every appended event. An invocation that calls a tool
+writes at least four events, so it pays for four commits before the user
+sees the answer.
+
+`SqliteSessionService` changes three things:
+
+- Every pooled connection is set to WAL journaling, `synchronous=NORMAL`, a
+  larger page cache, in-memory temp tables, mmap reads and a busy timeout.
+  In WAL mode readers never block the writer.
+- The connection pool has an explicit size, so many concurrent sessions
+  queue for a connection instead of failing.
+- Events of one invocation are buffered and written in a single
+  transaction. The batch is flushed when the invocation produces its final
+  response (or pauses on a long-running tool), after a compaction summary,
+  when the next invocation starts, and before the session is read, listed or
+  deleted.
+
+With batching on, the events of an invocation still in progress are only
+in memory. A crash mid-invocation loses them, as if the invocation never
+ran. Call `flush()` to force them out, or pass `batch_invocation_events=False`
+to keep one commit per event.
+
+Usage:
+
+    from sqlite_session_service import SqliteSessionService
+
+    session_service = SqliteSessionService("my_agent_data.db")
+    ...
+    session_service.close()   # flushes anything still buffered
+"""
+
+import threading
+from dataclasses import dataclass, field
+
+from google.adk.events.event import Event
+from google.adk.sessions.base_session_service import BaseSessionService
+from google.adk.sessions.session import Session
+from sqlalchemy import event as sa_event
+
+from event_codec import EventCodec
+from session_archive import SessionArchive
+from session_cache import SessionCache
+from session_services import DatabaseSessionService
+
+# Applied to every new connection (journal_mode=WAL is persistent, the rest are per connection)
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    # In WAL mode NORMAL only syncs at checkpoints: a power loss can drop the
+    # last commits, but never corrupts the database
+    "synchronous": "NORMAL",
+    "cache_size": -64_000,  # negative = KiB, so 64 MB
+    "temp_store": "MEMORY",
+    "mmap_size": 256 * 1024 * 1024,
+    "busy_timeout": 5000,
+}
+
+
+@dataclass
+class _PendingEvents:
+    """Events of one invocation waiting to be written together."""
+
+    session: Session
+    invocation_id: str
+    events: list[Event] = field(default_factory=list)
+
+
+class SqliteSessionService(DatabaseSessionService):
+    """`DatabaseSessionService` with WAL, tuned pragmas, a sized pool and batched appends."""
+
+    def __init__(
+        self,
+        db_path: str = "my_agent_data.db",
+        *,
+        pool_size: int = 8,
+        max_overflow: int = 8,
+        pool_timeout: float = 30,
+        pragmas: dict | None = None,
+        batch_invocation_events: bool = True,
+        event_codec: EventCodec | None = None,
+        state_snapshot_every: int = 100,
+        session_cache: SessionCache | None = None,
+        archive: SessionArchive | None = None,
+    ):
+        """
+        Args:
+            db_path: SQLite file (a `sqlite:///...` URL also works)
+            pool_size: Connections kept open
+            max_overflow: Extra connections opened under load, closed when idle
+            pool_timeout: Seconds to wait for a free connection before failing
+            pragmas: Overrides/additions to SQLITE_PRAGMAS
+            batch_invocation_events: Write each invocation's events in one transaction
+            event_codec: Store events in this compact encoding (see event_codec.py)
+            state_snapshot_every: State writes per scope between snapshots (see session_services.py)
+            session_cache: Keep hot sessions in memory (see session_cache.py)
+            archive: Cold storage for idle sessions (see session_archive.py)
+        """
+        db_url = db_path if db_path.startswith("sqlite") else f"sqlite:///{db_path}"
+        self.pragmas = {**SQLITE_PRAGMAS, **(pragmas or {})}
+        self.batch_invocation_events = batch_invocation_events
+        self._pending: dict[tuple[str, str, str], _PendingEvents] = {}
+        # Guards _pending when calls come from several threads (ThreadedSessionService)
+        self._pending_lock = threading.Lock()
+        self.batches = 0
+        self.batched_events = 0
+
+        super().__init__(
+            db_url=db_url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            event_codec=event_codec,
+            state_snapshot_every=state_snapshot_every,
+            session_cache=session_cache,
+            archive=archive,
+        )
+        sa_event.listen(self.db_engine, "connect", self._apply_pragmas)
+        # The parent created the tables over an untuned connection; start the pool fresh
+        self.db_engine.dispose()
+
+    def _apply_pragmas(self, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in self.pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if not self.batch_invocation_events:
+            return await super().append_event(session, event)
+        if event.partial:
+            return event
+
+        key = (session.app_name, session.user_id, session.id)
+        pending = self._pending.get(key)
+        if pending is not None and (
+            pending.invocation_id != event.invocation_id or pending.session is not session
+        ):
+            self._flush(key)
+
+        event = self._trim_temp_delta_state(event)
+        with self._pending_lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = _PendingEvents(session, event.invocation_id)
+            pending.events.append(event)
+        # In-memory session only; the database write happens in _flush
+        await BaseSessionService.append_event(self, session=session, event=event)
+
+        # The user's message also counts as "final"; only the agent's answer (or a
+        # pause on a long-running tool) ends the invocation. Compaction summaries
+        # are appended on their own, after the invocation.
+        if event.actions.compaction or (event.author != "user" and event.is_final_response()):
+            self._flush(key)
+        return event
+
+    def flush(self):
+        """Writes every buffered invocation to the database."""
+        for key in list(self._pending):
+            self._flush(key)
+
+    def close(self):
+        self.flush()
+        self.db_engine.dispose()
+
+    def _flush(self, key):
+        with self._pending_lock:
+            pending = self._pending.pop(key, None)
+        if pending is None or not pending.events:
+            return
+        self._write_events(pending.session, pending.events)
+        self.batches += 1
+        self.batched_events += len(pending.events)
+
+    def _flush_session(self, app_name: str, user_id: str, session_id: str | None = None):
+        if session_id is not None:
+            self._flush((app_name, user_id, session_id))
+            return
+        for key in list(self._pending):
+            if key[:2] == (app_name, user_id):
+                self._flush(key)
+
+    async def get_session(self, *, app_name, user_id, session_id, config=None):
+        self._flush_session(app_name, user_id, session_id)
+        return await super().get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+
+    async def list_sessions(self, *, app_name, user_id=None):
+        if user_id is None:
+            self.flush()
+        else:
+            self._flush_session(app_name, user_id)
+        return await super().list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name, user_id, session_id):
+        with self._pending_lock:
+            self._pending.pop((app_name, user_id, session_id), None)
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    def archive_session(self, app_name, user_id, session_id, *, if_version=None):
+        # Buffered events count as a write, so a session with any stays put
+        self._flush((app_name, user_id, session_id))
+        return super().archive_session(app_name, user_id, session_id, if_version=if_version)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "events": self.batched_events,
+            "events_per_batch": self.batched_events / self.batches if self.batches else 0.0,
+            "pending_invocations": len(self._pending),
+            "rebases": self.rebases,
+            "conflicts": self.conflicts,
+            "pool": self.db_engine.pool.status(),
+        }
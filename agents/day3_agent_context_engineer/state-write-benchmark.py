@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import warnings
+warnings.filterwarnings("ignore")
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.genai import types
+
+from sqlite_session_service import SqliteSessionService
+
+# Cost of a small state change (a counter and a status flag) next to a large
+# `blog_draft` / `current_story` in session state:
+#   adk:    ADK's layout, every change rewrites the session's whole state JSON
+#   delta:  state_entries rows, only the changed keys are written (snapshot
+#           every 100 writes folds them back into the JSON column)
+#
+# "KB/append" is what the process wrote to the database files (WAL included),
+# from /proc/self/io, so it's Linux only. The status changes length on every
+# append: when a row keeps its exact size SQLite rewrites only the pages that
+# changed, which would hide what a growing state costs.
+#
+# Run from this folder:
+#   python state-write-benchmark.py
+#   python state-write-benchmark.py --sizes 10000 1000000 --appends 500
+
+APP_NAME = "default"
+USER_ID = "default"
+
+
+def written_bytes():
+    with open("/proc/self/io") as io:
+        for line in io:
+            if line.startswith("wchar:"):
+                return int(line.split()[1])
+    return 0
+
+
+def large_state(size, seed=7):
+    rng = random.Random(seed)
+    words = "the story draft blog agent chapter hero journey research section intro ending".split()
+
+    def text(length):
+        return " ".join(rng.choice(words) for _ in range(length // 6))
+
+    return {
+        "blog_draft": text(size // 2),
+        "current_story": text(size // 2),
+        "topic": "agents",
+        "word_count": 0,
+        "status": "drafting",
+    }
+
+
+async def run(service, size, appends):
+    session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, state=large_state(size))
+    timings = []
+    written = written_bytes()
+    for i in range(appends):
+        event = Event(
+            invocation_id=f"inv-{i}",
+            author="writer_agent",
+            content=types.Content(role="model", parts=[types.Part(text="Done.")]),
+            actions=EventActions(
+                state_delta={"word_count": i * 37, "status": "revising " + "section " * (i % 4)}
+            ),
+        )
+        start = time.perf_counter()
+        await service.append_event(session, event)
+        timings.append(time.perf_counter() - start)
+    written = written_bytes() - written
+
+    stored = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+    assert stored.state == session.state
+    return statistics.median(timings) * 1000, written / appends / 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Small state changes next to large state values")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Bytes of large state")
+    parser.add_argument("--appends", type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"\n{args.appends} appends per run, each changing two small keys\n")
+    print(f"{'state':>10}{'adk ms':>9}{'delta ms':>10}{'adk KB/append':>15}{'delta KB/append':>17}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            results = []
+            for label in ("adk", "delta"):
+                # One commit per event, so each append is one state write
+                service = SqliteSessionService(
+                    os.path.join(tmp, f"{label}-{size}.db"), batch_invocation_events=False
+                )
+                if label == "adk":
+                    # Same tuned connection, state written the way ADK does
+                    service._delta_state = False
+                results.append(await run(service, size, args.appends))
+                service.close()
+            (adk_ms, adk_kb), (delta_ms, delta_kb) = results
+            print(f"{size / 1000:>8.0f}KB{adk_ms:>9.2f}{delta_ms:>10.2f}{adk_kb:>15.1f}{delta_kb:>17.1f}")
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
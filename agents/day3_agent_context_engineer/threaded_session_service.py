@@ -0,0 +1,162 @@
+"""Runs a database session service off the asyncio event loop.
+
+`DatabaseSessionService` is async in name only: its methods run SQLAlchemy's
+synchronous engine, so every commit (and every fsync) blocks the event loop.
+While one session waits on the disk, every other session in the process
+stops too: no tokens are streamed, no tool results are handled, no timers
+fire.
+
+`ThreadedSessionService` wraps any session service and hands each call to a
+small pool of dedicated database threads. Each thread runs its own event
+loop, which serves as its request queue. The caller's loop only awaits a
+future. Calls for the same session always go to the same thread, so they
+run in the order they were made. Different sessions spread over the pool,
+and in WAL mode their reads run in parallel.
+
+Usage:
+
+    from sqlite_session_service import SqliteSessionService
+    from threaded_session_service import ThreadedSessionService
+
+    session_service = ThreadedSessionService(SqliteSessionService("my_agent_data.db"))
+    runner = Runner(agent=agent, app_name=APP_NAME, session_service=session_service)
+    ...
+    session_service.close()
+"""
+
+import asyncio
+import threading
+import zlib
+from typing import Any, Optional
+
+from google.adk.events.event import Event
+from google.adk.sessions.base_session_service import BaseSessionService
+from google.adk.sessions.session import Session
+
+
+class _Worker:
+    """A database thread with its own event loop."""
+
+    def __init__(self, name: str):
+        self.loop = asyncio.new_event_loop()
+        self.pending = 0
+        self.completed = 0
+        self.thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+class ThreadedSessionService(BaseSessionService):
+    """Forwards every call of a session service to dedicated database threads."""
+
+    def __init__(self, service: BaseSessionService, *, threads: int = 4):
+        """
+        Args:
+            service: The session service doing the work (e.g. SqliteSessionService)
+            threads: Database threads. SQLite still commits one write at a time,
+                so more threads mostly help concurrent reads
+        """
+        self.service = service
+        self._workers = [_Worker(f"session-db-{i}") for i in range(threads)]
+
+    def _worker(self, *key: Optional[str]) -> _Worker:
+        # Stable across runs (unlike hash()), so a session always maps to one thread
+        index = zlib.crc32("\x00".join(part or "" for part in key).encode())
+        return self._workers[index % len(self._workers)]
+
+    async def _call(self, worker: _Worker, method: str, **kwargs: Any) -> Any:
+        worker.pending += 1
+        try:
+            coro = getattr(self.service, method)(**kwargs)
+            return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, worker.loop))
+        finally:
+            worker.pending -= 1
+            worker.completed += 1
+
+    async def create_session(self, *, app_name, user_id, state=None, session_id=None):
+        return await self._call(
+            self._worker(app_name, user_id, session_id),
+            "create_session",
+            app_name=app_name,
+            user_id=user_id,
+            state=state,
+            session_id=session_id,
+        )
+
+    async def get_or_create_session(self, *, app_name, user_id, session_id=None, state=None):
+        return await self._call(
+            self._worker(app_name, user_id, session_id),
+            "get_or_create_session",
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            state=state,
+        )
+
+    async def create_session_if_missing(self, *, app_name, user_id, session_id=None, state=None):
+        return await self._call(
+            self._worker(app_name, user_id, session_id),
+            "create_session_if_missing",
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            state=state,
+        )
+
+    async def get_session(self, *, app_name, user_id, session_id, config=None):
+        return await self._call(
+            self._worker(app_name, user_id, session_id),
+            "get_session",
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            config=config,
+        )
+
+    async def list_sessions(self, *, app_name, user_id=None):
+        return await self._call(
+            self._worker(app_name, user_id), "list_sessions", app_name=app_name, user_id=user_id
+        )
+
+    async def delete_session(self, *, app_name, user_id, session_id):
+        return await self._call(
+            self._worker(app_name, user_id, session_id),
+            "delete_session",
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+        )
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        return await self._call(
+            self._worker(session.app_name, session.user_id, session.id),
+            "append_event",
+            session=session,
+            event=event,
+        )
+
+    def update_app_state(self, app_name: str, app_delta: dict[str, Any]):
+        """Forwards to the wrapped service. Blocking: not tied to a session's thread."""
+        self.service.update_app_state(app_name, app_delta)
+
+    def flush(self):
+        if hasattr(self.service, "flush"):
+            self.service.flush()
+
+    def close(self):
+        """Stops the database threads, then closes the wrapped service (if it can be)."""
+        for worker in self._workers:
+            worker.stop()
+        if hasattr(self.service, "close"):
+            self.service.close()
+
+    def stats(self) -> dict:
+        return {
+            "threads": len(self._workers),
+            "pending": [worker.pending for worker in self._workers],
+            "completed": sum(worker.completed for worker in self._workers),
+        }